@@ -0,0 +1,51 @@
+"""token links and conversions
+
+Revision ID: 2f7c8d1e4b93
+Revises: 9b2d4e6f8a10
+Create Date: 2026-10-19 13:40:52.918204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2f7c8d1e4b93"
+down_revision: Union[str, None] = "9b2d4e6f8a10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "token_links",
+        sa.Column("token", sa.String(length=8), primary_key=True),
+        sa.Column("base_token", sa.String(length=8), nullable=False),
+        sa.Column("factor", sa.Numeric(precision=28, scale=10), nullable=False),
+    )
+    op.create_index(
+        op.f("ix_token_links_base_token"), "token_links", ["base_token"], unique=False
+    )
+    op.create_table(
+        "conversions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("timestamp", sa.DateTime(), nullable=False),
+        sa.Column("from_token", sa.String(length=8), nullable=False),
+        sa.Column("to_token", sa.String(length=8), nullable=False),
+        sa.Column("from_amount", sa.Numeric(precision=28, scale=10), nullable=False),
+        sa.Column("to_amount", sa.Numeric(precision=28, scale=10), nullable=False),
+        sa.UniqueConstraint("timestamp", "from_token", name="uq_conversion_timestamp"),
+    )
+    op.create_index(op.f("ix_conversions_id"), "conversions", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_conversions_id"), table_name="conversions")
+    op.drop_table("conversions")
+    op.drop_index(op.f("ix_token_links_base_token"), table_name="token_links")
+    op.drop_table("token_links")
@@ -0,0 +1,41 @@
+"""transaction history indexes
+
+Revision ID: 5f2d9c1e7a41
+Revises: 3ac5b0baed62
+Create Date: 2026-10-18 09:12:41.204518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5f2d9c1e7a41"
+down_revision: Union[str, None] = "3ac5b0baed62"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Per-token and per-stablecoin history lookups filter on the first column
+    # and order by timestamp, so both columns go into the index.
+    op.create_index(
+        "ix_transactions_token_timestamp",
+        "transactions",
+        ["token", "timestamp"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_transactions_stable_coin_timestamp",
+        "transactions",
+        ["stable_coin", "timestamp"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_transactions_stable_coin_timestamp", table_name="transactions")
+    op.drop_index("ix_transactions_token_timestamp", table_name="transactions")
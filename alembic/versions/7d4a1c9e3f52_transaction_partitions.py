@@ -0,0 +1,157 @@
+"""transaction partitions and archive catalog
+
+Revision ID: 7d4a1c9e3f52
+Revises: 2f7c8d1e4b93
+Create Date: 2026-10-19 15:21:08.604117
+
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7d4a1c9e3f52"
+down_revision: Union[str, None] = "2f7c8d1e4b93"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = "id, timestamp, token, amount, total_usd, stable_coin"
+
+# Indexes on the partitioned parent are created on every partition too
+INDEXES = [
+    ("ix_transactions_id", "id"),
+    ("ix_transactions_token_timestamp", "token, timestamp"),
+    ("ix_transactions_stable_coin_timestamp", "stable_coin, timestamp"),
+]
+
+# Partitions created beyond the current month; later months go to the
+# default partition until `python -m app.cli partition-transactions` runs.
+MONTHS_AHEAD = 3
+
+
+def _next_month(month: datetime) -> datetime:
+    if month.month == 12:
+        return datetime(month.year + 1, 1, 1)
+    return datetime(month.year, month.month + 1, 1)
+
+
+def _partition_transactions():
+    conn = op.get_bind()
+    # Index and constraint names are per schema, so the old ones must go
+    # before the partitioned table can take them over.
+    op.execute("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    op.execute(
+        "ALTER TABLE transactions_unpartitioned "
+        "RENAME CONSTRAINT transactions_pkey TO transactions_unpartitioned_pkey"
+    )
+    op.execute(
+        "ALTER TABLE transactions_unpartitioned DROP CONSTRAINT uq_timestamp_token"
+    )
+    for name, _ in INDEXES:
+        op.execute(f"DROP INDEX {name}")
+    # The id sequence belongs to the old table and would be dropped with it
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY NONE")
+
+    # Unique keys of a partitioned table must include the partition key
+    op.execute("""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq'),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            token VARCHAR(8) NOT NULL,
+            amount NUMERIC(28, 10) NOT NULL,
+            total_usd NUMERIC(28, 10) NOT NULL,
+            stable_coin VARCHAR(8) NOT NULL,
+            PRIMARY KEY (id, timestamp),
+            CONSTRAINT uq_timestamp_token UNIQUE (timestamp, token)
+        ) PARTITION BY RANGE (timestamp)
+        """)
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON transactions ({columns})")
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    first = conn.execute(
+        sa.text("SELECT min(timestamp) FROM transactions_unpartitioned")
+    ).scalar()
+    now = datetime.now(timezone.utc)
+    month = datetime(now.year, now.month, 1)
+    if first is not None:
+        month = min(month, datetime(first.year, first.month, 1))
+    last = datetime(now.year, now.month, 1)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        end = _next_month(month)
+        op.execute(
+            f"CREATE TABLE transactions_{month:%Y_%m} PARTITION OF transactions "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+        month = end
+
+    op.execute(
+        f"INSERT INTO transactions ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM transactions_unpartitioned"
+    )
+    op.execute("DROP TABLE transactions_unpartitioned")
+
+
+def _unpartition_transactions():
+    op.execute("ALTER TABLE transactions RENAME TO transactions_partitioned")
+    op.execute(
+        "ALTER TABLE transactions_partitioned "
+        "RENAME CONSTRAINT transactions_pkey TO transactions_partitioned_pkey"
+    )
+    op.execute(
+        "ALTER TABLE transactions_partitioned DROP CONSTRAINT uq_timestamp_token"
+    )
+    for name, _ in INDEXES:
+        op.execute(f"DROP INDEX {name}")
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY NONE")
+
+    op.execute("""
+        CREATE TABLE transactions (
+            id INTEGER NOT NULL DEFAULT nextval('transactions_id_seq') PRIMARY KEY,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            token VARCHAR(8) NOT NULL,
+            amount NUMERIC(28, 10) NOT NULL,
+            total_usd NUMERIC(28, 10) NOT NULL,
+            stable_coin VARCHAR(8) NOT NULL,
+            CONSTRAINT uq_timestamp_token UNIQUE (timestamp, token)
+        )
+        """)
+    op.execute("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON transactions ({columns})")
+    op.execute(
+        f"INSERT INTO transactions ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM transactions_partitioned"
+    )
+    # Drops the partitions with it
+    op.execute("DROP TABLE transactions_partitioned")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "transaction_archives",
+        sa.Column("month", sa.DateTime(), primary_key=True),
+        sa.Column("path", sa.String(length=255), nullable=False),
+        sa.Column("rows", sa.Integer(), nullable=False),
+        sa.Column("totals", sa.JSON(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+    )
+    # SQLite and MySQL keep one plain table; archiving deletes rows there
+    if op.get_bind().dialect.name == "postgresql":
+        _partition_transactions()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Archived months stay in their Parquet files
+    if op.get_bind().dialect.name == "postgresql":
+        _unpartition_transactions()
+    op.drop_table("transaction_archives")
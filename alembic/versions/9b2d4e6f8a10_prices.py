@@ -0,0 +1,35 @@
+"""prices
+
+Revision ID: 9b2d4e6f8a10
+Revises: e5b91f3a6c07
+Create Date: 2026-10-19 11:02:17.204381
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9b2d4e6f8a10"
+down_revision: Union[str, None] = "e5b91f3a6c07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "prices",
+        sa.Column("token", sa.String(length=8), primary_key=True),
+        sa.Column("timestamp", sa.DateTime(), primary_key=True),
+        sa.Column("price_usd", sa.Numeric(precision=28, scale=10), nullable=False),
+        sa.Column("source", sa.String(length=16), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("prices")
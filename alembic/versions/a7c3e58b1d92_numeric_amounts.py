@@ -0,0 +1,46 @@
+"""numeric amounts
+
+Revision ID: a7c3e58b1d92
+Revises: 5f2d9c1e7a41
+Create Date: 2026-10-18 10:02:17.550341
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c3e58b1d92"
+down_revision: Union[str, None] = "5f2d9c1e7a41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+AMOUNT = sa.Numeric(precision=28, scale=10)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Batch mode recreates the table on SQLite, which cannot alter columns
+    with op.batch_alter_table("transactions") as batch_op:
+        for column in ("amount", "total_usd"):
+            batch_op.alter_column(
+                column,
+                existing_type=sa.Float(),
+                type_=AMOUNT,
+                existing_nullable=False,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("transactions") as batch_op:
+        for column in ("amount", "total_usd"):
+            batch_op.alter_column(
+                column,
+                existing_type=AMOUNT,
+                type_=sa.Float(),
+                existing_nullable=False,
+            )
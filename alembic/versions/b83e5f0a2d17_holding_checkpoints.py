@@ -0,0 +1,37 @@
+"""holding checkpoints
+
+Revision ID: b83e5f0a2d17
+Revises: 7d4a1c9e3f52
+Create Date: 2026-10-19 16:48:33.720415
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b83e5f0a2d17"
+down_revision: Union[str, None] = "7d4a1c9e3f52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled on demand by app.logic.checkpoints; nothing to backfill
+    op.create_table(
+        "holding_checkpoints",
+        sa.Column("timestamp", sa.DateTime(), primary_key=True),
+        sa.Column("token", sa.String(length=8), primary_key=True),
+        sa.Column("transactions", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.Numeric(precision=28, scale=10), nullable=False),
+        sa.Column("total_usd", sa.Numeric(precision=28, scale=10), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("holding_checkpoints")
@@ -0,0 +1,45 @@
+"""data versions
+
+Revision ID: c41e07d2b6f8
+Revises: a7c3e58b1d92
+Create Date: 2026-10-18 11:40:03.118274
+
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c41e07d2b6f8"
+down_revision: Union[str, None] = "a7c3e58b1d92"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    data_versions = op.create_table(
+        "data_versions",
+        sa.Column("name", sa.String(length=32), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.bulk_insert(
+        data_versions,
+        [
+            {
+                "name": "data",
+                "version": 0,
+                "updated_at": datetime.now(timezone.utc).replace(tzinfo=None),
+            }
+        ],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("data_versions")
@@ -0,0 +1,39 @@
+"""ocr results
+
+Revision ID: e5b91f3a6c07
+Revises: c41e07d2b6f8
+Create Date: 2026-10-19 09:12:44.530118
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e5b91f3a6c07"
+down_revision: Union[str, None] = "c41e07d2b6f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ocr_results",
+        sa.Column("image_sha256", sa.String(length=64), primary_key=True),
+        sa.Column("boxes", sa.JSON(), nullable=True),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("layout", sa.String(length=32), nullable=True),
+        sa.Column("transactions", sa.Integer(), nullable=False),
+        sa.Column("failures", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("parsed_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("ocr_results")
@@ -0,0 +1,32 @@
+"""ocr rejections
+
+Revision ID: f3a8c2d9e604
+Revises: b83e5f0a2d17
+Create Date: 2026-10-19 18:21:07.264913
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a8c2d9e604"
+down_revision: Union[str, None] = "b83e5f0a2d17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "ocr_results",
+        sa.Column("rejected", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("ocr_results", "rejected")
@@ -0,0 +1,341 @@
+"""
+Embedded DuckDB mirror of the transactions table for analytical queries.
+
+With ANALYTICS on, a background thread copies new transactions into a DuckDB
+database, where scans and window functions run columnar without touching the
+main database. Archived months are loaded once from their Parquet files; live
+rows are fetched past a high-water mark on the id. Requests only ever read
+the mirror as of its last sync and never wait for one, so their answers may
+lag the main database by up to ANALYTICS_SYNC_INTERVAL.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import get_engine
+from app.logic.archive import transactions_table
+from app.models import Transaction, TransactionArchive
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the main database per round trip
+SYNC_BATCH_SIZE = 10_000
+
+# Ids below the high-water mark read again on every sync: on Postgres a
+# transaction holding a lower id can commit after one holding a higher id.
+SYNC_OVERLAP = 1000
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS transactions (
+        id BIGINT PRIMARY KEY,
+        timestamp TIMESTAMP NOT NULL,
+        token VARCHAR NOT NULL,
+        amount DECIMAL(28, 10) NOT NULL,
+        total_usd DECIMAL(28, 10) NOT NULL,
+        stable_coin VARCHAR NOT NULL
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS archived_months (month TIMESTAMP PRIMARY KEY)",
+    """
+    CREATE TABLE IF NOT EXISTS sync_state (
+        high_water_id BIGINT NOT NULL,
+        high_water_timestamp TIMESTAMP,
+        synced_at TIMESTAMP NOT NULL
+    )
+    """,
+]
+
+_COLUMNS = (
+    Transaction.id,
+    Transaction.timestamp,
+    Transaction.token,
+    Transaction.amount,
+    Transaction.total_usd,
+    Transaction.stable_coin,
+)
+
+
+class AnalyticsStore:
+    """
+    DuckDB database holding a copy of every transaction, archived ones
+    included. Rows are only ever added: archiving a month in the main
+    database leaves its rows here.
+    """
+
+    def __init__(self, path: str = ""):
+        # Only needed with ANALYTICS on
+        import duckdb
+
+        self.path = path
+        self._connection = duckdb.connect(path or ":memory:")
+        for statement in _SCHEMA:
+            self._connection.execute(statement)
+        # Serializes syncs; reads go through their own cursors and see the
+        # last committed sync.
+        self._sync_lock = threading.Lock()
+
+    def query(self, sql: str, parameters: Optional[list] = None) -> list[tuple]:
+        with self._connection.cursor() as cursor:
+            return cursor.execute(sql, parameters or []).fetchall()
+
+    def status(self) -> dict:
+        """High-water mark of the last sync and the number of rows mirrored."""
+        ((rows,),) = self.query("SELECT COUNT(*) FROM transactions")
+        state = self.query(
+            "SELECT high_water_id, high_water_timestamp, synced_at FROM sync_state"
+        )
+        high_water_id, high_water_timestamp, synced_at = (
+            state[0] if state else (None, None, None)
+        )
+        return {
+            "rows": rows,
+            "high_water_id": high_water_id,
+            "high_water_timestamp": high_water_timestamp,
+            "synced_at": synced_at,
+        }
+
+    def sync(self, db: Session) -> int:
+        """
+        Copy the archived months not loaded yet and the transactions past the
+        high-water mark; rows already mirrored are skipped.
+
+        Returns:
+            int: Number of rows added
+        """
+        with self._sync_lock, self._connection.cursor() as cursor:
+            added = self._sync_archive(db, cursor)
+
+            state = cursor.execute("SELECT high_water_id FROM sync_state").fetchall()
+            after = max(state[0][0] - SYNC_OVERLAP, 0) if state else 0
+            while True:
+                rows = (
+                    db.query(*_COLUMNS)
+                    .filter(Transaction.id > after)
+                    .order_by(Transaction.id)
+                    .limit(SYNC_BATCH_SIZE)
+                    .all()
+                )
+                if not rows:
+                    break
+                cursor.register("batch", transactions_table(rows))
+                ((inserted,),) = cursor.execute(
+                    "INSERT OR IGNORE INTO transactions SELECT * FROM batch"
+                ).fetchall()
+                cursor.unregister("batch")
+                added += inserted
+                after = rows[-1][0]
+
+            cursor.execute("BEGIN")
+            cursor.execute("DELETE FROM sync_state")
+            cursor.execute(
+                "INSERT INTO sync_state "
+                "SELECT COALESCE(MAX(id), 0), MAX(timestamp), ? FROM transactions",
+                [datetime.now()],
+            )
+            cursor.execute("COMMIT")
+        return added
+
+    def _sync_archive(self, db: Session, cursor) -> int:
+        loaded = {
+            m for (m,) in cursor.execute("SELECT month FROM archived_months").fetchall()
+        }
+        directory = get_settings().archive_dir
+        added = 0
+        for month, path in db.query(TransactionArchive.month, TransactionArchive.path):
+            if month in loaded:
+                continue
+            cursor.execute("BEGIN")
+            ((inserted,),) = cursor.execute(
+                "INSERT OR IGNORE INTO transactions SELECT * FROM read_parquet(?)",
+                [os.path.join(directory, path)],
+            ).fetchall()
+            cursor.execute("INSERT INTO archived_months VALUES (?)", [month])
+            cursor.execute("COMMIT")
+            added += inserted
+        return added
+
+    def close(self):
+        with self._sync_lock:
+            self._connection.close()
+
+
+class AnalyticsSyncer:
+    """Background thread syncing the store right away and then on a timer."""
+
+    def __init__(self, store: AnalyticsStore, interval: float):
+        self.store = store
+        self.interval = interval
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="analytics-sync", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                with Session(get_engine()) as db:
+                    self.store.sync(db)
+            except Exception as e:
+                logger.warning("Analytics sync failed, will retry: %s", e)
+            self._stopping.wait(self.interval)
+
+
+_store: Optional[AnalyticsStore] = None
+_syncer: Optional[AnalyticsSyncer] = None
+
+
+def get_store() -> Optional[AnalyticsStore]:
+    """The analytics store, or None while ANALYTICS is off."""
+    return _store
+
+
+def start_analytics():
+    global _store, _syncer
+    settings = get_settings()
+    if not settings.analytics or _syncer is not None:
+        return
+    _store = AnalyticsStore(settings.analytics_path)
+    _syncer = AnalyticsSyncer(_store, settings.analytics_sync_interval)
+    _syncer.start()
+
+
+def stop_analytics():
+    global _store, _syncer
+    if _syncer is not None:
+        _syncer.stop()
+        _store.close()
+    _store = None
+    _syncer = None
+
+
+def _token_filter(token: Optional[str]) -> tuple[str, list]:
+    if token is None:
+        return "", []
+    return "WHERE token = ?", [token]
+
+
+def rolling_flows(store: AnalyticsStore, days: int, token: Optional[str] = None):
+    """
+    Per day with transactions: the day's transaction count and net amount
+    and USD flow, and their sums over the `days` calendar days ending on it.
+    """
+    where, parameters = _token_filter(token)
+    rows = store.query(
+        f"""
+        WITH daily AS (
+            SELECT CAST(timestamp AS DATE) AS day, COUNT(*) AS transactions,
+                SUM(amount) AS amount, SUM(total_usd) AS total_usd
+            FROM transactions {where}
+            GROUP BY day
+        )
+        SELECT day, transactions, amount, total_usd,
+            SUM(transactions) OVER w, SUM(amount) OVER w, SUM(total_usd) OVER w
+        FROM daily
+        WINDOW w AS (
+            ORDER BY day RANGE BETWEEN INTERVAL {int(days) - 1} DAY PRECEDING
+            AND CURRENT ROW
+        )
+        ORDER BY day
+        """,
+        parameters,
+    )
+    return [
+        {
+            "day": day,
+            "transactions": transactions,
+            "amount": amount,
+            "total_usd": total_usd,
+            "window": {
+                "transactions": int(window_transactions),
+                "amount": window_amount,
+                "total_usd": window_usd,
+            },
+        }
+        for (
+            day,
+            transactions,
+            amount,
+            total_usd,
+            window_transactions,
+            window_amount,
+            window_usd,
+        ) in rows
+    ]
+
+
+def trade_size_histogram(store: AnalyticsStore, bins: int, token: Optional[str] = None):
+    """
+    Transactions counted by USD size (|total_usd|) in `bins` equal-width
+    bins between the smallest and largest size.
+    """
+    where, parameters = _token_filter(token)
+    ((low, high),) = store.query(
+        f"SELECT MIN(ABS(total_usd)), MAX(ABS(total_usd)) FROM transactions {where}",
+        parameters,
+    )
+    if low is None:
+        return []
+    width = (high - low) / bins
+    counts = dict(
+        store.query(
+            f"""
+            SELECT LEAST(
+                    COALESCE(FLOOR((ABS(total_usd) - ?) / NULLIF(?, 0)), 0), ? - 1
+                ) AS bin, COUNT(*)
+            FROM transactions {where}
+            GROUP BY bin
+            """,
+            [low, width, bins, *parameters],
+        )
+    )
+    return [
+        {
+            "lower": low + width * i,
+            "upper": high if i == bins - 1 else low + width * (i + 1),
+            "transactions": counts.get(i, 0),
+        }
+        for i in range(bins)
+    ]
+
+
+def cohort_stats(store: AnalyticsStore):
+    """
+    Tokens grouped by the month of their first transaction, with their
+    transaction count, USD spent (negative total_usd) and net USD flow.
+    """
+    rows = store.query("""
+        WITH firsts AS (
+            SELECT token, DATE_TRUNC('month', MIN(timestamp)) AS cohort
+            FROM transactions GROUP BY token
+        )
+        SELECT cohort, COUNT(DISTINCT token), COUNT(*),
+            SUM(CASE WHEN total_usd < 0 THEN -total_usd ELSE 0 END),
+            SUM(total_usd)
+        FROM transactions JOIN firsts USING (token)
+        GROUP BY cohort
+        ORDER BY cohort
+        """)
+    return [
+        {
+            "cohort": cohort.date(),
+            "tokens": tokens,
+            "transactions": transactions,
+            "spent_usd": spent_usd,
+            "net_usd": net_usd,
+        }
+        for cohort, tokens, transactions, spent_usd, net_usd in rows
+    ]
@@ -1,15 +1,52 @@
+import csv
+import io
 from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Depends, File, UploadFile, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, ConfigDict
 from sqlalchemy.orm import Session
 
+from app.analytics import (
+    cohort_stats,
+    get_store,
+    rolling_flows,
+    trade_size_histogram,
+)
+from app.cache import (
+    bump_data_version,
+    cache_headers,
+    is_not_modified,
+    sync_data_version,
+)
 from app.database import get_db
+from app.events import publish_tokens
+from app.logic.archive import iter_transactions
+from app.logic.prices import (
+    get_price_store,
+    import_trade_prices,
+    parse_prices_csv,
+    portfolio_values,
+    store_prices,
+    time_range,
+)
+from app.logic.token_links import get_token_graph, holdings, link_token
+from app.logic.tokens import parse_tokens_csv, register_tokens
 from app.logic.transactions import process_add_transaction
 from app.models import Token
-from app.ocr import extract_transactions_from_image_upload
+from app.ocr import extract_transactions_from_image_upload, reparse_stored_results
+from app.write_behind import get_queue
 
 router = APIRouter(prefix="/api", tags=["API"])
 
@@ -31,6 +68,27 @@ class TokenCreate(BaseModel):
     )
 
 
+class TokenLinkCreate(BaseModel):
+    """
+    Schema for marking a token as equivalent to another.
+
+    Attributes:
+        token (str): The derivative token symbol
+        base_token (str): The token it is equivalent to
+        factor (float): Units of base_token one unit of token is worth
+    """
+
+    token: str
+    base_token: str
+    factor: float = 1.0
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {"token": "STETH", "base_token": "ETH", "factor": 1.0}
+        }
+    )
+
+
 class TransactionCreate(BaseModel):
     """
     Schema for creating a new transaction between tokens.
@@ -208,6 +266,8 @@ async def add_token_api(token_data: TokenCreate, db: Session = Depends(get_db)):
     new_token = Token(name=token, is_stable=is_stable)
     db.add(new_token)
     db.commit()
+    bump_data_version(db)
+    publish_tokens([token])
 
     return JSONResponse(
         content={
@@ -219,6 +279,225 @@ async def add_token_api(token_data: TokenCreate, db: Session = Depends(get_db)):
     )
 
 
+def _bulk_token_response(result: dict) -> JSONResponse:
+    return JSONResponse(
+        content=result,
+        status_code=status.HTTP_200_OK,
+        headers={"HX-Trigger": "tokenAdded"} if result["created"] else None,
+    )
+
+
+@router.post(
+    "/tokens/bulk",
+    response_class=JSONResponse,
+    responses={
+        200: {
+            "description": "Per-token results with the status code POST /api/tokens would return for each",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "created": 1,
+                        "existing": 1,
+                        "conflicts": 1,
+                        "invalid": 0,
+                        "results": [
+                            {
+                                "token": "ETH",
+                                "status_code": 201,
+                                "message": "Token 'ETH' marked as non-stablecoin",
+                            },
+                            {
+                                "token": "USDC",
+                                "status_code": 200,
+                                "message": "Token 'USDC' already exists",
+                            },
+                            {
+                                "token": "DAI",
+                                "status_code": 409,
+                                "error": "'DAI' is already marked as a stablecoin.",
+                            },
+                        ],
+                    }
+                }
+            },
+        },
+    },
+)
+async def add_tokens_bulk_api(tokens: list[TokenCreate], db: Session = Depends(get_db)):
+    """
+    Register many tokens in one request.
+
+    Existing tokens are looked up in one query and all new ones inserted in
+    one statement. Each entry gets the outcome POST /api/tokens would give it:
+    201 created, 200 already exists, 409 already marked with the other
+    stability status, 400 invalid symbol.
+    """
+    result = register_tokens(((t.token, t.is_stable) for t in tokens), db)
+    return _bulk_token_response(result)
+
+
+@router.post(
+    "/tokens/sync",
+    response_class=JSONResponse,
+    responses={
+        200: {"description": "Same per-token results as /api/tokens/bulk"},
+        400: {
+            "description": "Unreadable CSV",
+            "content": {
+                "application/json": {
+                    "example": {"error": "Line 3: cannot read is_stable value 'maybe'"}
+                }
+            },
+        },
+    },
+)
+async def sync_tokens_api(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    Register the tokens listed in an uploaded CSV file.
+
+    The file needs a `token,is_stable` header; is_stable accepts true/false,
+    1/0 or yes/no. Tokens already present are left untouched, so the same
+    file can be synced repeatedly.
+    """
+    try:
+        entries = parse_tokens_csv((await file.read()).decode("utf-8-sig"))
+    except (UnicodeDecodeError, ValueError) as e:
+        return JSONResponse(
+            content={"error": str(e)}, status_code=status.HTTP_400_BAD_REQUEST
+        )
+    return _bulk_token_response(register_tokens(entries, db))
+
+
+@router.post(
+    "/tokens/links",
+    response_class=JSONResponse,
+    responses={
+        201: {
+            "description": "Tokens linked",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "status": "success",
+                        "message": "1 'STETH' is now worth 1 'ETH'.",
+                    }
+                }
+            },
+        },
+        200: {"description": "The tokens are already linked the same way"},
+        400: {
+            "description": "Unknown token, stability mismatch or a link cycle",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "error": "Linking 'ETH' to 'STETH' would create a cycle."
+                    }
+                }
+            },
+        },
+        409: {
+            "description": "The token is already linked to another base token",
+            "content": {
+                "application/json": {
+                    "example": {"error": "'STETH' is already linked to 'ETH'."}
+                }
+            },
+        },
+    },
+)
+async def link_token_api(link: TokenLinkCreate, db: Session = Depends(get_db)):
+    """
+    Mark a token as equivalent to another, e.g. stETH to ETH.
+
+    Swaps between tokens that resolve to the same root are then stored as
+    conversions instead of being rejected for lacking a stablecoin, and
+    holdings are reported per root token.
+    """
+    result = link_token(link.token, link.base_token, link.factor, db)
+    status_code = result.pop("status_code")
+    if result["status"] == "error":
+        return JSONResponse(content={"error": result["error"]}, status_code=status_code)
+    return JSONResponse(content=result, status_code=status_code)
+
+
+@router.get(
+    "/tokens/links",
+    responses={
+        200: {
+            "description": "Every linked token with its resolved root and factor",
+            "content": {
+                "application/json": {
+                    "example": [
+                        {
+                            "token": "WSTETH",
+                            "base_token": "STETH",
+                            "factor": "1.15",
+                            "root": "ETH",
+                            "root_factor": "1.15",
+                        }
+                    ]
+                }
+            },
+        }
+    },
+)
+async def list_token_links(db: Session = Depends(get_db)):
+    """List token links, each with the root it resolves to."""
+    sync_data_version(db)
+    graph = get_token_graph(db)
+    links = []
+    for token in sorted(graph.links):
+        base_token, factor = graph.links[token]
+        root, root_factor = graph.resolve(token)
+        links.append(
+            {
+                "token": token,
+                "base_token": base_token,
+                "factor": factor,
+                "root": root,
+                "root_factor": root_factor,
+            }
+        )
+    return jsonable_encoder(links)
+
+
+@router.get(
+    "/holdings",
+    responses={
+        200: {
+            "description": "Holdings and net USD flow per equivalence class",
+            "content": {
+                "application/json": {
+                    "example": [
+                        {
+                            "token": "ETH",
+                            "amount": "1.5",
+                            "net_usd": "-3000",
+                            "members": {"ETH": "0.5", "STETH": "1"},
+                        }
+                    ]
+                }
+            },
+        }
+    },
+)
+async def get_holdings(
+    at: Optional[datetime] = Query(
+        None, description="Report the holdings as of this moment instead of now"
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Report net holdings per root token, with equivalent tokens folded in.
+
+    `amount` is in root token units, `net_usd` is the USD spent (negative)
+    and received on all member tokens, and `members` lists the amount held
+    of each token. With `at`, only transactions and conversions up to and
+    including that moment count.
+    """
+    sync_data_version(db)
+    return jsonable_encoder(holdings(db, at))
+
+
 @router.get(
     "/tokens/{token_name}",
     response_class=JSONResponse,
@@ -229,6 +508,7 @@ async def add_token_api(token_data: TokenCreate, db: Session = Depends(get_db)):
                 "application/json": {"example": {"name": "USDC", "is_stable": True}}
             },
         },
+        304: {"description": "Token data unchanged since the given ETag"},
         404: {
             "description": "Token not found",
             "content": {
@@ -237,24 +517,114 @@ async def add_token_api(token_data: TokenCreate, db: Session = Depends(get_db)):
         },
     },
 )
-async def get_token(token_name: str, db: Session = Depends(get_db)):
+async def get_token(token_name: str, request: Request, db: Session = Depends(get_db)):
     """
     Retrieve information about a specific token.
 
+    Responses carry an ETag and Last-Modified; a matching conditional
+    request gets 304 Not Modified without touching the database.
+
     Args:
         token_name (str): The name/symbol of the token to retrieve
+        request (Request): The incoming request, for conditional headers
         db (Session): Database session dependency
 
     Returns:
         JSONResponse: Token information or 404 error if not found
     """
+    sync_data_version(db)
+    headers = cache_headers(f"api:token:{token_name}")
+    if is_not_modified(request, headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
     token = db.query(Token).filter(Token.name == token_name).first()
     if not token:
         return JSONResponse(
             content={"error": f"Token '{token_name}' not found."},
             status_code=status.HTTP_404_NOT_FOUND,
+            headers=headers,
         )
-    return {"name": token.name, "is_stable": token.is_stable}
+    return JSONResponse(
+        content={"name": token.name, "is_stable": token.is_stable}, headers=headers
+    )
+
+
+@router.get(
+    "/transactions/queue",
+    responses={
+        200: {
+            "description": "Write-behind queue status",
+            "content": {
+                "application/json": {
+                    "example": {"enabled": True, "depth": 3, "failed": 0}
+                }
+            },
+        }
+    },
+)
+async def get_write_behind_queue():
+    """
+    Report how many UI submissions are waiting in the write-behind queue, and
+    how many the database rejected when they were flushed.
+
+    `enabled` is false (and the counts 0) unless WRITE_BEHIND is on.
+    """
+    queue = get_queue()
+    if queue is None:
+        return {"enabled": False, "depth": 0, "failed": 0}
+    return {"enabled": True, "depth": queue.depth(), "failed": queue.failed_count()}
+
+
+@router.get(
+    "/transactions/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Archived and live transactions as CSV",
+            "content": {
+                "text/csv": {
+                    "example": "id,timestamp,token,amount,total_usd,stable_coin\n"
+                    "1,2025-03-01T10:00:00,ETH,1.5,-3000,USDC\n"
+                }
+            },
+        }
+    },
+)
+async def export_transactions(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    token: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Stream transactions with start <= timestamp < end as CSV, ordered by
+    timestamp, reading archived months from their Parquet files.
+    """
+    tokens = [token] if token else None
+
+    def lines():
+        # The request's session may be closed before streaming ends
+        with Session(db.get_bind()) as session:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(
+                ["id", "timestamp", "token", "amount", "total_usd", "stable_coin"]
+            )
+            for i, (id, timestamp, *values) in enumerate(
+                iter_transactions(session, start, end, tokens), 1
+            ):
+                writer.writerow([id, timestamp.isoformat(), *values])
+                if i % 1000 == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+
+    return StreamingResponse(
+        lines(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="transactions.csv"'},
+    )
 
 
 @router.post(
@@ -346,6 +716,10 @@ async def get_token(token_name: str, db: Session = Depends(get_db)):
 )
 async def extract_transactions_from_image(
     image: UploadFile = File(...),
+    idempotent: bool = Query(
+        False,
+        description="Skip transactions that are already stored instead of reporting them as failures",
+    ),
     db: Session = Depends(get_db),
 ):
     """
@@ -356,7 +730,8 @@ async def extract_transactions_from_image(
 
     ## How It Works
     1. **OCR Processing**: Extracts text from the uploaded image using EasyOCR
-    2. **Pattern Matching**: Searches for "Contract Interaction" sections in the extracted text
+    2. **Layout Detection**: A single pass over the text finds the first fingerprint of a
+       registered layout (see `app/parsers.py`); Debank's is "Contract Interaction"
     3. **Transaction Parsing**: Uses regex patterns to identify:
        - Amounts with +/- signs and token symbols
        - Timestamps in format YYYY/MM/DD HH:MM:SS
@@ -376,7 +751,15 @@ async def extract_transactions_from_image(
     - `status`: "success" (if any transactions added) or "info" (if none found)
     - `message`: Summary of processing results
     - `details`: Array of successfully processed transactions with full transaction data
-    - `failed`: Array of parsing failures with error descriptions
+    - `failed`: Array of parsing failures with error descriptions. Tickers one
+      edit away from a known token that are not a typical OCR misread (e.g.
+      `USDT` with only `USDC` registered) are not stored; their entry carries
+      `suggestions` mapping the ticker to the known token.
+    - `layout`: Screenshot layout the text was recognised as (e.g. `debank`)
+    - `corrections`: Misread token symbols snapped to a known token, with the
+      edit distance and a confidence score (e.g. `USOC` → `USDC`, 0.75).
+      Only look-alike characters (O/D, O/0, I/1/l, B/8, S/5) and characters
+      read twice (`AAVVE` → `AAVE`) are snapped.
 
     ### Transaction Details Include
     - `id`: Database ID of the created transaction
@@ -390,6 +773,11 @@ async def extract_transactions_from_image(
     - **Mixed Signs**: `+1000 USDC` and `0.5 ETH` → Unsigned amount treated as outgoing
     - **Missing Data**: Transactions missing timestamps or amounts will appear in `failed` array
 
+    ## Re-importing Overlapping Screenshots
+    With `?idempotent=true` the extracted transactions are stored in one batch
+    and rows already present (same token and timestamp) are skipped rather
+    than listed in `failed`. The response adds `inserted` and `skipped` counts.
+
     ## Error Handling
     - **Parse Failures**: Individual transaction parsing errors are collected in `failed` array
     - **Validation Errors**: Database validation failures (missing tokens, etc.) are included
@@ -410,10 +798,292 @@ async def extract_transactions_from_image(
 
     try:
 
-        return await extract_transactions_from_image_upload(image, db)
+        return await extract_transactions_from_image_upload(image, db, idempotent)
 
     except Exception as e:
         return JSONResponse(
             content={"error": f"Failed to process image: {str(e)}"},
             status_code=500,
         )
+
+
+@router.post(
+    "/ocr/reparse",
+    response_class=JSONResponse,
+    summary="Re-parse stored OCR results",
+    responses={
+        200: {
+            "description": "Stored screenshots replayed through the current parsers",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "screenshots": 12,
+                        "transactions": 30,
+                        "inserted": 4,
+                        "skipped": 26,
+                        "failed": [],
+                        "corrections": [],
+                    }
+                }
+            },
+        },
+    },
+)
+async def reparse_ocr_results_api(
+    all: bool = Query(
+        False,
+        description="Replay every stored screenshot, not only those whose last parse failed",
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Replay stored OCR output through the current parsers without re-running OCR.
+
+    Every upload to /api/transactions/extract keeps its OCR boxes and text.
+    After a parser fix or a token registration, this re-parses the
+    screenshots that previously yielded nothing, had failures or had
+    transactions rejected (e.g. for an unknown token) and stores the
+    recovered transactions, skipping ones that already exist.
+    """
+    return reparse_stored_results(db, include_parsed=all)
+
+
+@router.post(
+    "/prices/sync",
+    response_class=JSONResponse,
+    responses={
+        200: {
+            "description": "Prices stored; prices already known are kept",
+            "content": {"application/json": {"example": {"inserted": 3, "skipped": 1}}},
+        },
+        400: {
+            "description": "Unreadable CSV",
+            "content": {
+                "application/json": {
+                    "example": {"error": "Line 2: cannot read price_usd 'n/a'"}
+                }
+            },
+        },
+    },
+)
+async def sync_prices_api(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    Import a price series from an uploaded CSV file.
+
+    The file needs a `token,timestamp,price_usd` header with ISO 8601
+    timestamps. A price already stored for the same token and moment is
+    kept, so the same file can be synced repeatedly.
+    """
+    try:
+        rows = parse_prices_csv((await file.read()).decode("utf-8-sig"))
+    except (UnicodeDecodeError, ValueError) as e:
+        return JSONResponse(
+            content={"error": str(e)}, status_code=status.HTTP_400_BAD_REQUEST
+        )
+    return store_prices(rows, db, "csv")
+
+
+@router.post(
+    "/prices/trades",
+    response_class=JSONResponse,
+    responses={
+        200: {
+            "description": "Implied trade prices stored",
+            "content": {
+                "application/json": {"example": {"inserted": 12, "skipped": 0}}
+            },
+        },
+    },
+)
+async def import_trade_prices_api(db: Session = Depends(get_db)):
+    """
+    Store the execution price implied by each transaction (|total_usd / amount|).
+    """
+    return import_trade_prices(db)
+
+
+@router.get(
+    "/prices/{token_name}",
+    response_class=JSONResponse,
+    responses={
+        200: {
+            "description": "Latest price at or before the requested moment",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "token": "ETH",
+                        "at": "2025-04-18T10:30:00",
+                        "price_usd": 1586.2,
+                    }
+                }
+            },
+        },
+        404: {
+            "description": "No price known at that moment",
+            "content": {
+                "application/json": {
+                    "example": {"error": "No price for 'ETH' at 2020-01-01T00:00:00."}
+                }
+            },
+        },
+    },
+)
+async def get_price(
+    token_name: str,
+    at: datetime = Query(..., description="Moment to look the price up at"),
+    db: Session = Depends(get_db),
+):
+    """
+    Look up a token's price as of a moment: the latest price at or before it.
+    """
+    sync_data_version(db)
+    price = get_price_store(db).price_at(token_name, at)
+    if price is None:
+        return JSONResponse(
+            content={"error": f"No price for '{token_name}' at {at.isoformat()}."},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+    return {"token": token_name, "at": at.isoformat(), "price_usd": price}
+
+
+@router.get(
+    "/portfolio/value",
+    response_class=JSONResponse,
+    responses={
+        200: {
+            "description": "Portfolio value and unrealized P&L over a time range",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "timestamps": ["2025-04-01T00:00:00", "2025-04-02T00:00:00"],
+                        "value_usd": [1000.0, 1100.0],
+                        "net_usd": [-1000.0, -1000.0],
+                        "unrealized_pnl": [0.0, 100.0],
+                        "unpriced": [],
+                    }
+                }
+            },
+        },
+        400: {
+            "description": "Empty time range",
+            "content": {
+                "application/json": {"example": {"error": "start must be before end"}}
+            },
+        },
+    },
+)
+async def get_portfolio_value(
+    start: datetime,
+    end: datetime,
+    points: int = Query(50, ge=2, le=1000),
+    token: Optional[str] = Query(
+        None, description="Only value this token and the tokens equivalent to it"
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Value the holdings built up by stored transactions at `points` evenly
+    spaced moments from start to end, using as-of prices.
+
+    `net_usd` is the cumulative USD flow (spent negative), and
+    `unrealized_pnl` is value_usd + net_usd. Tokens held at some moment
+    without a known price are listed in `unpriced` and counted at zero.
+    """
+    try:
+        timestamps = time_range(start, end, points)
+    except ValueError as e:
+        return JSONResponse(
+            content={"error": str(e)}, status_code=status.HTTP_400_BAD_REQUEST
+        )
+    sync_data_version(db)
+    tokens = None
+    if token:
+        graph = get_token_graph(db)
+        tokens = graph.members(graph.resolve(token)[0])
+    result = portfolio_values(db, get_price_store(db), timestamps, tokens)
+    return {
+        "timestamps": [t.isoformat() for t in timestamps.astype(datetime)],
+        "value_usd": result["value_usd"].round(2).tolist(),
+        "net_usd": result["net_usd"].round(2).tolist(),
+        "unrealized_pnl": result["unrealized_pnl"].round(2).tolist(),
+        "unpriced": result["unpriced"],
+    }
+
+
+_ANALYTICS_DISABLED = {"error": "Analytics are disabled; set ANALYTICS=true"}
+
+
+def _analytics_response(compute):
+    store = get_store()
+    if store is None:
+        return JSONResponse(
+            content=_ANALYTICS_DISABLED,
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    return jsonable_encoder(compute(store))
+
+
+# The analytics endpoints only read the DuckDB mirror; plain functions so
+# FastAPI runs their scans in its thread pool instead of the event loop.
+@router.get(
+    "/analytics/status",
+    responses={
+        200: {
+            "description": "Analytics mirror status",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "rows": 1200,
+                        "high_water_id": 1234,
+                        "high_water_timestamp": "2025-03-01T10:00:00",
+                        "synced_at": "2025-03-01T10:00:02",
+                    }
+                }
+            },
+        },
+        503: {
+            "description": "ANALYTICS is off",
+            "content": {"application/json": {"example": _ANALYTICS_DISABLED}},
+        },
+    },
+)
+def get_analytics_status():
+    """
+    Report how many transactions the analytics mirror holds, the highest id
+    and timestamp among them, and when it last synced.
+    """
+    return _analytics_response(lambda store: store.status())
+
+
+@router.get("/analytics/rolling")
+def get_rolling_flows(
+    days: int = Query(7, ge=1, le=3660, description="Window length in days"),
+    token: Optional[str] = None,
+):
+    """
+    Daily transaction count and net amount and USD flow, with their sums
+    over the `days` calendar days ending on each day (`window`). Days
+    without transactions are left out.
+    """
+    return _analytics_response(lambda store: rolling_flows(store, days, token))
+
+
+@router.get("/analytics/histogram")
+def get_trade_size_histogram(
+    bins: int = Query(20, ge=1, le=1000),
+    token: Optional[str] = None,
+):
+    """
+    Count transactions by USD size (|total_usd|) in equal-width bins
+    between the smallest and largest size.
+    """
+    return _analytics_response(lambda store: trade_size_histogram(store, bins, token))
+
+
+@router.get("/analytics/cohorts")
+def get_cohort_stats():
+    """
+    Group tokens by the month of their first transaction and report each
+    cohort's token and transaction counts, USD spent and net USD flow.
+    """
+    return _analytics_response(cohort_stats)
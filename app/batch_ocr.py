@@ -0,0 +1,192 @@
+"""
+Offline OCR of a directory of screenshots.
+
+Used by `python -m app.cli batch-ocr` for backfills, so hundreds of
+screenshots don't have to go through the web service one upload at a time.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, Optional
+
+import torch
+from sqlalchemy.orm import Session
+
+from app.cache import sync_data_version
+from app.logic.token_matching import get_token_index
+from app.logic.transactions import ingest_transactions
+from app.ocr import (
+    get_reader,
+    recognize_image,
+    record_rejections,
+    snap_token_symbols,
+    store_ocr_result,
+)
+from app.parsers import parse_screenshot
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def find_screenshots(directory: str) -> list[Path]:
+    return sorted(
+        path
+        for path in Path(directory).rglob("*")
+        if path.is_file() and path.suffix.lower() in IMAGE_SUFFIXES
+    )
+
+
+def read_checkpoint(output: str) -> set[str]:
+    """Hashes of the screenshots an earlier run already wrote to `output`."""
+    if not os.path.exists(output):
+        return set()
+    done = set()
+    with open(output, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run
+                continue
+            if "error" not in record:
+                done.add(record["sha256"])
+    return done
+
+
+def _init_worker():
+    # One warm reader per process; the pool provides the parallelism
+    torch.set_num_threads(1)
+    get_reader()
+
+
+def ocr_screenshot(path: Path) -> dict:
+    """OCR and parse one screenshot; runs in a pool worker."""
+    contents = path.read_bytes()
+    record = {"file": str(path), "sha256": hashlib.sha256(contents).hexdigest()}
+    try:
+        boxes, text = recognize_image(contents)
+    except Exception as e:
+        return {**record, "error": f"{type(e).__name__}: {e}"}
+    return {**record, "boxes": boxes, "text": text, "parsed": parse_screenshot(text)}
+
+
+def _ocr_all(paths: list[Path], workers: int) -> Iterator[dict]:
+    if workers == 1:
+        get_reader()
+        yield from map(ocr_screenshot, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # map keeps directory order and yields as soon as the next file is done
+        yield from pool.map(ocr_screenshot, paths)
+
+
+def _insert(results: list[dict], db: Session) -> dict:
+    for r in results:
+        store_ocr_result(db, r["sha256"], r["boxes"], r["text"], r["parsed"])
+    sync_data_version(db)
+    index = get_token_index(db)
+    transactions, held_back, snapped_by_result = [], [], []
+    for r in results:
+        snapped, _, held = snap_token_symbols(r["parsed"].transactions, index)
+        transactions += snapped
+        held_back += held
+        snapped_by_result.append(snapped)
+    result = ingest_transactions(transactions, db)
+    result["failed"] = held_back + result["failed"]
+    for r, snapped in zip(results, snapped_by_result):
+        record_rejections(
+            db, r["sha256"], r["parsed"].transactions + snapped, result["failed"]
+        )
+    db.commit()
+    return result
+
+
+def _to_line(result: dict) -> str:
+    if "error" in result:
+        record = result
+    else:
+        parsed = result["parsed"]
+        record = {
+            "file": result["file"],
+            "sha256": result["sha256"],
+            "layout": parsed.layout,
+            "transactions": [t.model_dump(mode="json") for t in parsed.transactions],
+            "failures": parsed.failures,
+        }
+    return json.dumps(record) + "\n"
+
+
+def batch_ocr(
+    directory: str,
+    output: str,
+    workers: int = 0,
+    db: Optional[Session] = None,
+    batch_size: int = 50,
+) -> dict:
+    """
+    OCR every screenshot under `directory`, appending one JSON line per file.
+
+    The output doubles as the checkpoint: screenshots whose hash is already
+    in it are skipped, so an interrupted run picks up where it stopped. When
+    a session is given, raw OCR results are stored and the transactions of
+    every `batch_size` screenshots are bulk-inserted with
+    ingest_transactions before their lines are written, so a checkpointed
+    screenshot is always in the database too.
+
+    Args:
+        directory (str): Folder searched recursively for screenshots
+        output (str): JSONL file to append to
+        workers (int): OCR processes, 0 for one per CPU core
+        db (Session): Optional session to insert the transactions with
+        batch_size (int): Screenshots per insert
+
+    Returns:
+        dict: screenshots processed and skipped, transactions parsed, parse
+        failures, unreadable files and, with a session, inserted/skipped counts
+    """
+    done = read_checkpoint(output)
+    screenshots = find_screenshots(directory)
+    paths = []
+    for path in screenshots:
+        sha256 = hashlib.sha256(path.read_bytes()).hexdigest()
+        if sha256 not in done:
+            # Also drops copies of the same screenshot within this run
+            done.add(sha256)
+            paths.append(path)
+
+    summary = {
+        "processed": len(paths),
+        "skipped": len(screenshots) - len(paths),
+        "transactions": 0,
+        "failures": 0,
+        "errors": 0,
+    }
+    if db is not None:
+        summary.update(inserted=0, duplicates=0, invalid=0)
+
+    def write(batch: list[dict], f):
+        if db is not None:
+            result = _insert([r for r in batch if "error" not in r], db)
+            summary["inserted"] += result["inserted"]
+            summary["duplicates"] += result["skipped"]
+            summary["invalid"] += len(result["failed"])
+        f.writelines(_to_line(r) for r in batch)
+        f.flush()
+
+    with open(output, "a", encoding="utf-8") as f:
+        batch = []
+        for result in _ocr_all(paths, workers or os.cpu_count()):
+            if "error" in result:
+                summary["errors"] += 1
+            else:
+                summary["transactions"] += len(result["parsed"].transactions)
+                summary["failures"] += len(result["parsed"].failures)
+            batch.append(result)
+            if len(batch) == batch_size:
+                write(batch, f)
+                batch = []
+        if batch:
+            write(batch, f)
+    return summary
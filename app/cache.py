@@ -0,0 +1,244 @@
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from threading import Lock
+from typing import Callable, Optional
+
+from fastapi import Request
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models import SharedVersion
+
+# Row in data_versions holding the shared counter.
+_DATA_VERSION_NAME = "data"
+
+# Stands in for the git commit when it is unknown. Generated at import, so
+# under gunicorn's preload every worker of one server shares it.
+_BOOT_ID = secrets.token_hex(4)
+_STARTED_AT = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class DataVersion:
+    """
+    Counter bumped after every committed write to tokens or transactions.
+
+    Read-only pages derive their validators from it: as long as the version
+    is unchanged, the rendered output is unchanged too. The counter mirrors
+    the data_versions row, so that every worker sees the writes of every
+    other process, CLI imports included, whatever the number of workers.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.version = 0
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self.synced_at = None
+
+    def adopt(self, version: int, last_modified: datetime) -> bool:
+        """Take over the shared version; returns True if it changed."""
+        with self._lock:
+            self.synced_at = time.monotonic()
+            if version == self.version:
+                return False
+            self.version = version
+            self.last_modified = last_modified.replace(
+                tzinfo=timezone.utc, microsecond=0
+            )
+            return True
+
+
+class FragmentCache:
+    """
+    LRU cache of rendered HTML fragments.
+
+    Entries are keyed by template, variant and data version, so a fragment
+    rendered before a write can never be served after it; bumping the data
+    version also clears the cache to release the stale entries right away.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(
+        self, template: str, variant: str, render: Callable[[], str]
+    ) -> str:
+        """
+        Return the cached fragment or call `render` and cache its output.
+
+        `render` is only invoked on a miss, so any queries it runs are skipped
+        for repeat requests.
+        """
+        key = (template, variant, data_version.version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        html = render()
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+data_version = DataVersion()
+fragment_cache = FragmentCache()
+
+
+def _read_shared_version(db: Session):
+    return db.execute(
+        select(SharedVersion.version, SharedVersion.updated_at).where(
+            SharedVersion.name == _DATA_VERSION_NAME
+        )
+    ).first()
+
+
+def _next_modified(previous: Optional[datetime]) -> datetime:
+    now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    if previous is None:
+        return now
+    # Last-Modified has a one-second resolution: a second write within the
+    # same second must still move it, or If-Modified-Since gets a stale 304.
+    return max(now, previous.replace(microsecond=0) + timedelta(seconds=1))
+
+
+def _publish_shared_version(db: Session):
+    row = _read_shared_version(db)
+    if row is None:
+        # Database created without migrations (e.g. tests): seed the row.
+        db.add(
+            SharedVersion(
+                name=_DATA_VERSION_NAME, version=1, updated_at=_next_modified(None)
+            )
+        )
+    else:
+        bumped = db.execute(
+            update(SharedVersion)
+            .where(
+                SharedVersion.name == _DATA_VERSION_NAME,
+                SharedVersion.version == row.version,
+            )
+            .values(version=row.version + 1, updated_at=_next_modified(row.updated_at))
+        )
+        if bumped.rowcount == 0:
+            # Another process bumped it since we read it; start over.
+            db.rollback()
+            return _publish_shared_version(db)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker seeded the row first; bump the one it created.
+        db.rollback()
+        return _publish_shared_version(db)
+    return _read_shared_version(db)
+
+
+def bump_data_version(db: Session):
+    """
+    Record that tokens or transactions changed. Call after commit.
+
+    The shared counter in data_versions is incremented, so other processes
+    drop their cached pages on their next sync. Its modification date moves
+    forward by at least a second, so date validators change with it.
+    """
+    data_version.adopt(*_publish_shared_version(db))
+    fragment_cache.clear()
+
+
+def sync_data_version(db: Session):
+    """
+    Pick up writes made by other processes: other workers, or the CLI.
+
+    The data_versions row is read at most once per DATA_VERSION_POLL_INTERVAL,
+    which bounds how long a stale cached page may be served after a write.
+    """
+    synced_at = data_version.synced_at
+    interval = get_settings().data_version_poll_interval
+    if synced_at is not None and time.monotonic() - synced_at < interval:
+        return
+
+    row = _read_shared_version(db)
+    if row is None:
+        data_version.synced_at = time.monotonic()
+    elif data_version.adopt(*row):
+        fragment_cache.clear()
+
+
+def _release() -> str:
+    commit = get_settings().git_commit
+    return _BOOT_ID if commit == "unknown" else commit[:12]
+
+
+def _last_modified() -> datetime:
+    # A deploy changes pages without a write; dates from before it are stale
+    return max(data_version.last_modified, _STARTED_AT)
+
+
+def cache_headers(variant: str) -> dict:
+    """
+    Build validator headers for a read-only response.
+
+    Args:
+        variant (str): Everything besides the data that shapes the body, e.g.
+            the route, path parameters, HTMX partial vs full page, git commit
+
+    Returns:
+        dict: ETag, Last-Modified, Cache-Control and Vary headers
+    """
+    digest = hashlib.sha1(variant.encode()).hexdigest()[:12]
+    # The data version survives restarts, so the tag also names the release:
+    # a deploy may change templates or response shapes without any write.
+    return {
+        "ETag": f'"{_release()}-{data_version.version}-{digest}"',
+        "Last-Modified": format_datetime(_last_modified(), usegmt=True),
+        # Cache, but always revalidate: writes must show up on the next load.
+        "Cache-Control": "no-cache",
+        "Vary": "HX-Request",
+    }
+
+
+def is_not_modified(request: Request, headers: dict) -> bool:
+    """
+    Check the request's conditional headers against `cache_headers` output.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        ]
+        return headers["ETag"] in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _last_modified() <= since
+
+    return False
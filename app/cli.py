@@ -0,0 +1,220 @@
+"""
+Maintenance commands.
+
+Run with: python -m app.cli <command> [args]
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import get_engine
+from app.logic.archive import archive_transactions, ensure_partitions, month_start
+from app.logic.checkpoints import build_checkpoints
+from app.logic.prices import import_trade_prices, parse_prices_csv, store_prices
+from app.logic.tokens import parse_tokens_csv, register_tokens
+
+
+def sync_tokens(args) -> int:
+    with open(args.csv_file, encoding="utf-8-sig") as f:
+        try:
+            entries = parse_tokens_csv(f.read())
+        except ValueError as e:
+            print(f"{args.csv_file}: {e}", file=sys.stderr)
+            return 2
+
+    with Session(get_engine()) as db:
+        result = register_tokens(entries, db)
+
+    for item in result["results"]:
+        if "error" in item:
+            print(f"{item['status_code']} {item['error']}", file=sys.stderr)
+    print(
+        f"created {result['created']}, existing {result['existing']}, "
+        f"conflicts {result['conflicts']}, invalid {result['invalid']}"
+    )
+    return 1 if result["conflicts"] or result["invalid"] else 0
+
+
+def sync_prices(args) -> int:
+    rows = []
+    if args.csv_file:
+        with open(args.csv_file, encoding="utf-8-sig") as f:
+            try:
+                rows = parse_prices_csv(f.read())
+            except ValueError as e:
+                print(f"{args.csv_file}: {e}", file=sys.stderr)
+                return 2
+
+    with Session(get_engine()) as db:
+        if rows:
+            result = store_prices(rows, db, "csv")
+            print(f"csv: inserted {result['inserted']}, skipped {result['skipped']}")
+        if args.trades:
+            result = import_trade_prices(db)
+            print(f"trades: inserted {result['inserted']}, skipped {result['skipped']}")
+    return 0
+
+
+def archive(args) -> int:
+    if args.before:
+        try:
+            before = datetime.strptime(args.before, "%Y-%m")
+        except ValueError:
+            print(f"--before: expected YYYY-MM, got '{args.before}'", file=sys.stderr)
+            return 2
+    else:
+        keep = args.keep_months or get_settings().archive_keep_months
+        before = month_start(datetime.now(timezone.utc))
+        for _ in range(keep - 1):
+            before = month_start(before - timedelta(days=1))
+
+    with Session(get_engine()) as db:
+        result = archive_transactions(db, before, args.directory)
+    print(f"archived {result['months']} months, {result['rows']} transactions")
+    return 0
+
+
+def partition(args) -> int:
+    with Session(get_engine()) as db:
+        created = ensure_partitions(db, args.months_ahead)
+    print(f"created {len(created)} partitions" + "".join(f"\n  {n}" for n in created))
+    return 0
+
+
+def checkpoint(args) -> int:
+    with Session(get_engine()) as db:
+        taken = build_checkpoints(db, args.every)
+    print(f"took {taken} checkpoints")
+    return 0
+
+
+def reparse_ocr(args) -> int:
+    # app.ocr pulls in torch; import it only for the commands that need it
+    from app.ocr import reparse_stored_results
+
+    with Session(get_engine()) as db:
+        result = reparse_stored_results(db, include_parsed=args.all)
+
+    for failure in result["failed"]:
+        print(f"failed: {failure['error']}", file=sys.stderr)
+    print(
+        f"screenshots {result['screenshots']}, transactions {result['transactions']}, "
+        f"inserted {result['inserted']}, skipped {result['skipped']}, "
+        f"failed {len(result['failed'])}"
+    )
+    return 0
+
+
+def batch_ocr(args) -> int:
+    # app.ocr pulls in torch; import it only for the commands that need it
+    from app.batch_ocr import batch_ocr
+
+    if args.insert:
+        with Session(get_engine()) as db:
+            summary = batch_ocr(args.directory, args.output, args.workers, db)
+    else:
+        summary = batch_ocr(args.directory, args.output, args.workers)
+
+    print(", ".join(f"{key} {value}" for key, value in summary.items()))
+    return 1 if summary["errors"] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync = commands.add_parser(
+        "sync-tokens", help="register the tokens listed in a token,is_stable CSV"
+    )
+    sync.add_argument("csv_file")
+    sync.set_defaults(handler=sync_tokens)
+
+    prices = commands.add_parser(
+        "sync-prices", help="import prices from a token,timestamp,price_usd CSV"
+    )
+    prices.add_argument("csv_file", nargs="?")
+    prices.add_argument(
+        "--trades",
+        action="store_true",
+        help="also store the prices implied by the stored transactions",
+    )
+    prices.set_defaults(handler=sync_prices)
+
+    reparse = commands.add_parser(
+        "reparse-ocr", help="re-run the parsers over stored OCR results"
+    )
+    reparse.add_argument(
+        "--all",
+        action="store_true",
+        help="replay every stored screenshot, not only failed ones",
+    )
+    reparse.set_defaults(handler=reparse_ocr)
+
+    batch = commands.add_parser(
+        "batch-ocr",
+        help="OCR a directory of screenshots into JSONL, skipping files already in it",
+    )
+    batch.add_argument("directory")
+    batch.add_argument("--output", default="ocr_results.jsonl")
+    batch.add_argument(
+        "--workers", type=int, default=0, help="OCR processes (default: one per core)"
+    )
+    batch.add_argument(
+        "--insert",
+        action="store_true",
+        help="also store the transactions and raw OCR results in the database",
+    )
+    batch.set_defaults(handler=batch_ocr)
+
+    archive_cmd = commands.add_parser(
+        "archive-transactions",
+        help="move closed months of transactions to Parquet files",
+    )
+    archive_cmd.add_argument(
+        "--before", help="archive the months before this one (YYYY-MM)"
+    )
+    archive_cmd.add_argument(
+        "--keep-months",
+        type=int,
+        default=0,
+        help="months to keep in the database, the current one included "
+        "(default: ARCHIVE_KEEP_MONTHS)",
+    )
+    archive_cmd.add_argument(
+        "--directory", help="archive directory (default: ARCHIVE_DIR)"
+    )
+    archive_cmd.set_defaults(handler=archive)
+
+    partition_cmd = commands.add_parser(
+        "partition-transactions",
+        help="create upcoming monthly partitions of the transactions table (Postgres)",
+    )
+    partition_cmd.add_argument("--months-ahead", type=int, default=3)
+    partition_cmd.set_defaults(handler=partition)
+
+    checkpoint_cmd = commands.add_parser(
+        "build-checkpoints",
+        help="take the missing holding checkpoints for point-in-time queries",
+    )
+    checkpoint_cmd.add_argument(
+        "--every",
+        type=int,
+        default=0,
+        help="transactions between checkpoints (default: CHECKPOINT_EVERY)",
+    )
+    checkpoint_cmd.set_defaults(handler=checkpoint)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
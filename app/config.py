@@ -1,5 +1,6 @@
 import os
 from functools import lru_cache
+from typing import Literal
 
 from pydantic import ConfigDict, Field
 from pydantic_settings import BaseSettings
@@ -12,6 +13,88 @@ class Settings(BaseSettings):
         "unknown", validation_alias="RENDER_GIT_COMMIT"
     )  # fallback handled below
 
+    # Number of gunicorn worker processes.
+    web_concurrency: int = Field(1, validation_alias="WEB_CONCURRENCY")
+    port: int = Field(10000, validation_alias="PORT")
+    # Load OCR models in the gunicorn master so workers share them.
+    preload_ocr: bool = Field(True, validation_alias="PRELOAD_OCR")
+    # How often (seconds) a worker re-reads the shared data version, which
+    # other workers and the CLI bump on every write.
+    data_version_poll_interval: float = Field(
+        1.0, validation_alias="DATA_VERSION_POLL_INTERVAL"
+    )
+
+    # "rows" regroups OCR boxes into lines by geometry, "text" joins them in
+    # reader order; boxes below the confidence threshold are dropped in
+    # "rows" mode.
+    ocr_layout_mode: Literal["rows", "text"] = Field(
+        "rows", validation_alias="OCR_LAYOUT_MODE"
+    )
+    ocr_min_confidence: float = Field(0.3, validation_alias="OCR_MIN_CONFIDENCE")
+    # "quantized" runs EasyOCR's dynamic int8 models, "fp32" full precision.
+    ocr_backend: Literal["quantized", "fp32"] = Field(
+        "quantized", validation_alias="OCR_BACKEND"
+    )
+    # dbnet18 is a lighter text detector than craft; the recognizer can be
+    # swapped for any network present in the EasyOCR model directory.
+    ocr_detect_network: Literal["craft", "dbnet18"] = Field(
+        "craft", validation_alias="OCR_DETECT_NETWORK"
+    )
+    ocr_recog_network: str = Field("standard", validation_alias="OCR_RECOG_NETWORK")
+    # torch intra-op threads for OCR inference; 0 keeps torch's default.
+    ocr_torch_threads: int = Field(0, validation_alias="OCR_TORCH_THREADS")
+    # Images taller than 1.5 tiles are OCR'd as overlapping horizontal strips
+    # in parallel worker processes; 0 disables tiling. The overlap must be
+    # taller than a line of text.
+    ocr_tile_height: int = Field(0, validation_alias="OCR_TILE_HEIGHT")
+    ocr_tile_overlap: int = Field(80, validation_alias="OCR_TILE_OVERLAP")
+    # Worker processes for tiled OCR, each loading its own reader; 0 uses one
+    # per CPU core. Capped at cpu_count // WEB_CONCURRENCY per server worker.
+    ocr_tile_workers: int = Field(0, validation_alias="OCR_TILE_WORKERS")
+
+    # Acknowledge UI form submissions once they are journaled locally and
+    # write them to the database in batches from a background thread. The
+    # journal must be an absolute path on persistent storage, shared by all
+    # workers; there is no default.
+    write_behind: bool = Field(False, validation_alias="WRITE_BEHIND")
+    write_behind_path: str = Field("", validation_alias="WRITE_BEHIND_PATH")
+    write_behind_batch_size: int = Field(500, validation_alias="WRITE_BEHIND_BATCH")
+    # Seconds between flush retries while the database is unreachable.
+    write_behind_interval: float = Field(1.0, validation_alias="WRITE_BEHIND_INTERVAL")
+
+    # Closed months of transactions are moved to Parquet files here by
+    # `python -m app.cli archive-transactions`, which keeps this many recent
+    # months (including the current one) in the database by default.
+    archive_dir: str = Field("archive", validation_alias="ARCHIVE_DIR")
+    archive_keep_months: int = Field(12, validation_alias="ARCHIVE_KEEP_MONTHS")
+
+    # Holdings are checkpointed every this many transactions and at the end
+    # of every day with transactions, for point-in-time queries.
+    checkpoint_every: int = Field(1000, validation_alias="CHECKPOINT_EVERY")
+
+    # Mirror transactions into an embedded DuckDB database from a background
+    # thread and serve /api/analytics from it. An empty path keeps the mirror
+    # in memory, one per worker; a file path keeps it across restarts but
+    # can only be opened by one process (WEB_CONCURRENCY=1).
+    analytics: bool = Field(False, validation_alias="ANALYTICS")
+    analytics_path: str = Field("", validation_alias="ANALYTICS_PATH")
+    # Seconds between syncs, i.e. how far the analytics may lag behind.
+    analytics_sync_interval: float = Field(
+        2.0, validation_alias="ANALYTICS_SYNC_INTERVAL"
+    )
+
+    # Live UI updates (/ui/events): events buffered per open page before it
+    # is cut off and made to catch up from the database, and seconds between
+    # keep-alives, at which streams also poll the database for rows written
+    # by other workers or the CLI.
+    event_queue_size: int = Field(100, validation_alias="EVENT_QUEUE_SIZE")
+    event_heartbeat: float = Field(15.0, validation_alias="EVENT_HEARTBEAT")
+
+    # Requests carrying this token in the X-Profile header are profiled;
+    # profiling is disabled while it is empty.
+    profiling_token: str = Field("", validation_alias="PROFILING_TOKEN")
+    profile_dir: str = Field("profiles", validation_alias="PROFILE_DIR")
+
     model_config = ConfigDict(env_file=".env")
 
     # fallback to GIT_COMMIT if RENDER_GIT_COMMIT is not set
@@ -1,34 +1,112 @@
+import sqlite3
+import threading
+from decimal import Decimal
 from typing import Generator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
 from app.config import get_settings
 
 Base = declarative_base()
 
-# Lazy instantiation
+# Lazy instantiation. The warm-up thread and the first requests may all ask
+# for the engine at once; the lock makes sure only one is ever created.
 _engine = None
 _SessionLocal = None
+_engine_lock = threading.Lock()
 
 
-def get_db() -> Generator[Session, None, None]:
-    global _engine, _SessionLocal
+def to_decimal(value) -> Decimal:
+    """Convert a DB or float value to Decimal without binary float noise."""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(repr(value) if isinstance(value, float) else str(value))
 
-    settings = get_settings()
 
-    if _engine is None or _SessionLocal is None:
-        connect_args = (
-            {"check_same_thread": False} if "sqlite" in settings.database_url else {}
+class _DecimalSum:
+    """SQLite aggregate summing NUMERIC values exactly.
+
+    SQLite keeps NUMERIC columns as REAL, so the built-in SUM accumulates
+    binary rounding error. Values hold at most 15 significant digits, which
+    repr() round-trips exactly, so summing them as Decimal is exact.
+    """
+
+    def __init__(self):
+        self.total = None
+
+    def step(self, value):
+        # Hot path: called once per row, so keep it to a single conversion.
+        if value is not None:
+            if self.total is None:
+                self.total = Decimal(0)
+            self.total += Decimal(repr(value))
+
+    def finalize(self):
+        # Returned as text; SQLite has no exact numeric storage class.
+        return None if self.total is None else str(self.total)
+
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_aggregate("decimal_sum", 1, _DecimalSum)
+
+
+def insert_ignoring_duplicates(db: Session, model, index_elements: list):
+    """
+    Build an INSERT into `model` that skips rows clashing with a unique key.
+
+    Uses ON CONFLICT (index_elements) DO NOTHING on SQLite and Postgres and
+    INSERT IGNORE on MySQL. Other dialects get a plain INSERT; callers
+    pre-check for existing keys, so that only fails on a concurrent writer.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql_insert(model).on_conflict_do_nothing(
+            index_elements=index_elements
         )
-        _engine = create_engine(
-            settings.database_url,
-            connect_args=connect_args,
-            pool_pre_ping=True,
-            future=True,
+    if dialect == "sqlite":
+        return sqlite_insert(model).on_conflict_do_nothing(
+            index_elements=index_elements
         )
-        _SessionLocal = sessionmaker(bind=_engine, autoflush=False, autocommit=False)
+    if dialect in ("mysql", "mariadb"):
+        return insert(model).prefix_with("IGNORE")
+    return insert(model)
+
+
+def get_engine() -> Engine:
+    """Return the application engine, creating it on first use."""
+    global _engine, _SessionLocal
 
+    if _engine is None or _SessionLocal is None:
+        with _engine_lock:
+            if _engine is None or _SessionLocal is None:
+                settings = get_settings()
+                connect_args = (
+                    {"check_same_thread": False}
+                    if "sqlite" in settings.database_url
+                    else {}
+                )
+                engine = create_engine(
+                    settings.database_url,
+                    connect_args=connect_args,
+                    pool_pre_ping=True,
+                    future=True,
+                )
+                _SessionLocal = sessionmaker(
+                    bind=engine, autoflush=False, autocommit=False
+                )
+                _engine = engine
+
+    return _engine
+
+
+def get_db() -> Generator[Session, None, None]:
+    get_engine()
     db = _SessionLocal()
 
     try:
@@ -0,0 +1,118 @@
+"""
+In-process change feed behind the live UI updates (GET /ui/events).
+
+Write paths publish what they committed; every open event stream holds a
+subscription with its own bounded queue. Publishing never waits for a
+client: a subscription that falls EVENT_QUEUE_SIZE events behind is dropped
+and its stream ends, and the browser reconnects and catches up from the
+database by the last transaction id it received. Each process has its own
+feed, so the streams also poll the database for rows written by other
+workers or the CLI.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from threading import Lock
+from typing import Iterable, Optional
+
+
+@dataclass
+class FeedEvent:
+    # "transaction" (data: the row's columns, id: its id) or "token"
+    kind: str
+    data: dict
+    id: Optional[int] = None
+    # Fragment rendered by the first stream sending the event, reused by the rest
+    rendered: Optional[str] = None
+
+
+# Put in place of the queued events when a subscription overflows
+OVERFLOW = FeedEvent("overflow", {})
+
+
+class Subscription:
+    """Bounded queue of one stream, filled from any thread, read on its loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def _offer(self, events: list[FeedEvent]):
+        if self.overflowed:
+            return
+        for event in events:
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Release the backlog now; the stream resyncs from the database
+                self.overflowed = True
+                while not self.queue.empty():
+                    self.queue.get_nowait()
+                self.queue.put_nowait(OVERFLOW)
+                return
+
+    async def get(self) -> FeedEvent:
+        return await self.queue.get()
+
+
+class ChangeFeed:
+    def __init__(self):
+        self._lock = Lock()
+        self._subscriptions: set[Subscription] = set()
+
+    def subscribe(self, maxsize: int) -> Subscription:
+        """Subscribe the calling event loop's stream."""
+        subscription = Subscription(asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscriptions)
+
+    def publish(self, events: list[FeedEvent]):
+        """Hand the events to every subscription; safe from any thread."""
+        if not events:
+            return
+        by_loop = {}
+        with self._lock:
+            for subscription in self._subscriptions:
+                by_loop.setdefault(subscription.loop, []).append(subscription)
+        # One wake-up per event loop rather than per page
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, subscriptions, events)
+            except RuntimeError:
+                # The loop is gone, e.g. a server shutting down
+                with self._lock:
+                    self._subscriptions.difference_update(subscriptions)
+
+
+def _deliver(subscriptions: list[Subscription], events: list[FeedEvent]):
+    for subscription in subscriptions:
+        subscription._offer(events)
+
+
+feed = ChangeFeed()
+
+
+TRANSACTION_FIELDS = ("id", "timestamp", "token", "amount", "total_usd", "stable_coin")
+
+
+def transaction_event(transaction) -> FeedEvent:
+    data = {field: getattr(transaction, field) for field in TRANSACTION_FIELDS}
+    return FeedEvent("transaction", data, data["id"])
+
+
+def publish_transactions(transactions: Iterable):
+    """Publish committed Transaction rows (or rows with the same columns)."""
+    feed.publish([transaction_event(t) for t in transactions])
+
+
+def publish_tokens(names: Iterable[str]):
+    feed.publish([FeedEvent("token", {"name": name}) for name in names])
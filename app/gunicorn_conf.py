@@ -0,0 +1,35 @@
+"""
+Gunicorn settings for the multi-worker deployment mode.
+
+Run with: gunicorn -c python:app.gunicorn_conf app.main:app
+"""
+
+import logging
+
+from app.config import get_settings
+
+settings = get_settings()
+
+bind = f"0.0.0.0:{settings.port}"
+workers = settings.web_concurrency
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import the app (and the OCR models, see on_starting) once in the master.
+# Forked workers then share those pages copy-on-write instead of each one
+# loading its own copy of the model weights.
+preload_app = True
+
+# OCR requests can legitimately take a while on CPU-only hosts.
+timeout = 120
+
+
+def on_starting(server):
+    if not settings.preload_ocr:
+        return
+    try:
+        from app.ocr import get_reader
+
+        get_reader()
+    except Exception as e:
+        # Workers fall back to loading the models on first use.
+        logging.getLogger("gunicorn.error").warning("OCR models not preloaded: %s", e)
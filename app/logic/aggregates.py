@@ -0,0 +1,112 @@
+from decimal import Decimal
+from typing import List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.database import to_decimal
+from app.logic.archive import archived_totals
+from app.models import Amount, Transaction
+
+_QUANTUM = Decimal(1).scaleb(-Amount.scale)
+
+
+class TokenAggregate(BaseModel):
+    """
+    Exact per-token totals over the transactions table.
+
+    Attributes:
+        token (str): The non-stablecoin token symbol
+        transactions (int): Number of transactions for the token
+        amount (Decimal): Net token amount (buys positive, sells negative)
+        total_usd (Decimal): Net USD flow (spent negative, received positive)
+        avg_amount (Decimal): Average token amount per transaction
+        avg_total_usd (Decimal): Average USD flow per transaction
+    """
+
+    token: str
+    transactions: int
+    amount: Decimal
+    total_usd: Decimal
+    avg_amount: Decimal
+    avg_total_usd: Decimal
+
+
+def exact_sum(db: Session, column):
+    """SUM of a Numeric column, exact on SQLite too."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.decimal_sum(column)
+    return func.sum(column)
+
+
+def _exact(value) -> Decimal:
+    return to_decimal(value).quantize(_QUANTUM)
+
+
+def aggregate_by_token(
+    db: Session, token: Optional[str] = None
+) -> List[TokenAggregate]:
+    """
+    Compute SUM/AVG of amounts and USD totals per token inside the database.
+
+    Postgres and MySQL aggregate the NUMERIC columns natively with SUM and
+    AVG. SQLite stores NUMERIC as REAL, so there the exact decimal_sum
+    aggregate registered in app.database is used and the averages are derived
+    from the exact sums and counts. Archived months are added from the
+    totals catalogued when they were archived.
+
+    Args:
+        db (Session): Database session
+        token (str, optional): Restrict the result to a single token
+
+    Returns:
+        List[TokenAggregate]: One entry per token, ordered by token symbol
+    """
+    sqlite = db.get_bind().dialect.name == "sqlite"
+    columns = [
+        Transaction.token,
+        func.count(Transaction.id),
+        exact_sum(db, Transaction.amount),
+        exact_sum(db, Transaction.total_usd),
+    ]
+    if not sqlite:
+        columns += [func.avg(Transaction.amount), func.avg(Transaction.total_usd)]
+
+    query = db.query(*columns)
+    if token is not None:
+        query = query.filter(Transaction.token == token)
+    rows = query.group_by(Transaction.token).order_by(Transaction.token)
+
+    totals = {
+        name: (count, to_decimal(amount), to_decimal(total_usd), averages)
+        for name, count, amount, total_usd, *averages in rows
+    }
+    archived = archived_totals(db, token)
+    for name, (count, amount, total_usd) in archived.items():
+        live_count, live_amount, live_usd, _ = totals.get(
+            name, (0, Decimal(0), Decimal(0), None)
+        )
+        # The database averages only cover the live rows
+        totals[name] = (
+            live_count + count,
+            live_amount + amount,
+            live_usd + total_usd,
+            None,
+        )
+
+    aggregates = []
+    for name in sorted(totals) if archived else totals:
+        count, amount, total_usd, averages = totals[name]
+        avg_amount, avg_total_usd = averages or (amount / count, total_usd / count)
+        aggregates.append(
+            TokenAggregate(
+                token=name,
+                transactions=count,
+                amount=_exact(amount),
+                total_usd=_exact(total_usd),
+                avg_amount=_exact(avg_amount),
+                avg_total_usd=_exact(avg_total_usd),
+            )
+        )
+    return aggregates
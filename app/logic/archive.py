@@ -0,0 +1,361 @@
+"""
+Monthly partitions of the transactions table and their cold archive.
+
+On Postgres `transactions` is range-partitioned by month on `timestamp`, with
+a default partition catching months that have no partition of their own yet;
+other databases keep one plain table. Either way, closed months can be moved
+to zstd-compressed Parquet files: Postgres detaches and drops the month's
+partition, other databases delete its rows. The transaction_archives catalog
+records each file with per-token totals, and archived months are read-only
+from then on, so every archived row predates every live one.
+"""
+
+import os
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from app.cache import bump_data_version
+from app.config import get_settings
+from app.database import to_decimal
+from app.models import Transaction, TransactionArchive
+
+ARCHIVE_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("timestamp", pa.timestamp("us")),
+        ("token", pa.string()),
+        ("amount", pa.decimal128(28, 10)),
+        ("total_usd", pa.decimal128(28, 10)),
+        ("stable_coin", pa.string()),
+    ]
+)
+
+_COLUMNS = (
+    Transaction.id,
+    Transaction.timestamp,
+    Transaction.token,
+    Transaction.amount,
+    Transaction.total_usd,
+    Transaction.stable_coin,
+)
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def next_month(month: datetime) -> datetime:
+    if month.month == 12:
+        return datetime(month.year + 1, 1, 1)
+    return datetime(month.year, month.month + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"transactions_{month:%Y_%m}"
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _table_exists(db: Session, name: str) -> bool:
+    return (
+        db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        is not None
+    )
+
+
+def _create_partition(db: Session, month: datetime):
+    """
+    Give `month` its own partition, moving its rows out of the default one.
+
+    Postgres refuses to create a partition whose range has rows in the
+    default partition, so the table is filled first and attached after.
+    """
+    name = partition_name(month)
+    bounds = {"start": month, "end": next_month(month)}
+    db.execute(
+        text(
+            f"CREATE TABLE {name} "
+            "(LIKE transactions INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+    )
+    db.execute(
+        text(
+            "WITH moved AS (DELETE FROM transactions_default "
+            "WHERE timestamp >= :start AND timestamp < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        bounds,
+    )
+    db.execute(
+        text(
+            f"ALTER TABLE transactions ATTACH PARTITION {name} "
+            f"FOR VALUES FROM ('{bounds['start']:%Y-%m-%d}') "
+            f"TO ('{bounds['end']:%Y-%m-%d}')"
+        )
+    )
+
+
+def ensure_partitions(db: Session, months_ahead: int = 3) -> list[str]:
+    """
+    Create the monthly partitions of the next `months_ahead` months, and of
+    any month whose rows ended up in the default partition.
+
+    A no-op outside Postgres. Meant to run periodically, e.g. from cron via
+    `python -m app.cli partition-transactions`.
+
+    Returns:
+        list: Names of the partitions created
+    """
+    if not _is_postgres(db):
+        return []
+    month = month_start(datetime.now(timezone.utc))
+    months = set()
+    for _ in range(months_ahead + 1):
+        months.add(month)
+        month = next_month(month)
+    months.update(
+        month_start(m)
+        for (m,) in db.execute(
+            text(
+                "SELECT DISTINCT date_trunc('month', timestamp) FROM transactions_default"
+            )
+        )
+    )
+    archived_until = get_archived_until(db)
+
+    created = []
+    for month in sorted(months):
+        if archived_until is not None and month < archived_until:
+            continue
+        if not _table_exists(db, partition_name(month)):
+            _create_partition(db, month)
+            created.append(partition_name(month))
+    db.commit()
+    return created
+
+
+def get_archived_until(db: Session) -> Optional[datetime]:
+    """End of the last archived month; earlier transactions are read-only."""
+    last = db.query(func.max(TransactionArchive.month)).scalar()
+    return next_month(last) if last is not None else None
+
+
+def archived_error(timestamp: datetime, archived_until: Optional[datetime]):
+    """Return why `timestamp` cannot be written to, or None if it can."""
+    if archived_until is not None and timestamp < archived_until:
+        return f"Transactions before '{archived_until}' are archived and read-only."
+    return None
+
+
+def transactions_table(rows: list) -> pa.Table:
+    """(id, timestamp, token, amount, total_usd, stable_coin) rows as ARCHIVE_SCHEMA."""
+    columns = zip(*rows) if rows else [[] for _ in ARCHIVE_SCHEMA]
+    return pa.Table.from_arrays(
+        [
+            pa.array(column, type=field.type)
+            for column, field in zip(columns, ARCHIVE_SCHEMA)
+        ],
+        schema=ARCHIVE_SCHEMA,
+    )
+
+
+def totals_by_token(table: pa.Table) -> dict:
+    """Transaction count and exact amount/total_usd sums (as strings) per token."""
+    # Arrow sums decimal128 columns exactly
+    grouped = table.group_by("token").aggregate(
+        [("id", "count"), ("amount", "sum"), ("total_usd", "sum")]
+    )
+    return {
+        token: {
+            "transactions": count,
+            "amount": str(amount),
+            "total_usd": str(total_usd),
+        }
+        for token, count, amount, total_usd in zip(
+            *(
+                grouped.column(name).to_pylist()
+                for name in ("token", "id_count", "amount_sum", "total_usd_sum")
+            )
+        )
+    }
+
+
+def _archive_month(db: Session, month: datetime, directory: str) -> int:
+    end = next_month(month)
+    in_month = db.query(Transaction).filter(
+        Transaction.timestamp >= month, Transaction.timestamp < end
+    )
+    rows = (
+        in_month.with_entities(*_COLUMNS)
+        .order_by(Transaction.timestamp, Transaction.id)
+        .all()
+    )
+    partition = _is_postgres(db) and _table_exists(db, partition_name(month))
+
+    if rows:
+        table = transactions_table(rows)
+        archive = db.get(TransactionArchive, month)
+        name = f"transactions-{month:%Y-%m}.parquet"
+        path = os.path.join(directory, name)
+        if archive is not None:
+            # Rows written into the month behind the read-only check's back
+            table = pa.concat_tables(
+                [pq.read_table(path, schema=ARCHIVE_SCHEMA), table]
+            )
+        # Write next to the target and rename, so a crash never leaves a
+        # truncated file behind; the rows are only removed once it is complete
+        pq.write_table(table, path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)
+        if pq.read_metadata(path).num_rows != table.num_rows:
+            raise RuntimeError(f"{path}: row count mismatch after writing")
+
+        if archive is None:
+            archive = TransactionArchive(month=month)
+            db.add(archive)
+        archive.path = name
+        archive.rows = table.num_rows
+        archive.totals = totals_by_token(table)
+        archive.archived_at = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    if partition:
+        db.execute(
+            text(f"ALTER TABLE transactions DETACH PARTITION {partition_name(month)}")
+        )
+        db.execute(text(f"DROP TABLE {partition_name(month)}"))
+    elif rows:
+        in_month.delete(synchronize_session=False)
+    db.commit()
+    return len(rows)
+
+
+def archive_transactions(
+    db: Session, before: datetime, directory: Optional[str] = None
+) -> dict:
+    """
+    Move every month ending on or before `before` to the Parquet archive.
+
+    Each month is written and checked before its rows leave the database, in
+    its own database transaction with the catalog entry, so an interrupted
+    run loses nothing and can simply be repeated.
+
+    Args:
+        db (Session): Database session
+        before (datetime): Months starting before this month are archived
+        directory (str, optional): Archive directory, ARCHIVE_DIR by default
+
+    Returns:
+        dict: Number of months archived and of rows moved
+    """
+    directory = directory or get_settings().archive_dir
+    os.makedirs(directory, exist_ok=True)
+    before = month_start(before)
+    first = (
+        db.query(func.min(Transaction.timestamp))
+        .filter(Transaction.timestamp < before)
+        .scalar()
+    )
+    summary = {"months": 0, "rows": 0}
+    if first is not None:
+        month = month_start(first)
+        while month < before:
+            moved = _archive_month(db, month, directory)
+            if moved:
+                summary["months"] += 1
+                summary["rows"] += moved
+            month = next_month(month)
+    if summary["rows"]:
+        bump_data_version(db)
+    return summary
+
+
+def read_archive(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    tokens: Optional[list[str]] = None,
+    columns: Optional[list[str]] = None,
+    directory: Optional[str] = None,
+) -> pa.Table:
+    """
+    Archived transactions with start <= timestamp < end, ordered by timestamp.
+
+    Only the files of overlapping months are opened, and the filters are
+    pushed down into the Parquet reader.
+    """
+    directory = directory or get_settings().archive_dir
+    query = db.query(TransactionArchive.path).order_by(TransactionArchive.month)
+    filters = []
+    if start is not None:
+        query = query.filter(TransactionArchive.month >= month_start(start))
+        filters.append(("timestamp", ">=", start))
+    if end is not None:
+        query = query.filter(TransactionArchive.month < end)
+        filters.append(("timestamp", "<", end))
+    if tokens is not None:
+        filters.append(("token", "in", list(tokens)))
+
+    schema = ARCHIVE_SCHEMA
+    if columns is not None:
+        schema = pa.schema([ARCHIVE_SCHEMA.field(name) for name in columns])
+    tables = [
+        pq.read_table(
+            os.path.join(directory, path),
+            columns=columns,
+            filters=filters or None,
+            schema=ARCHIVE_SCHEMA,
+        )
+        for (path,) in query
+    ]
+    return pa.concat_tables(tables) if tables else schema.empty_table()
+
+
+def archived_totals(db: Session, token: Optional[str] = None) -> dict[str, tuple]:
+    """(transactions, amount, total_usd) per token over all archived months."""
+    totals = {}
+    for (month_totals,) in db.query(TransactionArchive.totals):
+        for name, entry in month_totals.items():
+            if token is not None and name != token:
+                continue
+            count, amount, total_usd = totals.get(name, (0, Decimal(0), Decimal(0)))
+            totals[name] = (
+                count + entry["transactions"],
+                amount + to_decimal(entry["amount"]),
+                total_usd + to_decimal(entry["total_usd"]),
+            )
+    return totals
+
+
+def iter_transactions(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    tokens: Optional[list[str]] = None,
+    directory: Optional[str] = None,
+) -> Iterator[tuple]:
+    """
+    Yield (id, timestamp, token, amount, total_usd, stable_coin) for archived
+    and live transactions alike, ordered by timestamp.
+
+    Archived months are read-only, so the archived rows all come before the
+    live ones and the two sources are simply chained.
+    """
+    archived = read_archive(db, start, end, tokens, directory=directory)
+    for batch in archived.to_batches():
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+    query = db.query(*_COLUMNS)
+    if start is not None:
+        query = query.filter(Transaction.timestamp >= start)
+    if end is not None:
+        query = query.filter(Transaction.timestamp < end)
+    if tokens is not None:
+        query = query.filter(Transaction.token.in_(tokens))
+    yield from query.order_by(Transaction.timestamp, Transaction.id).yield_per(1000)
@@ -0,0 +1,221 @@
+"""
+Point-in-time holdings from periodic checkpoints.
+
+A checkpoint stores every token's running transaction count, amount and USD
+flow over all transactions up to and including its timestamp. One is taken
+every CHECKPOINT_EVERY transactions and at the end of every day with
+transactions, so holdings as of any moment are the nearest earlier
+checkpoint plus one aggregate over the transactions since. Inserting a
+transaction drops the checkpoints at or after its timestamp only; the next
+build replays from the last checkpoint left.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from threading import Lock
+from typing import Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import Float, func, type_coerce
+from sqlalchemy.orm import Session
+
+from app.cache import data_version
+from app.config import get_settings
+from app.database import insert_ignoring_duplicates, to_decimal
+from app.logic.aggregates import exact_sum
+from app.logic.archive import (
+    archived_totals,
+    get_archived_until,
+    read_archive,
+    totals_by_token,
+)
+from app.models import HoldingCheckpoint, Transaction
+
+# Checkpoint rows per INSERT
+CHECKPOINT_CHUNK_SIZE = 1000
+
+_TICK = timedelta(microseconds=1)
+
+# token -> (transactions, amount, total_usd)
+Positions = dict[str, tuple[int, Decimal, Decimal]]
+
+
+def invalidate_checkpoints(db: Session, since: datetime):
+    """
+    Drop the checkpoints a transaction at `since` changes, in the caller's
+    database transaction; the caller commits.
+    """
+    db.query(HoldingCheckpoint).filter(HoldingCheckpoint.timestamp >= since).delete(
+        synchronize_session=False
+    )
+
+
+def _numeric(db: Session, column):
+    # SQLite returns NUMERIC as REAL, which SQLAlchemy expands through
+    # '%.10f'; read the float and keep its shortest repr (to_decimal) instead
+    if db.get_bind().dialect.name == "sqlite":
+        return type_coerce(column, Float)
+    return column
+
+
+def _add(positions: Positions, token: str, count: int, amount, total_usd):
+    held_count, held_amount, held_usd = positions.get(
+        token, (0, Decimal(0), Decimal(0))
+    )
+    positions[token] = (held_count + count, held_amount + amount, held_usd + total_usd)
+
+
+def _nearest_checkpoint(
+    db: Session, at: Optional[datetime] = None
+) -> tuple[Optional[datetime], Positions]:
+    """
+    The latest checkpoint at or before `at` and its positions. Without one,
+    the catalogued totals of the archived months, which never change.
+    """
+    query = db.query(func.max(HoldingCheckpoint.timestamp))
+    if at is not None:
+        query = query.filter(HoldingCheckpoint.timestamp <= at)
+    timestamp = query.scalar()
+    if timestamp is not None:
+        rows = db.query(
+            HoldingCheckpoint.token,
+            HoldingCheckpoint.transactions,
+            _numeric(db, HoldingCheckpoint.amount),
+            _numeric(db, HoldingCheckpoint.total_usd),
+        ).filter(HoldingCheckpoint.timestamp == timestamp)
+        return timestamp, {
+            token: (count, to_decimal(amount), to_decimal(total_usd))
+            for token, count, amount, total_usd in rows
+        }
+
+    archived_until = get_archived_until(db)
+    if archived_until is not None and (at is None or at >= archived_until):
+        return archived_until - _TICK, archived_totals(db)
+    return None, {}
+
+
+def _replay(
+    db: Session, positions: Positions, after: Optional[datetime], until: datetime
+) -> Positions:
+    """Add the transactions with after < timestamp <= until to `positions`."""
+    positions = dict(positions)
+
+    archived_until = get_archived_until(db)
+    # Nothing to read when starting from the archive's own totals
+    if archived_until is not None and (after is None or after + _TICK < archived_until):
+        table = read_archive(db, start=after, end=min(until + _TICK, archived_until))
+        if after is not None:
+            table = table.filter(
+                pc.greater(table["timestamp"], pa.scalar(after, pa.timestamp("us")))
+            )
+        for token, entry in totals_by_token(table).items():
+            _add(
+                positions,
+                token,
+                entry["transactions"],
+                to_decimal(entry["amount"]),
+                to_decimal(entry["total_usd"]),
+            )
+
+    query = db.query(
+        Transaction.token,
+        func.count(Transaction.id),
+        exact_sum(db, Transaction.amount),
+        exact_sum(db, Transaction.total_usd),
+    ).filter(Transaction.timestamp <= until)
+    if after is not None:
+        query = query.filter(Transaction.timestamp > after)
+    for token, count, amount, total_usd in query.group_by(Transaction.token):
+        _add(positions, token, count, to_decimal(amount), to_decimal(total_usd))
+    return positions
+
+
+def build_checkpoints(db: Session, every: Optional[int] = None) -> int:
+    """
+    Take the checkpoints missing after the latest one left.
+
+    Transactions are walked in timestamp order from there; a checkpoint is
+    cut after every `every` transactions and wherever the day changes, but
+    never between transactions sharing a timestamp. The transactions after
+    the last cut are left to replay, so single inserts don't each add a
+    checkpoint.
+
+    Returns:
+        int: Number of checkpoints taken
+    """
+    every = every or get_settings().checkpoint_every
+    timestamp, positions = _nearest_checkpoint(db)
+    query = db.query(
+        Transaction.timestamp,
+        Transaction.token,
+        _numeric(db, Transaction.amount),
+        _numeric(db, Transaction.total_usd),
+    )
+    if timestamp is not None:
+        query = query.filter(Transaction.timestamp > timestamp)
+
+    rows = []
+    taken = 0
+
+    def take(moment: datetime):
+        rows.extend(
+            {
+                "timestamp": moment,
+                "token": token,
+                "transactions": count,
+                "amount": amount,
+                "total_usd": total_usd,
+            }
+            for token, (count, amount, total_usd) in positions.items()
+        )
+
+    pending = 0
+    last = None
+    for moment, token, amount, total_usd in query.order_by(
+        Transaction.timestamp
+    ).yield_per(10_000):
+        if (
+            pending
+            and moment != last
+            and (pending >= every or moment.date() != last.date())
+        ):
+            take(last)
+            taken += 1
+            pending = 0
+        _add(positions, token, 1, to_decimal(amount), to_decimal(total_usd))
+        pending += 1
+        last = moment
+
+    # Another worker may be building the same checkpoints
+    for start in range(0, len(rows), CHECKPOINT_CHUNK_SIZE):
+        db.execute(
+            insert_ignoring_duplicates(
+                db, HoldingCheckpoint, ["timestamp", "token"]
+            ).values(rows[start : start + CHECKPOINT_CHUNK_SIZE])
+        )
+    db.commit()
+    return taken
+
+
+_build_lock = Lock()
+_built_version: Optional[int] = None
+
+
+def ensure_checkpoints(db: Session):
+    """Catch the checkpoints up, at most once per data version."""
+    global _built_version
+    with _build_lock:
+        if _built_version != data_version.version:
+            build_checkpoints(db)
+            _built_version = data_version.version
+
+
+def positions_at(db: Session, at: datetime) -> Positions:
+    """
+    Per-token (transactions, amount, total_usd) over the transactions up to
+    and including `at`, archived ones included.
+    """
+    ensure_checkpoints(db)
+    timestamp, positions = _nearest_checkpoint(db, at)
+    return _replay(db, positions, timestamp, at)
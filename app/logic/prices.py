@@ -0,0 +1,386 @@
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+from operator import itemgetter
+from threading import Lock
+from typing import Iterable, Optional
+
+import numpy as np
+import pyarrow as pa
+from sqlalchemy import Float, cast, func, literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.cache import bump_data_version, data_version
+from app.database import insert_ignoring_duplicates
+from app.logic.archive import read_archive
+from app.logic.token_links import get_token_graph
+from app.models import Conversion, Price, Transaction
+
+# Rows per INSERT when storing price series
+PRICE_CHUNK_SIZE = 1000
+
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _naive_utc(timestamp: datetime) -> datetime:
+    # Transactions are stored as naive UTC
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _to_datetime64(timestamps) -> np.ndarray:
+    return np.asarray(timestamps, dtype="datetime64[us]")
+
+
+def _datetimes_to_array(timestamps: tuple[datetime, ...]) -> np.ndarray:
+    # Several times faster than letting NumPy convert the datetime objects
+    return np.fromiter(
+        ((t - _EPOCH) // _MICROSECOND for t in timestamps),
+        dtype=np.int64,
+        count=len(timestamps),
+    ).view("datetime64[us]")
+
+
+def _arrays_by_token(rows: list) -> dict[str, tuple]:
+    """
+    Split (token, timestamp, value, ...) rows sorted by token into one tuple
+    of (timestamps, values, ...) arrays per token.
+    """
+    if not rows:
+        return {}
+    tokens, timestamps, *values = zip(*rows)
+    tokens = np.asarray(tokens)
+    timestamps = _datetimes_to_array(timestamps)
+    values = [np.asarray(v, dtype=np.float64) for v in values]
+    starts = np.flatnonzero(np.r_[True, tokens[1:] != tokens[:-1]])
+    ends = np.r_[starts[1:], len(tokens)]
+    return {
+        str(tokens[a]): (timestamps[a:b], *(v[a:b] for v in values))
+        for a, b in zip(starts, ends)
+    }
+
+
+class PriceSeries:
+    """
+    One token's prices as parallel arrays sorted by timestamp.
+
+    `price_at` and `prices_at` are as-of lookups: the latest price at or
+    before the requested moment, found by binary search.
+    """
+
+    def __init__(self, timestamps: np.ndarray, prices: np.ndarray):
+        self.timestamps = _to_datetime64(timestamps)
+        self.prices = np.asarray(prices, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def price_at(self, timestamp: datetime) -> Optional[float]:
+        i = np.searchsorted(
+            self.timestamps, np.datetime64(_naive_utc(timestamp), "us"), "right"
+        )
+        return float(self.prices[i - 1]) if i else None
+
+    def prices_at(self, timestamps: np.ndarray) -> np.ndarray:
+        """As-of prices for many moments; NaN before the first known price."""
+        positions = np.searchsorted(self.timestamps, timestamps, "right") - 1
+        prices = self.prices[np.maximum(positions, 0)]
+        return np.where(positions >= 0, prices, np.nan)
+
+
+class PriceStore:
+    """
+    All known token prices, held in memory for as-of lookups.
+
+    Prices are floats: they value holdings, they don't feed the exact
+    Numeric columns of stored transactions.
+    """
+
+    def __init__(self, series: dict[str, PriceSeries]):
+        self.series = series
+
+    @classmethod
+    def from_db(cls, db: Session) -> "PriceStore":
+        # Read as floats: converting every Numeric to a Decimal first would
+        # dominate the load time
+        query = db.query(
+            Price.token, Price.timestamp, cast(Price.price_usd, Float)
+        ).order_by(Price.token, Price.timestamp)
+        # Plain rows from the Core result: ORM row loading costs more than the
+        # fetch itself at these volumes
+        rows = db.execute(query.statement).all()
+        return cls(
+            {
+                token: PriceSeries(*columns)
+                for token, columns in _arrays_by_token(rows).items()
+            }
+        )
+
+    def price_at(self, token: str, timestamp: datetime) -> Optional[float]:
+        series = self.series.get(token)
+        return series.price_at(timestamp) if series else None
+
+    def prices_at(self, token: str, timestamps: np.ndarray) -> np.ndarray:
+        series = self.series.get(token)
+        if series is None:
+            return np.full(len(timestamps), np.nan)
+        return series.prices_at(timestamps)
+
+
+_store_lock = Lock()
+_store: Optional[PriceStore] = None
+_store_version: Optional[int] = None
+
+
+def get_price_store(db: Session) -> PriceStore:
+    """
+    Return the price store, reloading it if the data version moved on.
+
+    Price imports bump the data version like token and transaction writes,
+    so the store is reloaded at most once per write.
+    """
+    global _store, _store_version
+    with _store_lock:
+        if _store is None or _store_version != data_version.version:
+            _store_version = data_version.version
+            _store = PriceStore.from_db(db)
+        return _store
+
+
+def store_prices(
+    rows: Iterable[tuple[str, datetime, Decimal]], db: Session, source: str
+) -> dict:
+    """
+    Insert (token, timestamp, price_usd) rows, keeping existing prices.
+
+    A price already stored for the same token and timestamp wins, whichever
+    source it came from, so re-importing a series is a no-op.
+
+    Returns:
+        dict: inserted and skipped counts
+    """
+    values = {}
+    total = 0
+    for token, timestamp, price in rows:
+        total += 1
+        # First price for a moment wins within the batch too
+        values.setdefault(
+            (token, timestamp),
+            {
+                "token": token,
+                "timestamp": timestamp,
+                "price_usd": price,
+                "source": source,
+            },
+        )
+    values = list(values.values())
+
+    inserted = 0
+    for start in range(0, len(values), PRICE_CHUNK_SIZE):
+        result = db.execute(
+            insert_ignoring_duplicates(db, Price, ["token", "timestamp"]).values(
+                values[start : start + PRICE_CHUNK_SIZE]
+            )
+        )
+        inserted += result.rowcount
+    db.commit()
+    if inserted:
+        bump_data_version(db)
+    return {"inserted": inserted, "skipped": total - inserted}
+
+
+def import_trade_prices(db: Session) -> dict:
+    """
+    Store the execution price implied by every transaction (|total_usd / amount|).
+
+    Runs as a single INSERT ... SELECT inside the database; moments that
+    already have a price keep it.
+
+    Returns:
+        dict: inserted and skipped counts, as for store_prices
+    """
+    trades = db.query(Transaction).filter(Transaction.amount != 0)
+    priced = (
+        db.query(Price)
+        .filter(
+            Price.token == Transaction.token, Price.timestamp == Transaction.timestamp
+        )
+        .exists()
+    )
+    result = db.execute(
+        insert_ignoring_duplicates(db, Price, ["token", "timestamp"]).from_select(
+            ["token", "timestamp", "price_usd", "source"],
+            trades.filter(~priced)
+            .with_entities(
+                Transaction.token,
+                Transaction.timestamp,
+                func.abs(Transaction.total_usd / Transaction.amount),
+                literal("trade"),
+            )
+            .statement,
+        )
+    )
+    db.commit()
+    if result.rowcount:
+        bump_data_version(db)
+    return {"inserted": result.rowcount, "skipped": trades.count() - result.rowcount}
+
+
+def parse_prices_csv(content: str) -> list[tuple[str, datetime, Decimal]]:
+    """
+    Read (token, timestamp, price_usd) rows from CSV with a
+    `token,timestamp,price_usd` header. Timestamps are ISO 8601.
+
+    Raises:
+        ValueError: On a missing column or an unreadable timestamp or price,
+            naming the offending line
+    """
+    reader = csv.DictReader(io.StringIO(content))
+    if not reader.fieldnames or not {"token", "timestamp", "price_usd"} <= set(
+        f.strip() for f in reader.fieldnames
+    ):
+        raise ValueError("CSV must have a 'token,timestamp,price_usd' header")
+    reader.fieldnames = [f.strip() for f in reader.fieldnames]
+
+    rows = []
+    for row in reader:
+        try:
+            timestamp = datetime.fromisoformat((row["timestamp"] or "").strip())
+        except ValueError:
+            raise ValueError(
+                f"Line {reader.line_num}: cannot read timestamp '{row['timestamp']}'"
+            ) from None
+        try:
+            price = Decimal((row["price_usd"] or "").strip())
+        except InvalidOperation:
+            raise ValueError(
+                f"Line {reader.line_num}: cannot read price_usd '{row['price_usd']}'"
+            ) from None
+        rows.append(((row["token"] or "").strip(), _naive_utc(timestamp), price))
+    return rows
+
+
+def portfolio_values(
+    db: Session,
+    store: PriceStore,
+    timestamps: np.ndarray,
+    tokens: Optional[list[str]] = None,
+) -> dict:
+    """
+    Value the holdings built up by stored transactions at many moments.
+
+    Holdings and net USD flow per token are cumulative sums over its
+    transactions (archived ones included) and conversions, looked up by
+    binary search like the prices, so the whole range is valued with a
+    handful of array operations per token.
+    A linked token with no price of its own is valued at its root's price.
+    Unrealized P&L is the holdings' value plus the net USD flow (spent
+    negative, received positive).
+
+    Args:
+        db (Session): Database session
+        store (PriceStore): Prices to value the holdings with
+        timestamps (np.ndarray): datetime64 moments to value at, ascending
+        tokens (list, optional): Only value these tokens
+
+    Returns:
+        dict: value_usd, net_usd and unrealized_pnl arrays aligned with
+        `timestamps`, and the tokens held at some moment with no price known
+        yet (counted at zero)
+    """
+    flows = [
+        select(
+            Transaction.token,
+            Transaction.timestamp,
+            cast(Transaction.amount, Float),
+            cast(Transaction.total_usd, Float),
+        ),
+        # Conversions move holdings between equivalent tokens, no USD changes hands
+        select(
+            Conversion.from_token,
+            Conversion.timestamp,
+            cast(-Conversion.from_amount, Float),
+            literal(0.0),
+        ),
+        select(
+            Conversion.to_token,
+            Conversion.timestamp,
+            cast(Conversion.to_amount, Float),
+            literal(0.0),
+        ),
+    ]
+    if tokens is not None:
+        flows = [flow.where(flow.selected_columns[0].in_(tokens)) for flow in flows]
+    flows = union_all(*flows).subquery()
+    rows = db.execute(select(flows).order_by(*flows.c[:2])).all()
+    archived = read_archive(
+        db, tokens=tokens, columns=["token", "timestamp", "amount", "total_usd"]
+    )
+    if archived.num_rows:
+        # Floats like the live rows; conversions in archived months still
+        # come from the database, hence the re-sort
+        archived = archived.cast(
+            pa.schema(
+                [
+                    archived.schema.field("token"),
+                    archived.schema.field("timestamp"),
+                    ("amount", pa.float64()),
+                    ("total_usd", pa.float64()),
+                ]
+            )
+        )
+        rows = sorted(
+            rows + list(zip(*(column.to_pylist() for column in archived.columns))),
+            key=itemgetter(0, 1),
+        )
+    columns = _arrays_by_token(rows)
+    graph = get_token_graph(db)
+
+    value = np.zeros(len(timestamps))
+    net_usd = np.zeros(len(timestamps))
+    unpriced = []
+    for token, (times, amounts, flows) in columns.items():
+        positions = np.searchsorted(times, timestamps, "right") - 1
+        held = np.where(positions >= 0, np.cumsum(amounts)[positions], 0.0)
+        net_usd += np.where(positions >= 0, np.cumsum(flows)[positions], 0.0)
+        prices = store.prices_at(token, timestamps)
+        root, factor = graph.resolve(token)
+        if root != token:
+            # Fall back to the price of the token it is equivalent to
+            prices = np.where(
+                np.isnan(prices),
+                store.prices_at(root, timestamps) * float(factor),
+                prices,
+            )
+        missing = np.isnan(prices) & (held != 0)
+        if missing.any():
+            unpriced.append(token)
+        value += np.where(missing, 0.0, held * np.nan_to_num(prices))
+
+    return {
+        "value_usd": value,
+        "net_usd": net_usd,
+        "unrealized_pnl": value + net_usd,
+        "unpriced": unpriced,
+    }
+
+
+def time_range(start: datetime, end: datetime, points: int) -> np.ndarray:
+    """
+    `points` evenly spaced datetime64 moments from start to end inclusive.
+    Timezone-aware bounds are converted to naive UTC first.
+
+    Raises:
+        ValueError: If start is not before end or points is below 2
+    """
+    start, end = _naive_utc(start), _naive_utc(end)
+    if start >= end:
+        raise ValueError("start must be before end")
+    if points < 2:
+        raise ValueError("points must be at least 2")
+    bounds = _to_datetime64([start, end]).astype(np.int64)
+    return np.linspace(bounds[0], bounds[1], points).astype("datetime64[us]")
@@ -0,0 +1,281 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from threading import Lock
+from typing import Optional
+
+from fastapi import status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.cache import bump_data_version, data_version
+from app.database import to_decimal
+from app.logic.aggregates import aggregate_by_token
+from app.logic.archive import archived_error, get_archived_until
+from app.logic.checkpoints import positions_at
+from app.models import Conversion, Token, TokenLink
+
+_ONE = Decimal(1)
+
+
+class TokenGraph:
+    """
+    Token equivalences with every path resolved up front.
+
+    Each linked token maps straight to its root and the product of the
+    factors along the way, so resolving a token while walking transactions
+    is a dict lookup instead of a walk up the links.
+    """
+
+    def __init__(self, links: dict[str, tuple[str, Decimal]]):
+        self.links = links
+        self._resolved: dict[str, tuple[str, Decimal]] = {}
+        for token in links:
+            self._resolve_path(token)
+        self._members = defaultdict(set)
+        for token, (root, _) in self._resolved.items():
+            self._members[root].update((token, root))
+
+    def _resolve_path(self, token: str):
+        path = []
+        while token in self.links and token not in self._resolved:
+            if token in path:
+                raise ValueError(f"Token links form a cycle through '{token}'")
+            path.append(token)
+            token = self.links[token][0]
+        root, factor = self._resolved.get(token, (token, _ONE))
+        # Unwind from the token nearest the root
+        for linked in reversed(path):
+            factor = self.links[linked][1] * factor
+            self._resolved[linked] = (root, factor)
+
+    def resolve(self, token: str) -> tuple[str, Decimal]:
+        """(root token, units of the root one unit of `token` is worth)."""
+        return self._resolved.get(token, (token, _ONE))
+
+    def equivalent(self, token: str, other: str) -> bool:
+        return token != other and self.resolve(token)[0] == self.resolve(other)[0]
+
+    def members(self, root: str) -> list[str]:
+        """Tokens resolving to `root`, including the root itself."""
+        return sorted(self._members.get(root, {root}))
+
+
+_graph_lock = Lock()
+_graph: Optional[TokenGraph] = None
+_graph_version: Optional[int] = None
+
+
+def get_token_graph(db: Session) -> TokenGraph:
+    """
+    Return the token graph, rebuilding it if the data version moved on.
+
+    Linking tokens bumps the data version like any token write, so the
+    resolved paths are recomputed at most once per write.
+    """
+    global _graph, _graph_version
+    with _graph_lock:
+        if _graph is None or _graph_version != data_version.version:
+            _graph_version = data_version.version
+            _graph = TokenGraph(
+                {
+                    token: (base, to_decimal(factor))
+                    for token, base, factor in db.query(
+                        TokenLink.token, TokenLink.base_token, TokenLink.factor
+                    )
+                }
+            )
+        return _graph
+
+
+def _error(message: str, status_code: int) -> dict:
+    return {"status": "error", "error": message, "status_code": status_code}
+
+
+def link_token(token: str, base_token: str, factor: float, db: Session) -> dict:
+    """
+    Record that one unit of `token` is worth `factor` units of `base_token`.
+
+    Args:
+        token (str): The derivative token, e.g. stETH
+        base_token (str): The token it is equivalent to, e.g. ETH
+        factor (float): Units of base_token per unit of token
+        db (Session): Database session for querying and saving
+
+    Returns:
+        dict: Success message with status_code 201 (linked) or 200 (already
+        linked the same way), or an error with status_code 400 (unknown
+        token, stability mismatch, cycle) or 409 (linked differently)
+    """
+    factor = to_decimal(factor)
+    if factor <= 0:
+        return _error(
+            "Conversion factor must be positive.", status.HTTP_400_BAD_REQUEST
+        )
+    if token == base_token:
+        return _error(
+            f"'{token}' cannot be linked to itself.", status.HTTP_400_BAD_REQUEST
+        )
+
+    tokens = {
+        t.name: t
+        for t in db.query(Token).filter(Token.name.in_((token, base_token))).all()
+    }
+    for name in (token, base_token):
+        if name not in tokens:
+            return _error(
+                f"'{name}' is not recognized. Please add it first.",
+                status.HTTP_400_BAD_REQUEST,
+            )
+    if tokens[token].is_stable != tokens[base_token].is_stable:
+        return _error(
+            "A stablecoin can only be linked to another stablecoin.",
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    existing = db.get(TokenLink, token)
+    if existing is not None:
+        if existing.base_token == base_token and to_decimal(existing.factor) == factor:
+            return {
+                "status": "success",
+                "message": f"'{token}' is already linked to '{base_token}'.",
+                "status_code": status.HTTP_200_OK,
+            }
+        return _error(
+            f"'{token}' is already linked to '{existing.base_token}'.",
+            status.HTTP_409_CONFLICT,
+        )
+
+    if get_token_graph(db).resolve(base_token)[0] == token:
+        return _error(
+            f"Linking '{token}' to '{base_token}' would create a cycle.",
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        db.add(TokenLink(token=token, base_token=base_token, factor=factor))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return _error(f"'{token}' is already linked.", status.HTTP_409_CONFLICT)
+    bump_data_version(db)
+    return {
+        "status": "success",
+        "message": f"1 '{token}' is now worth {factor} '{base_token}'.",
+        "status_code": status.HTTP_201_CREATED,
+    }
+
+
+def conversion_values(
+    timestamp: datetime,
+    from_token: str,
+    to_token: str,
+    from_amount: float,
+    to_amount: float,
+) -> dict:
+    """Map a swap between equivalent tokens onto the columns of a Conversion."""
+    return {
+        "timestamp": timestamp,
+        "from_token": from_token,
+        "to_token": to_token,
+        "from_amount": to_decimal(from_amount),
+        "to_amount": to_decimal(to_amount),
+    }
+
+
+def process_add_conversion(
+    timestamp: datetime,
+    from_token: str,
+    to_token: str,
+    from_amount: float,
+    to_amount: float,
+    db: Session,
+) -> dict:
+    """
+    Store a swap between two equivalent tokens as a conversion.
+
+    Conversions move holdings between the members of one equivalence class
+    and carry no USD flow, so they don't touch the cost basis. They are not
+    published to the live event feed: no page lists them, and the feed's
+    transaction rows are Transaction rows only.
+
+    Returns:
+        dict: Success message, or an error with status_code 400 in an
+        archived month or 409 if a conversion from the same token at the
+        same time exists
+    """
+    error = archived_error(timestamp, get_archived_until(db))
+    if error:
+        return _error(error, status.HTTP_400_BAD_REQUEST)
+    values = conversion_values(timestamp, from_token, to_token, from_amount, to_amount)
+    from_amount, to_amount = values["from_amount"], values["to_amount"]
+    try:
+        db.add(Conversion(**values))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return _error(
+            f"Conversion from '{from_token}' at '{timestamp}' already exists.",
+            status.HTTP_409_CONFLICT,
+        )
+    bump_data_version(db)
+    return {
+        "status": "success",
+        "conversion": True,
+        "timestamp": timestamp,
+        "from_token": from_token,
+        "to_token": to_token,
+        "from_amount": from_amount,
+        "to_amount": to_amount,
+        "message": f"Conversion added: timestamp '{timestamp}', {from_amount} '{from_token}' to {to_amount} '{to_token}'.",
+    }
+
+
+def holdings(db: Session, at: Optional[datetime] = None) -> list[dict]:
+    """
+    Net holdings and cost basis per equivalence class.
+
+    Token totals come from the per-token aggregates (or, as of a moment,
+    from the nearest holding checkpoint) plus the conversions in and out;
+    each token is then folded into its root with one lookup in the token
+    graph.
+
+    Returns:
+        list: One entry per root token, ordered by symbol, with the amount in
+        root units, net USD flow (spent negative) and the amount held of each
+        member token
+    """
+    graph = get_token_graph(db)
+    amounts = defaultdict(Decimal)
+    net_usd = defaultdict(Decimal)
+    if at is None:
+        for aggregate in aggregate_by_token(db):
+            amounts[aggregate.token] += aggregate.amount
+            net_usd[aggregate.token] += aggregate.total_usd
+    else:
+        for token, (_, amount, total_usd) in positions_at(db, at).items():
+            amounts[token] += amount
+            net_usd[token] += total_usd
+    conversions = db.query(
+        Conversion.from_token,
+        Conversion.to_token,
+        Conversion.from_amount,
+        Conversion.to_amount,
+    )
+    if at is not None:
+        conversions = conversions.filter(Conversion.timestamp <= at)
+    for from_token, to_token, from_amount, to_amount in conversions:
+        amounts[from_token] -= to_decimal(from_amount)
+        amounts[to_token] += to_decimal(to_amount)
+
+    roots = {}
+    for token, amount in amounts.items():
+        root, factor = graph.resolve(token)
+        entry = roots.setdefault(
+            root,
+            {"token": root, "amount": Decimal(0), "net_usd": Decimal(0), "members": {}},
+        )
+        entry["amount"] += amount * factor
+        entry["net_usd"] += net_usd[token]
+        entry["members"][token] = amount
+    return [roots[root] for root in sorted(roots)]
@@ -0,0 +1,160 @@
+from threading import Lock
+from typing import Iterable, Optional
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.cache import data_version
+from app.models import Token
+
+# OCR rarely gets more than one character of a ticker wrong; allowing more
+# makes short symbols (ETH, OP) match almost anything.
+MAX_DISTANCE = 1
+
+# Characters OCR reads as one another (compared upper-cased, so l is L)
+OCR_CONFUSIONS = {
+    frozenset(pair) for pair in ("OD", "O0", "I1", "IL", "L1", "B8", "S5")
+}
+
+
+class TokenMatch(BaseModel):
+    """
+    A known token symbol an OCR-read ticker was snapped to.
+
+    Attributes:
+        read (str): The symbol as read by OCR
+        token (str): The known token symbol it matches
+        distance (int): Edit distance between the two
+        confidence (float): 1.0 for exact matches, lower the more edits it took
+        misread (bool): Whether the difference is one OCR is known to make
+            (see is_ocr_misread); other near misses may be real tickers
+    """
+
+    read: str
+    token: str
+    distance: int
+    confidence: float
+    misread: bool
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two strings."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (ca != cb),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def is_ocr_misread(read: str, token: str) -> bool:
+    """
+    True when `read` is `token` with one edit typical of OCR: a substitution
+    between look-alike characters (O/D, O/0, I/1/l, B/8, S/5) or a character
+    read twice (AAVVE). Any other single edit turns real tickers into one
+    another (USDT/USDC, ETC/ETH, WETH/ETH), so it is no evidence of a misread.
+    """
+    read = read.upper()
+    if len(read) == len(token):
+        changed = [(a, b) for a, b in zip(read, token) if a != b]
+        return len(changed) == 1 and frozenset(changed[0]) in OCR_CONFUSIONS
+    if len(read) == len(token) + 1:
+        return any(
+            read[i] == read[i - 1] and read[:i] + read[i + 1 :] == token
+            for i in range(1, len(read))
+        )
+    return False
+
+
+def _deletions(word: str, depth: int) -> set[str]:
+    """All strings obtained by deleting up to `depth` characters from `word`."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1 :] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+class TokenIndex:
+    """
+    Fuzzy lookup of OCR-read tickers against the known token symbols.
+
+    Symmetric-deletion index: every symbol is stored under each string left
+    after deleting up to `max_distance` characters. Two words within that
+    edit distance always share such a variant, so a lookup only generates the
+    read ticker's own deletions (a handful for 3-6 letter symbols), gathers
+    the symbols under them from a dict, and verifies that short candidate
+    list with a real edit distance. Lookup cost does not grow with the number
+    of tokens, unlike a scan or a BK-tree, whose pruning is weak for short
+    words.
+    """
+
+    def __init__(self, symbols: Iterable[str], max_distance: int = MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._symbols = set(symbols)
+        self._variants = {}
+        for symbol in self._symbols:
+            for variant in _deletions(symbol, max_distance):
+                self._variants.setdefault(variant, []).append(symbol)
+
+    def match(self, read: str) -> Optional[TokenMatch]:
+        """
+        Find the closest known symbol to `read`.
+
+        Returns None when nothing is within `max_distance`, or when several
+        symbols are equally close, since guessing between them would
+        silently book the wrong token.
+        """
+        if read in self._symbols:
+            return TokenMatch(
+                read=read, token=read, distance=0, confidence=1.0, misread=False
+            )
+        word = read.upper()
+        candidates = set()
+        for variant in _deletions(word, self.max_distance):
+            candidates.update(self._variants.get(variant, ()))
+        scored = sorted(
+            (edit_distance(word, candidate), candidate) for candidate in candidates
+        )
+        scored = [(d, c) for d, c in scored if d <= self.max_distance]
+        if not scored or (len(scored) > 1 and scored[1][0] == scored[0][0]):
+            return None
+        distance, token = scored[0]
+        confidence = 1.0 - distance / max(len(read), len(token))
+        return TokenMatch(
+            read=read,
+            token=token,
+            distance=distance,
+            confidence=round(confidence, 3),
+            misread=distance > 0 and is_ocr_misread(read, token),
+        )
+
+
+_index_lock = Lock()
+_index: Optional[TokenIndex] = None
+_index_version: Optional[int] = None
+
+
+def get_token_index(db: Session) -> TokenIndex:
+    """
+    Return the token index, rebuilding it if the data version moved on.
+
+    Every committed token write bumps the data version, so the index is
+    rebuilt at most once per write rather than once per lookup.
+    """
+    global _index, _index_version
+    with _index_lock:
+        if _index is None or _index_version != data_version.version:
+            _index_version = data_version.version
+            _index = TokenIndex(name for (name,) in db.query(Token.name).all())
+        return _index
@@ -0,0 +1,145 @@
+import csv
+import io
+from typing import Iterable
+
+from fastapi import status
+from sqlalchemy.orm import Session
+
+from app.cache import bump_data_version
+from app.database import insert_ignoring_duplicates
+from app.events import publish_tokens
+from app.models import Token
+
+# Length of tokens.name
+MAX_SYMBOL_LENGTH = 8
+
+_TRUE = {"true", "1", "yes"}
+_FALSE = {"false", "0", "no"}
+
+
+def _stability(is_stable: bool) -> str:
+    return "stablecoin" if is_stable else "non-stablecoin"
+
+
+def register_tokens(entries: Iterable[tuple[str, bool]], db: Session) -> dict:
+    """
+    Register many tokens with the per-item semantics of POST /api/tokens.
+
+    Existing tokens are fetched in one query and all new ones are written in
+    a single INSERT, instead of a SELECT, INSERT and COMMIT per token.
+
+    Args:
+        entries (Iterable): (symbol, is_stable) pairs
+        db (Session): Database session for querying and saving
+
+    Returns:
+        dict: created/existing/conflicts/invalid counts and one result per entry with
+        the status code POST /api/tokens would have returned for it
+        (201 created, 200 already exists, 409 other stability, 400 invalid)
+    """
+    entries = list(entries)
+    existing = {
+        name: is_stable
+        for name, is_stable in db.query(Token.name, Token.is_stable)
+        .filter(Token.name.in_({name for name, _ in entries}))
+        .all()
+    }
+
+    results = []
+    new_tokens = {}
+    for name, is_stable in entries:
+        if not name or len(name) > MAX_SYMBOL_LENGTH:
+            results.append(
+                {
+                    "token": name,
+                    "status_code": status.HTTP_400_BAD_REQUEST,
+                    "error": f"'{name}' must be 1 to {MAX_SYMBOL_LENGTH} characters long.",
+                }
+            )
+            continue
+        # Earlier entries of the same batch count as already registered
+        known = existing.get(name, new_tokens.get(name))
+        if known is None:
+            new_tokens[name] = is_stable
+            results.append(
+                {
+                    "token": name,
+                    "status_code": status.HTTP_201_CREATED,
+                    "message": f"Token '{name}' marked as {_stability(is_stable)}",
+                }
+            )
+        elif known != is_stable:
+            results.append(
+                {
+                    "token": name,
+                    "status_code": status.HTTP_409_CONFLICT,
+                    "error": f"'{name}' is already marked as a {_stability(known)}.",
+                }
+            )
+        else:
+            results.append(
+                {
+                    "token": name,
+                    "status_code": status.HTTP_200_OK,
+                    "message": f"Token '{name}' already exists",
+                }
+            )
+
+    if new_tokens:
+        db.execute(
+            insert_ignoring_duplicates(db, Token, ["name"]).values(
+                [{"name": n, "is_stable": s} for n, s in new_tokens.items()]
+            )
+        )
+        db.commit()
+        bump_data_version(db)
+        publish_tokens(new_tokens)
+
+    counts = {
+        code: sum(r["status_code"] == code for r in results)
+        for code in (
+            status.HTTP_201_CREATED,
+            status.HTTP_200_OK,
+            status.HTTP_409_CONFLICT,
+            status.HTTP_400_BAD_REQUEST,
+        )
+    }
+    return {
+        "created": counts[status.HTTP_201_CREATED],
+        "existing": counts[status.HTTP_200_OK],
+        "conflicts": counts[status.HTTP_409_CONFLICT],
+        "invalid": counts[status.HTTP_400_BAD_REQUEST],
+        "results": results,
+    }
+
+
+def parse_tokens_csv(content: str) -> list[tuple[str, bool]]:
+    """
+    Read (symbol, is_stable) pairs from CSV with a `token,is_stable` header.
+
+    is_stable accepts true/false, 1/0 and yes/no (case-insensitive).
+
+    Raises:
+        ValueError: On a missing column or an unreadable is_stable value,
+            naming the offending line
+    """
+    reader = csv.DictReader(io.StringIO(content))
+    if not reader.fieldnames or not {"token", "is_stable"} <= set(
+        f.strip() for f in reader.fieldnames
+    ):
+        raise ValueError("CSV must have a 'token,is_stable' header")
+    reader.fieldnames = [f.strip() for f in reader.fieldnames]
+
+    entries = []
+    for row in reader:
+        flag = (row["is_stable"] or "").strip().lower()
+        if flag in _TRUE:
+            is_stable = True
+        elif flag in _FALSE:
+            is_stable = False
+        else:
+            raise ValueError(
+                f"Line {reader.line_num}: cannot read is_stable value '{row['is_stable']}'"
+            )
+        entries.append(((row["token"] or "").strip(), is_stable))
+    return entries
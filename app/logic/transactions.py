@@ -1,10 +1,123 @@
 from datetime import datetime
+from typing import Iterable, Optional
 
 from fastapi import status
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Query, Session
 
-from app.models import Token, Transaction
+from app.cache import bump_data_version, sync_data_version
+from app.database import insert_ignoring_duplicates, to_decimal
+from app.events import feed, publish_transactions
+from app.logic.archive import archived_error, get_archived_until
+from app.logic.checkpoints import invalidate_checkpoints
+from app.logic.token_links import (
+    TokenGraph,
+    conversion_values,
+    get_token_graph,
+    process_add_conversion,
+)
+from app.models import Conversion, Token, Transaction
+
+
+def _validate_token_pair(
+    from_token: str,
+    to_token: str,
+    from_token_obj: Optional[Token],
+    to_token_obj: Optional[Token],
+    graph: TokenGraph,
+) -> Optional[str]:
+    """
+    Return why the token pair cannot be swapped, or None if it can. A swap
+    between equivalent tokens is valid as a conversion.
+    """
+    if not from_token_obj:
+        return f"'{from_token}' is not recognized. Please add it first."
+    if not to_token_obj:
+        return f"'{to_token}' is not recognized. Please add it first."
+    if graph.equivalent(from_token, to_token):
+        return None
+    if from_token_obj.is_stable and to_token_obj.is_stable:
+        return "Both tokens cannot be stablecoins"
+    if not from_token_obj.is_stable and not to_token_obj.is_stable:
+        return "One of the tokens must be a stablecoin"
+    return None
+
+
+def _transaction_values(
+    timestamp: datetime,
+    from_token_obj: Token,
+    to_token_obj: Token,
+    from_amount: float,
+    to_amount: float,
+) -> dict:
+    """Map a validated swap onto the column values of a Transaction row."""
+    # Amounts arrive as floats; keep their shortest decimal form, not the
+    # binary expansion, so the Numeric columns store what the user entered.
+    from_amount = to_decimal(from_amount)
+    to_amount = to_decimal(to_amount)
+
+    # Determine which is the stablecoin and which is the non-stablecoin
+    if from_token_obj.is_stable:
+        return {
+            "timestamp": timestamp,
+            "token": to_token_obj.name,
+            "amount": to_amount,
+            "stable_coin": from_token_obj.name,
+            "total_usd": -from_amount,
+        }
+    return {
+        "timestamp": timestamp,
+        "token": from_token_obj.name,
+        "amount": -from_amount,
+        "stable_coin": to_token_obj.name,
+        "total_usd": to_amount,
+    }
+
+
+def validate_transaction(
+    timestamp: datetime,
+    from_token: str,
+    to_token: str,
+    from_amount: float,
+    to_amount: float,
+    db: Session,
+) -> tuple[Optional[type], Optional[dict], Optional[dict]]:
+    """
+    Check a swap against the known tokens without writing anything.
+
+    Returns:
+        tuple: (Transaction or Conversion, its column values, None) for a
+        valid swap, or (None, None, error result) shaped like
+        process_add_transaction's errors
+    """
+    # Validate that tokens exist and get their stability status
+    from_token_obj = db.query(Token).filter(Token.name == from_token).first()
+    to_token_obj = db.query(Token).filter(Token.name == to_token).first()
+    graph = get_token_graph(db)
+
+    error = _validate_token_pair(
+        from_token, to_token, from_token_obj, to_token_obj, graph
+    ) or archived_error(timestamp, get_archived_until(db))
+    if error:
+        return (
+            None,
+            None,
+            {
+                "status": "error",
+                "error": error,
+                "status_code": status.HTTP_400_BAD_REQUEST,
+            },
+        )
+    if graph.equivalent(from_token, to_token):
+        return (
+            Conversion,
+            conversion_values(timestamp, from_token, to_token, from_amount, to_amount),
+            None,
+        )
+    values = _transaction_values(
+        timestamp, from_token_obj, to_token_obj, from_amount, to_amount
+    )
+    return Transaction, values, None
 
 
 def process_add_transaction(
@@ -19,9 +132,11 @@ def process_add_transaction(
     Process and validate a transaction between two tokens.
 
     This function implements the business logic for token transactions:
+    - Stores swaps between equivalent tokens (e.g. ETH -> stETH) as conversions
     - Validates that both tokens exist in the database
     - Ensures that exactly one token is a stablecoin
-    - Calculates final USD values and token amounts
+    - Rejects timestamps in months moved to the archive
+    - Calculates final USD values and token amounts as exact decimals
     - Stores the transaction in the database
 
     Args:
@@ -38,56 +153,26 @@ def process_add_transaction(
     Raises:
         IntegrityError: If a transaction with the same token and timestamp already exists
     """
-    # Validate that tokens exist and get their stability status
-    from_token_obj = db.query(Token).filter(Token.name == from_token).first()
-    to_token_obj = db.query(Token).filter(Token.name == to_token).first()
-
-    if not from_token_obj:
-        return {
-            "status": "error",
-            "error": f"'{from_token}' is not recognized. Please add it first.",
-            "status_code": status.HTTP_400_BAD_REQUEST,
-        }
-    if not to_token_obj:
-        return {
-            "status": "error",
-            "error": f"'{to_token}' is not recognized. Please add it first.",
-            "status_code": status.HTTP_400_BAD_REQUEST,
-        }
-    if from_token_obj.is_stable and to_token_obj.is_stable:
-        return {
-            "status": "error",
-            "error": "Both tokens cannot be stablecoins",
-            "status_code": status.HTTP_400_BAD_REQUEST,
-        }
-    if not from_token_obj.is_stable and not to_token_obj.is_stable:
-        return {
-            "status": "error",
-            "error": "One of the tokens must be a stablecoin",
-            "status_code": status.HTTP_400_BAD_REQUEST,
-        }
+    sync_data_version(db)
+    if get_token_graph(db).equivalent(from_token, to_token):
+        return process_add_conversion(
+            timestamp, from_token, to_token, from_amount, to_amount, db
+        )
 
-    # Determine which is the stablecoin and which is the non-stablecoin
-    if from_token_obj.is_stable:
-        stablecoin = from_token
-        non_stablecoin = to_token
-        final_usd = -from_amount
-        final_amount = to_amount
-    else:
-        stablecoin = to_token
-        non_stablecoin = from_token
-        final_usd = to_amount
-        final_amount = -from_amount
+    _, values, error = validate_transaction(
+        timestamp, from_token, to_token, from_amount, to_amount, db
+    )
+    if error:
+        return error
+    non_stablecoin = values["token"]
+    stablecoin = values["stable_coin"]
+    final_amount = values["amount"]
+    final_usd = values["total_usd"]
 
     try:
-        new_transaction = Transaction(
-            timestamp=timestamp,
-            token=non_stablecoin,
-            amount=final_amount,
-            stable_coin=stablecoin,
-            total_usd=final_usd,
-        )
+        new_transaction = Transaction(**values)
         db.add(new_transaction)
+        invalidate_checkpoints(db, timestamp)
         db.commit()
     except IntegrityError:
         db.rollback()
@@ -96,6 +181,9 @@ def process_add_transaction(
             "error": f"Transaction for '{non_stablecoin}' at '{timestamp}' already exists.",
             "status_code": status.HTTP_409_CONFLICT,
         }
+    bump_data_version(db)
+    if feed.has_subscribers():
+        publish_transactions([new_transaction])
 
     return {
         "status": "success",
@@ -106,3 +194,185 @@ def process_add_transaction(
         "total_usd": final_usd,
         "message": f"Transaction added: timestamp '{timestamp}', token '{non_stablecoin}', amount '{final_amount}', stable_coin '{stablecoin}', total_usd '{final_usd}'.",
     }
+
+
+# Rows per multi-row INSERT; 5 columns each keeps well under SQLite's
+# bound-parameter limit.
+INGEST_CHUNK_SIZE = 500
+
+
+def ingest_transactions(transactions: Iterable, db: Session) -> dict:
+    """
+    Idempotently store a batch of swaps, skipping ones that already exist.
+    Swaps between equivalent tokens are stored as conversions, like
+    process_add_transaction does.
+
+    Meant for re-imports where most rows are duplicates: tokens are loaded in
+    one query, existing (timestamp, token) keys in another, and the remaining
+    rows go in as multi-row INSERT ... ON CONFLICT DO NOTHING statements, so
+    duplicates never raise and the session never has to roll back.
+
+    Args:
+        transactions (Iterable): Objects with timestamp, from_token, to_token,
+            from_amount and to_amount attributes (e.g. ExtractedTransaction)
+        db (Session): Database session for querying and saving
+
+    Returns:
+        dict: inserted/skipped counts, the inserted rows as details and the
+        transactions rejected by validation as failed
+    """
+    transactions = list(transactions)
+    names = {t.from_token for t in transactions} | {t.to_token for t in transactions}
+    tokens = {
+        token.name: token
+        for token in db.query(Token).filter(Token.name.in_(names)).all()
+    }
+
+    archived_until = get_archived_until(db)
+    graph = get_token_graph(db)
+
+    candidates = {}
+    conversions = {}
+    failed = []
+    skipped = 0
+    for t in transactions:
+        error = _validate_token_pair(
+            t.from_token,
+            t.to_token,
+            tokens.get(t.from_token),
+            tokens.get(t.to_token),
+            graph,
+        ) or archived_error(t.timestamp, archived_until)
+        if error:
+            failed.append({"section": str(t), "error": error})
+            continue
+        if graph.equivalent(t.from_token, t.to_token):
+            key = (t.timestamp, t.from_token)
+            if key in conversions:
+                skipped += 1
+                continue
+            conversions[key] = conversion_values(
+                t.timestamp, t.from_token, t.to_token, t.from_amount, t.to_amount
+            )
+            continue
+        values = _transaction_values(
+            t.timestamp,
+            tokens[t.from_token],
+            tokens[t.to_token],
+            t.from_amount,
+            t.to_amount,
+        )
+        key = (values["timestamp"], values["token"])
+        if key in candidates:
+            skipped += 1
+            continue
+        candidates[key] = values
+
+    if candidates:
+        existing = set(
+            db.query(Transaction.timestamp, Transaction.token)
+            .filter(
+                Transaction.token.in_({token for _, token in candidates}),
+                Transaction.timestamp.in_({ts for ts, _ in candidates}),
+            )
+            .all()
+        )
+        for key in existing & candidates.keys():
+            del candidates[key]
+            skipped += 1
+
+    rows = list(candidates.values())
+    inserted = 0
+    for start in range(0, len(rows), INGEST_CHUNK_SIZE):
+        chunk = rows[start : start + INGEST_CHUNK_SIZE]
+        result = db.execute(
+            insert_ignoring_duplicates(db, Transaction, ["timestamp", "token"]).values(
+                chunk
+            )
+        )
+        inserted += result.rowcount
+    # Rows lost to a concurrent writer between the pre-check and the insert
+    skipped += len(rows) - inserted
+    if inserted:
+        # Old screenshots insert out of order; later checkpoints are stale
+        invalidate_checkpoints(db, min(row["timestamp"] for row in rows))
+    converted = 0
+    if conversions:
+        # Rare; the conflict clause alone skips existing ones
+        converted = db.execute(
+            insert_ignoring_duplicates(
+                db, Conversion, ["timestamp", "from_token"]
+            ).values(list(conversions.values()))
+        ).rowcount
+        skipped += len(conversions) - converted
+    db.commit()
+    if inserted or converted:
+        bump_data_version(db)
+    if inserted and feed.has_subscribers():
+        # The bulk insert returns no ids; read the rows back
+        keys = {(row["timestamp"], row["token"]) for row in rows}
+        stored = (
+            db.query(Transaction)
+            .filter(
+                Transaction.token.in_({token for _, token in keys}),
+                Transaction.timestamp.in_({ts for ts, _ in keys}),
+            )
+            .order_by(Transaction.id)
+        )
+        publish_transactions(t for t in stored if (t.timestamp, t.token) in keys)
+
+    return {
+        "inserted": inserted + converted,
+        "skipped": skipped,
+        "details": [{"status": "success", **row} for row in rows]
+        + [
+            {"status": "success", "conversion": True, **row}
+            for row in conversions.values()
+        ],
+        "failed": failed,
+    }
+
+
+def token_history_query(
+    db: Session, token: str, since: Optional[datetime] = None
+) -> Query:
+    """
+    Build the chronological transaction history query for one token.
+
+    The filter and ordering match ix_transactions_token_timestamp, so the
+    lookup is an index range scan rather than a full table scan.
+
+    Args:
+        db (Session): Database session
+        token (str): The non-stablecoin token symbol
+        since (datetime, optional): Only include transactions from this moment on
+
+    Returns:
+        Query: Transactions for the token ordered by timestamp
+    """
+    query = db.query(Transaction).filter(Transaction.token == token)
+    if since is not None:
+        query = query.filter(Transaction.timestamp >= since)
+    return query.order_by(Transaction.timestamp)
+
+
+def stable_coin_history_query(
+    db: Session, stable_coin: str, since: Optional[datetime] = None
+) -> Query:
+    """
+    Build the chronological transaction history query for one stablecoin.
+
+    Served by ix_transactions_stable_coin_timestamp.
+
+    Args:
+        db (Session): Database session
+        stable_coin (str): The stablecoin symbol
+        since (datetime, optional): Only include transactions from this moment on
+
+    Returns:
+        Query: Transactions settled in the stablecoin ordered by timestamp
+    """
+    query = db.query(Transaction).filter(Transaction.stable_coin == stable_coin)
+    if since is not None:
+        query = query.filter(Transaction.timestamp >= since)
+    return query.order_by(Transaction.timestamp)
@@ -1,13 +1,52 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
 
+from fastapi import FastAPI, status
+from fastapi.responses import JSONResponse
+
+from app.analytics import start_analytics, stop_analytics
 from app.api import router as api_router
+from app.ocr import shutdown_tile_pool
+from app.profiling import ProfilingMiddleware
+from app.profiling import router as profiling_router
 from app.ui import router as ui_router
+from app.warmup import start_warm_up, warmup_state
+from app.write_behind import start_write_behind, stop_write_behind
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background: the port opens right away, /ready tells the
+    # load balancer when to start routing traffic.
+    start_warm_up()
+    start_write_behind()
+    start_analytics()
+    yield
+    stop_analytics()
+    stop_write_behind()
+    shutdown_tile_pool()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ProfilingMiddleware)
 app.include_router(ui_router)
 app.include_router(api_router)
+app.include_router(profiling_router)
 
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "components": {"api": "healthy", "ui": "healthy"}}
+
+
+@app.get("/ready")
+async def readiness_check():
+    if not warmup_state.ready.is_set():
+        return JSONResponse(
+            content={"status": "warming up", "components": warmup_state.components},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    return {
+        "status": "ready",
+        "warmup_seconds": round(warmup_state.duration, 2),
+        "components": warmup_state.components,
+    }
@@ -1,15 +1,22 @@
 from sqlalchemy import (
+    JSON,
     Boolean,
     Column,
     DateTime,
-    Float,
+    Index,
     Integer,
+    Numeric,
     String,
+    Text,
     UniqueConstraint,
 )
 
 from app.database import Base
 
+# Fixed-point type for token amounts and USD totals. Ten decimal places cover
+# the precision shown by explorers while staying exact under SUM/AVG.
+Amount = Numeric(precision=28, scale=10)
+
 
 class Token(Base):
     __tablename__ = "tokens"
@@ -21,13 +28,134 @@ class Token(Base):
 class Transaction(Base):
     __tablename__ = "transactions"
 
+    # On Postgres the table is range-partitioned by month on timestamp, so its
+    # primary key there is (id, timestamp); see app/logic/archive.py.
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime, nullable=False)
     token = Column(String(8), nullable=False)
-    amount = Column(Float, nullable=False)
-    total_usd = Column(Float, nullable=False)
+    amount = Column(Amount, nullable=False)
+    total_usd = Column(Amount, nullable=False)
     stable_coin = Column(String(8), nullable=False)
 
     __table_args__ = (
         UniqueConstraint("timestamp", "token", name="uq_timestamp_token"),
+        Index("ix_transactions_token_timestamp", "token", "timestamp"),
+        Index("ix_transactions_stable_coin_timestamp", "stable_coin", "timestamp"),
+    )
+
+
+class TransactionArchive(Base):
+    """
+    A calendar month of transactions moved out of the transactions table
+    into a Parquet file under the archive directory.
+
+    `totals` maps each token to its transaction count and exact amount and
+    total_usd sums (as strings), so aggregates can include the archived
+    months without opening the files.
+    """
+
+    __tablename__ = "transaction_archives"
+
+    # First moment of the month
+    month = Column(DateTime, primary_key=True)
+    path = Column(String(255), nullable=False)
+    rows = Column(Integer, nullable=False)
+    totals = Column(JSON, nullable=False)
+    archived_at = Column(DateTime, nullable=False)
+
+
+class HoldingCheckpoint(Base):
+    """
+    Running totals of one token over every transaction up to and including
+    `timestamp`; all tokens seen by then get a row per checkpoint.
+    """
+
+    __tablename__ = "holding_checkpoints"
+
+    timestamp = Column(DateTime, primary_key=True)
+    token = Column(String(8), primary_key=True)
+    transactions = Column(Integer, nullable=False)
+    amount = Column(Amount, nullable=False)
+    total_usd = Column(Amount, nullable=False)
+
+
+class TokenLink(Base):
+    """
+    Equivalence edge: one unit of `token` is worth `factor` units of
+    `base_token` (e.g. stETH -> ETH, 1). Each token has at most one base,
+    so the links form trees whose roots are the tokens others resolve to.
+    """
+
+    __tablename__ = "token_links"
+
+    token = Column(String(8), primary_key=True)
+    base_token = Column(String(8), nullable=False, index=True)
+    factor = Column(Amount, nullable=False)
+
+
+class Conversion(Base):
+    """A swap between two equivalent tokens, e.g. ETH -> stETH."""
+
+    __tablename__ = "conversions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    timestamp = Column(DateTime, nullable=False)
+    from_token = Column(String(8), nullable=False)
+    to_token = Column(String(8), nullable=False)
+    from_amount = Column(Amount, nullable=False)
+    to_amount = Column(Amount, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("timestamp", "from_token", name="uq_conversion_timestamp"),
     )
+
+
+class SharedVersion(Base):
+    """Counters shared by all worker processes, e.g. the cache data version."""
+
+    __tablename__ = "data_versions"
+
+    name = Column(String(32), primary_key=True)
+    version = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class OcrResult(Base):
+    """
+    Raw OCR output of one uploaded screenshot, kept so parser fixes can be
+    replayed without running text recognition again.
+
+    `boxes` holds [[x_min, y_min], [x_max, y_max]], text, confidence triples;
+    `text` is what the parser was given. The counters describe the most
+    recent parse; `rejected` counts its transactions that were kept out of
+    the database, held back by symbol snapping or refused by validation
+    (e.g. an unknown token). Duplicates of stored transactions are not
+    rejections.
+    """
+
+    __tablename__ = "ocr_results"
+
+    image_sha256 = Column(String(64), primary_key=True)
+    boxes = Column(JSON, nullable=True)
+    text = Column(Text, nullable=False)
+    layout = Column(String(32), nullable=True)
+    transactions = Column(Integer, nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    parsed_at = Column(DateTime, nullable=False)
+
+
+class Price(Base):
+    """
+    USD price of a token at a moment, from an imported series or implied by
+    a stored trade (total_usd / amount).
+    """
+
+    __tablename__ = "prices"
+
+    token = Column(String(8), primary_key=True)
+    timestamp = Column(DateTime, primary_key=True)
+    price_usd = Column(Amount, nullable=False)
+    # "csv" or "trade"
+    source = Column(String(16), nullable=False)
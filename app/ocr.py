@@ -1,161 +1,442 @@
+import hashlib
 import io
-import re
+import multiprocessing
+import os
 import warnings
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
 
 import easyocr
-from fastapi import UploadFile
+import numpy as np
+import torch
+from fastapi import UploadFile, status
 from fastapi.responses import JSONResponse
 from PIL import Image
-from pydantic import BaseModel
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
 
-from app.logic.transactions import process_add_transaction
-
-
-class ExtractedTransaction(BaseModel):
-    timestamp: datetime
-    from_token: str
-    to_token: str
-    from_amount: float
-    to_amount: float
+from app.cache import sync_data_version
+from app.config import Settings, get_settings
+from app.logic.token_matching import TokenIndex, get_token_index
+from app.logic.transactions import ingest_transactions, process_add_transaction
+from app.models import OcrResult
+from app.parsers import DebankParser, ExtractedTransaction, parse_screenshot
+from app.profiling import profile_stage
 
 
 def parse_debank_screenshot(text: str):
     """
     Parse text extracted from a Debank screenshot to identify transactions.
     """
+    result = DebankParser().parse(text)
+    return result.transactions, result.failures
 
-    transactions = []
-    failures = []
-    text = text.replace("\n", " ").replace("\r", " ")
 
-    # Split by "Contract Interaction"
-    sections = text.split("Contract Interaction")
-
-    for i, section in enumerate(sections[1:], 1):
-        section = section.strip()
-        print(f"section: {section}")
-        if not section:
-            continue
+@lru_cache
+def get_reader() -> easyocr.Reader:
+    """
+    Return the process-wide EasyOCR reader, loading the models on first use.
 
-        curr_transaction = {}
+    Under gunicorn with preload the master calls this before forking, so the
+    workers inherit the loaded model weights copy-on-write.
+    """
+    return build_reader(get_settings())
 
-        amount_pattern = r"([+-]?)\s*(\d+(?:\.\d+)?)\s+([A-Z]+)\s*\([s$]?[\d,.]+\)"
 
-        # Find all amounts with their signs
-        matches = re.finditer(amount_pattern, section)
-        amounts = []
+def build_reader(settings: Settings) -> easyocr.Reader:
+    """Load an EasyOCR reader for the inference backend the settings select."""
+    warnings.filterwarnings("ignore", message=".*pin_memory.*no accelerator.*")
+    if settings.ocr_torch_threads:
+        torch.set_num_threads(settings.ocr_torch_threads)
+    return easyocr.Reader(
+        ["en"],
+        download_enabled=False,
+        gpu=False,
+        detect_network=settings.ocr_detect_network,
+        recog_network=settings.ocr_recog_network,
+        quantize=settings.ocr_backend == "quantized",
+    )
 
-        for match in matches:
-            sign = match.group(1)  # '', '+', or '-'
-            amount = float(match.group(2))
-            token = match.group(3)
 
-            amounts.append({"sign": sign, "amount": amount, "token": token})
+def snap_token_symbols(
+    transactions: list[ExtractedTransaction], index: TokenIndex
+) -> tuple[list[ExtractedTransaction], list[dict], list[dict]]:
+    """
+    Replace misread tickers with the known token symbol they closely match.
 
-        print(
-            f"Found amounts: {[(a['amount'], a['token'], a['sign']) for a in amounts]}"
-        )
+    Only typical OCR misreads are snapped (see is_ocr_misread). A ticker
+    one other edit away from a known symbol may be a real token that is not
+    registered yet, so its transaction is held back as a failure suggesting
+    the known symbol instead of being booked as it.
 
-        # Process based on signs found
-        if len(amounts) == 2:
-            # Categorize amounts
-            plus_amount = None
-            minus_amount = None
-            unsigned_amount = None
-
-            for amount_info in amounts:
-                if amount_info["sign"] == "+":
-                    plus_amount = amount_info
-                elif amount_info["sign"] == "-":
-                    minus_amount = amount_info
-                else:  # empty string = no sign
-                    unsigned_amount = amount_info
-
-            # Decision logic based on what we found
-            if plus_amount and minus_amount:
-                # Both explicit: use as-is
-                curr_transaction["from_amount"] = minus_amount["amount"]
-                curr_transaction["from_token"] = minus_amount["token"]
-                curr_transaction["to_amount"] = plus_amount["amount"]
-                curr_transaction["to_token"] = plus_amount["token"]
-            elif plus_amount and unsigned_amount:
-                # Plus + unsigned: unsigned becomes from (negative)
-                curr_transaction["from_amount"] = unsigned_amount["amount"]
-                curr_transaction["from_token"] = unsigned_amount["token"]
-                curr_transaction["to_amount"] = plus_amount["amount"]
-                curr_transaction["to_token"] = plus_amount["token"]
-            elif minus_amount and unsigned_amount:
-                # Minus + unsigned: unsigned becomes to (positive)
-                curr_transaction["from_amount"] = minus_amount["amount"]
-                curr_transaction["from_token"] = minus_amount["token"]
-                curr_transaction["to_amount"] = unsigned_amount["amount"]
-                curr_transaction["to_token"] = unsigned_amount["token"]
-
-        # Handle timestamp with flexible separators
-        timestamp_patterns = [
-            r"(\d{4}/\d{2}/\d{2})\s+(\d{2})[.:](\d{2})[.:](\d{2})",
-            r"(\d{4}/\d{2}/\d{2})\s+(\d{1,2})[.:](\d{2})[.:](\d{2})",
-        ]
-
-        for pattern in timestamp_patterns:
-            timestamp_match = re.search(pattern, section)
-            if timestamp_match:
-                try:
-                    date_part = timestamp_match.group(1)
-                    hour = timestamp_match.group(2).zfill(2)
-                    minute = timestamp_match.group(3)
-                    second = timestamp_match.group(4)
-                    timestamp_str = f"{date_part} {hour}:{minute}:{second}"
-                    curr_transaction["timestamp"] = datetime.strptime(
-                        timestamp_str, "%Y/%m/%d %H:%M:%S"
-                    )
-                    break
-                except ValueError:
-                    print(f"Failed to parse: {timestamp_str}")
-                    continue
+    Returns the transactions to store, one entry per snapped symbol (read,
+    token, distance, confidence) and the held-back transactions as failures.
+    Symbols without an unambiguous match are left as read so validation
+    reports them as unrecognized.
+    """
+    snapped = []
+    corrections = []
+    failures = []
+    for t in transactions:
+        update = {}
+        suggestions = {}
+        for field in ("from_token", "to_token"):
+            match = index.match(getattr(t, field))
+            if match is None or match.distance == 0:
+                continue
+            if match.misread:
+                update[field] = match.token
+                corrections.append(match.model_dump())
             else:
-                print(f"No timestamp match in: {section}")
-
-        required_keys = [
-            "timestamp",
-            "from_token",
-            "to_token",
-            "from_amount",
-            "to_amount",
-        ]
-
-        print(curr_transaction)
-
-        # If we have all required fields, add the transaction
-        if all(k in curr_transaction for k in required_keys):
-            try:
-                transactions.append(ExtractedTransaction(**curr_transaction))
-            except Exception as e:
-                failures.append({"section": section, "error": str(e)})
-        else:
-            missing = [k for k in required_keys if k not in curr_transaction]
+                suggestions[match.read] = match.token
+        if suggestions:
             failures.append(
-                {"section": section, "error": f"Missing fields: {', '.join(missing)}"}
+                {
+                    "section": str(t),
+                    "error": "; ".join(
+                        f"Token '{read}' is not registered; did you mean '{token}'?"
+                        for read, token in suggestions.items()
+                    ),
+                    "suggestions": suggestions,
+                }
             )
+            continue
+        snapped.append(t.model_copy(update=update) if update else t)
+    return snapped, corrections, failures
 
-    return transactions, failures
 
+def group_boxes_into_rows(results: list, min_confidence: float = 0.0) -> list:
+    """
+    Rebuild the visual rows of a screenshot from EasyOCR results.
 
-def get_extracted_text(contents: bytes) -> str:
+    `results` are EasyOCR's (corner points, text, confidence) triples. Boxes
+    below `min_confidence` are dropped first. The rest are sorted by vertical
+    centre; a new row starts wherever the gap to the previous centre exceeds
+    half the median box height. Within a row the cells are ordered left to
+    right. Everything is vectorised over the boxes, so no pairwise comparison
+    is done in Python.
+
+    Returns:
+        list: Rows top to bottom, each a list of cell texts
+    """
+    if not results:
+        return []
+    confidence = np.fromiter((r[2] for r in results), dtype=float, count=len(results))
+    keep = np.flatnonzero(confidence >= min_confidence)
+    if not keep.size:
+        return []
+    corners = np.array([results[i][0] for i in keep], dtype=float)
+    texts = [results[i][1] for i in keep]
+
+    top = corners[:, :, 1].min(axis=1)
+    bottom = corners[:, :, 1].max(axis=1)
+    left = corners[:, :, 0].min(axis=1)
+    centre = (top + bottom) / 2
+
+    by_centre = np.argsort(centre, kind="stable")
+    breaks = np.diff(centre[by_centre]) > np.median(bottom - top) / 2
+    row = np.empty(len(texts), dtype=int)
+    row[by_centre] = np.concatenate(([0], np.cumsum(breaks)))
+
+    rows = [[] for _ in range(row.max() + 1)]
+    for i in np.lexsort((left, row)):
+        rows[row[i]].append(texts[i])
+    return rows
+
+
+def _compact_boxes(results: list, offset_y: int = 0) -> list:
+    """EasyOCR results as [[x_min, y_min], [x_max, y_max]], text, confidence."""
+    boxes = []
+    for corners, text, confidence in results:
+        xs = [point[0] for point in corners]
+        ys = [point[1] for point in corners]
+        boxes.append(
+            [
+                [
+                    [int(min(xs)), int(min(ys)) + offset_y],
+                    [int(max(xs)), int(max(ys)) + offset_y],
+                ],
+                text,
+                round(float(confidence), 3),
+            ]
+        )
+    return boxes
+
+
+def plan_tiles(height: int, tile_height: int, overlap: int) -> list[tuple[int, int]]:
+    """Split [0, height) into (top, bottom) strips overlapping by `overlap` px."""
+    if overlap >= tile_height:
+        raise ValueError("OCR tile overlap must be smaller than the tile height")
+    tiles = []
+    top = 0
+    while True:
+        bottom = min(top + tile_height, height)
+        tiles.append((top, bottom))
+        if bottom == height:
+            return tiles
+        top += tile_height - overlap
+
+
+def merge_tile_boxes(tiles: list[tuple[int, int]], tile_boxes: list[list]) -> list:
+    """
+    Merge per-strip boxes into page coordinates, keeping each line once.
+
+    Every overlap zone is split at its midline: the upper strip owns boxes
+    whose vertical centre lies above it, the lower strip those below. A line
+    inside the overlap is read whole by both strips but kept once, and a
+    line cut by a strip edge has its centre on the neighbour's side (as long
+    as the overlap is taller than the line), so the clipped copy is dropped
+    in favour of the neighbour's whole one. Strips are visited top to bottom,
+    which keeps the page order of sections.
+    """
+    merged = []
+    for i, ((top, bottom), boxes) in enumerate(zip(tiles, tile_boxes)):
+        upper = (top + tiles[i - 1][1]) / 2 if i > 0 else float("-inf")
+        lower = (tiles[i + 1][0] + bottom) / 2 if i + 1 < len(tiles) else float("inf")
+        for corners, text, confidence in boxes:
+            (x0, y0), (x1, y1) = corners
+            if upper <= top + (y0 + y1) / 2 < lower:
+                merged.append([[[x0, y0 + top], [x1, y1 + top]], text, confidence])
+    return merged
+
+
+_tile_pool: Optional[ProcessPoolExecutor] = None
+_tile_pool_workers = 0
+# The reader of a tile worker process, loaded by its initializer
+_tile_reader = None
+
+
+def _init_tile_worker(load_reader):
+    global _tile_reader
+    # Each worker reads one strip at a time; torch threads on top of the
+    # worker processes would only oversubscribe the cores.
+    torch.set_num_threads(1)
+    _tile_reader = load_reader()
+
+
+def _read_tile(tile: np.ndarray) -> list:
+    reader = _tile_reader if _tile_reader is not None else get_reader()
+    return _compact_boxes(reader.readtext(tile))
+
+
+def _get_tile_pool(workers: int) -> ProcessPoolExecutor:
+    global _tile_pool, _tile_pool_workers
+    if _tile_pool is not None and _tile_pool_workers != workers:
+        shutdown_tile_pool()
+    if _tile_pool is None:
+        # Forking the threaded server could copy a lock some other thread
+        # holds; the workers start from a clean forkserver process instead
+        # and load their own reader.
+        methods = multiprocessing.get_all_start_methods()
+        method = "forkserver" if "forkserver" in methods else "spawn"
+        _tile_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_init_tile_worker,
+            initargs=(get_reader,),
+        )
+        _tile_pool_workers = workers
+    return _tile_pool
+
+
+def shutdown_tile_pool():
+    global _tile_pool, _tile_pool_workers
+    if _tile_pool is not None:
+        _tile_pool.shutdown()
+        _tile_pool = None
+        _tile_pool_workers = 0
+
+
+def tile_workers(settings: Settings) -> int:
+    """
+    Worker processes for tiled OCR: OCR_TILE_WORKERS, or one per core, capped
+    at this server worker's share of the cores so that the pools of all
+    WEB_CONCURRENCY workers together never outnumber them.
+    """
+    share = max(1, (os.cpu_count() or 1) // max(1, settings.web_concurrency))
+    return min(settings.ocr_tile_workers or share, share)
+
+
+def get_tiled_ocr_boxes(
+    image: np.ndarray, tile_height: int, overlap: int, workers: int
+) -> list:
+    """OCR a tall image as overlapping strips spread over worker processes."""
+    tiles = plan_tiles(image.shape[0], tile_height, overlap)
+    strips = [image[top:bottom] for top, bottom in tiles]
+    if workers == 1:
+        tile_boxes = [_read_tile(strip) for strip in strips]
+    else:
+        tile_boxes = list(_get_tile_pool(workers).map(_read_tile, strips))
+    return merge_tile_boxes(tiles, tile_boxes)
+
+
+def get_ocr_boxes(contents: bytes) -> list:
+    """
+    Run text recognition on an image.
+
+    Images taller than 1.5 x OCR_TILE_HEIGHT are read in parallel strips
+    (see get_tiled_ocr_boxes).
+
+    Returns:
+        list: [[x_min, y_min], [x_max, y_max]], text, confidence triples;
+        the axis-aligned corners are all the row grouping needs
+    """
     img = Image.open(io.BytesIO(contents))
-    warnings.filterwarnings("ignore", message=".*pin_memory.*no accelerator.*")
-    reader = easyocr.Reader(["en"], download_enabled=False, gpu=False)
-    result = reader.readtext(img)
-    return " ".join([text[1] for text in result])
+    settings = get_settings()
+    if settings.ocr_tile_height and img.height > 1.5 * settings.ocr_tile_height:
+        return get_tiled_ocr_boxes(
+            np.asarray(img.convert("RGB")),
+            settings.ocr_tile_height,
+            settings.ocr_tile_overlap,
+            tile_workers(settings),
+        )
+    return _compact_boxes(get_reader().readtext(img))
+
 
+def boxes_to_text(boxes: list) -> str:
+    """Lay out OCR boxes as parser input according to OCR_LAYOUT_MODE."""
+    settings = get_settings()
+    if settings.ocr_layout_mode == "rows":
+        rows = group_boxes_into_rows(boxes, settings.ocr_min_confidence)
+        return "\n".join(" ".join(cells) for cells in rows)
+    return " ".join([box[1] for box in boxes])
 
-async def extract_transactions_from_image_upload(image: UploadFile, db):
-    contents = await image.read()
-    extracted_text = get_extracted_text(contents)
-    transactions, parse_failures = parse_debank_screenshot(extracted_text)
 
-    if not transactions:
+def recognize_image(contents: bytes) -> tuple[Optional[list], str]:
+    """OCR an image; returns the raw boxes and the text handed to the parser."""
+    boxes = get_ocr_boxes(contents)
+    return boxes, boxes_to_text(boxes)
+
+
+def get_extracted_text(contents: bytes) -> str:
+    return recognize_image(contents)[1]
+
+
+def store_ocr_result(
+    db: Session, image_sha256: str, boxes: Optional[list], text: str, parsed
+):
+    """Keep (or refresh) the raw OCR output of an upload for later re-parsing."""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    record = db.get(OcrResult, image_sha256)
+    if record is None:
+        record = OcrResult(image_sha256=image_sha256, created_at=now)
+        db.add(record)
+    record.boxes = boxes
+    record.text = text
+    _record_parse(record, parsed, now)
+    db.commit()
+
+
+def _record_parse(record: OcrResult, parsed, parsed_at: datetime):
+    record.layout = parsed.layout
+    record.transactions = len(parsed.transactions)
+    record.failures = len(parsed.failures)
+    record.rejected = 0
+    record.parsed_at = parsed_at
+
+
+def _count_rejected(transactions: list[ExtractedTransaction], failures: list[dict]):
+    sections = {str(t) for t in transactions}
+    return sum(1 for failure in failures if failure["section"] in sections)
+
+
+def record_rejections(
+    db: Session,
+    image_sha256: str,
+    transactions: list[ExtractedTransaction],
+    failures: list[dict],
+):
+    """
+    Count the screenshot's transactions among the snapping and insert
+    `failures`, so the default reparse replays it. `transactions` are the
+    parsed ones and their snapped copies. The caller commits.
+    """
+    record = db.get(OcrResult, image_sha256)
+    record.rejected = _count_rejected(transactions, failures)
+
+
+def reparse_stored_results(db: Session, include_parsed: bool = False) -> dict:
+    """
+    Replay stored OCR output through the current parsers and the insert path.
+
+    Only screenshots whose last parse found nothing, had failures or had
+    transactions rejected on insert are replayed unless `include_parsed` is
+    set. Boxes are laid out again with
+    the current settings, so row grouping changes apply too. All recovered
+    transactions are written with one ingest_transactions call, which skips
+    the ones already stored.
+
+    Returns:
+        dict: screenshots replayed, transactions parsed, inserted/skipped
+        counts, parse and validation failures, and symbol corrections
+    """
+    query = db.query(OcrResult)
+    if not include_parsed:
+        query = query.filter(
+            or_(
+                OcrResult.failures > 0,
+                OcrResult.rejected > 0,
+                OcrResult.transactions == 0,
+            )
+        )
+    records = query.all()
+
+    sync_data_version(db)
+    index = get_token_index(db)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    transactions, failures, held_back, corrections = [], [], [], []
+    replayed = []
+    for record in records:
+        if record.boxes is not None:
+            record.text = boxes_to_text(record.boxes)
+        parsed = parse_screenshot(record.text)
+        snapped, fixed, held = snap_token_symbols(parsed.transactions, index)
+        _record_parse(record, parsed, now)
+        transactions += snapped
+        failures += parsed.failures
+        held_back += held
+        corrections += fixed
+        replayed.append((record, parsed.transactions + snapped))
+    db.commit()
+
+    result = ingest_transactions(transactions, db)
+    rejected = held_back + result["failed"]
+    for record, parsed_transactions in replayed:
+        record.rejected = _count_rejected(parsed_transactions, rejected)
+    db.commit()
+    return {
+        "screenshots": len(records),
+        "transactions": len(transactions),
+        "inserted": result["inserted"],
+        "skipped": result["skipped"],
+        "failed": failures + rejected,
+        "corrections": corrections,
+    }
+
+
+async def extract_transactions_from_image_upload(
+    image: UploadFile, db, idempotent: bool = False
+):
+    with profile_stage("ocr: read upload"):
+        contents = await image.read()
+        image_sha256 = hashlib.sha256(contents).hexdigest()
+    with profile_stage("ocr: text recognition"):
+        boxes, extracted_text = recognize_image(contents)
+    with profile_stage("ocr: parse"):
+        parsed = parse_screenshot(extracted_text)
+        transactions, parse_failures = parsed.transactions, parsed.failures
+    with profile_stage("ocr: store raw result"):
+        store_ocr_result(db, image_sha256, boxes, extracted_text, parsed)
+    with profile_stage("ocr: snap token symbols"):
+        sync_data_version(db)
+        transactions, corrections, held_back = snap_token_symbols(
+            transactions, get_token_index(db)
+        )
+        parse_failures = list(parse_failures) + held_back
+
+    if not transactions and not held_back:
         return JSONResponse(
             content={
                 "status": "info",
@@ -165,19 +446,48 @@ async def extract_transactions_from_image_upload(image: UploadFile, db):
             status_code=200,
         )
 
+    if idempotent:
+        with profile_stage("ocr: store transactions"):
+            result = ingest_transactions(transactions, db)
+        record_rejections(
+            db,
+            image_sha256,
+            parsed.transactions + transactions,
+            held_back + result["failed"],
+        )
+        db.commit()
+        return {
+            "status": "success" if result["inserted"] > 0 else "info",
+            "message": f"Added {result['inserted']} out of {len(transactions)} transactions from the image, skipped {result['skipped']} already stored.",
+            "inserted": result["inserted"],
+            "skipped": result["skipped"],
+            "details": result["details"],
+            "failed": list(parse_failures) + result["failed"],
+            "corrections": corrections,
+            "layout": parsed.layout,
+        }
+
     # Process and save each transaction
     results = []
     failures = list(parse_failures)
+    rejected = list(held_back)
     for t in transactions:
         try:
-            result = process_add_transaction(
-                timestamp=t.timestamp,
-                from_token=t.from_token,
-                to_token=t.to_token,
-                from_amount=t.from_amount,
-                to_amount=t.to_amount,
-                db=db,
-            )
+            with profile_stage("ocr: store transactions"):
+                result = process_add_transaction(
+                    timestamp=t.timestamp,
+                    from_token=t.from_token,
+                    to_token=t.to_token,
+                    from_amount=t.from_amount,
+                    to_amount=t.to_amount,
+                    db=db,
+                )
+            # Duplicates of stored transactions are not rejections
+            if (
+                result["status"] == "error"
+                and result["status_code"] != status.HTTP_409_CONFLICT
+            ):
+                rejected.append({"section": str(t), "error": result["error"]})
             results.append(
                 {
                     "status": "success",
@@ -187,6 +497,9 @@ async def extract_transactions_from_image_upload(image: UploadFile, db):
             )
         except Exception as e:
             failures.append({"section": str(t), "error": str(e)})
+            rejected.append(failures[-1])
+    record_rejections(db, image_sha256, parsed.transactions + transactions, rejected)
+    db.commit()
 
     # Count successful transactions
     successful = sum(
@@ -198,4 +511,6 @@ async def extract_transactions_from_image_upload(image: UploadFile, db):
         "message": f"Added {successful} out of {len(transactions)} transactions from the image.",
         "details": results,
         "failed": failures,
+        "corrections": corrections,
+        "layout": parsed.layout,
     }
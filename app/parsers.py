@@ -0,0 +1,205 @@
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ExtractedTransaction(BaseModel):
+    timestamp: datetime
+    from_token: str
+    to_token: str
+    from_amount: float
+    to_amount: float
+
+
+class ParseResult(BaseModel):
+    """
+    Outcome of parsing the OCR text of one screenshot.
+
+    Attributes:
+        layout (str, optional): Name of the parser that recognised the layout,
+            None if no registered layout matched
+        transactions (list): Fully parsed transactions
+        failures (list): Sections that looked like transactions but could not
+            be parsed, each with the section text and an error
+    """
+
+    layout: Optional[str] = None
+    transactions: list[ExtractedTransaction] = []
+    failures: list[dict] = []
+
+
+class ScreenshotParser(ABC):
+    """
+    Base class for one screenshot layout.
+
+    Subclasses set `name`, a `fingerprint` regex that only text from their
+    layout contains (without capturing groups, it becomes part of the
+    dispatcher's combined pattern), and implement `parse`. Patterns should be
+    compiled once at class level, not per call. A subclass missing `parse`
+    cannot be instantiated, so registering it fails at import.
+    """
+
+    name: str
+    fingerprint: str
+
+    @abstractmethod
+    def parse(self, text: str) -> ParseResult:
+        """Parse OCR text showing this layout."""
+
+
+_parsers: list[ScreenshotParser] = []
+_dispatch_pattern: Optional[re.Pattern] = None
+
+
+def register_parser(cls: type[ScreenshotParser]) -> type[ScreenshotParser]:
+    """Class decorator adding a layout to the registry."""
+    global _dispatch_pattern
+    parser = cls()
+    _parsers[:] = [p for p in _parsers if p.name != cls.name]
+    _parsers.append(parser)
+    _dispatch_pattern = None
+    return cls
+
+
+def unregister_parser(name: str):
+    global _dispatch_pattern
+    _parsers[:] = [p for p in _parsers if p.name != name]
+    _dispatch_pattern = None
+
+
+def registered_parsers() -> list[str]:
+    return [p.name for p in _parsers]
+
+
+def _dispatcher() -> re.Pattern:
+    """
+    One alternation of every fingerprint, each in its own named group.
+
+    A single search then finds the earliest fingerprint in the text and
+    `lastgroup` names the layout, instead of running each parser's check.
+    """
+    global _dispatch_pattern
+    if _dispatch_pattern is None:
+        _dispatch_pattern = re.compile(
+            "|".join(f"(?P<_{i}>{p.fingerprint})" for i, p in enumerate(_parsers))
+        )
+    return _dispatch_pattern
+
+
+def detect_layout(text: str) -> Optional[ScreenshotParser]:
+    if not _parsers:
+        return None
+    match = _dispatcher().search(text)
+    if match is None:
+        return None
+    return _parsers[int(match.lastgroup[1:])]
+
+
+def parse_screenshot(text: str) -> ParseResult:
+    """Parse OCR text with the parser of whichever registered layout it shows."""
+    parser = detect_layout(text)
+    if parser is None:
+        return ParseResult()
+    return parser.parse(text)
+
+
+REQUIRED_KEYS = ("timestamp", "from_token", "to_token", "from_amount", "to_amount")
+
+
+def _build_transaction(section: str, fields: dict, result: ParseResult):
+    """Append the transaction, or a failure naming the fields it lacks."""
+    missing = [k for k in REQUIRED_KEYS if k not in fields]
+    if missing:
+        result.failures.append(
+            {"section": section, "error": f"Missing fields: {', '.join(missing)}"}
+        )
+        return
+    try:
+        result.transactions.append(ExtractedTransaction(**fields))
+    except Exception as e:
+        result.failures.append({"section": section, "error": str(e)})
+
+
+@register_parser
+class DebankParser(ScreenshotParser):
+    """
+    Debank history: "Contract Interaction" sections with two
+    `(+/-)amount TOKEN ($x)` legs and a `YYYY/MM/DD HH.MM.SS` timestamp.
+    """
+
+    name = "debank"
+    fingerprint = r"Contract Interaction"
+
+    amount_pattern = re.compile(
+        r"([+-]?)\s*(\d+(?:\.\d+)?)\s+([A-Z]+)\s*\([s$]?[\d,.]+\)"
+    )
+    # Tried in order: a two-digit hour wins over an earlier one-digit match
+    timestamp_patterns = (
+        re.compile(r"(\d{4}/\d{2}/\d{2})\s+(\d{2})[.:](\d{2})[.:](\d{2})"),
+        re.compile(r"(\d{4}/\d{2}/\d{2})\s+(\d{1,2})[.:](\d{2})[.:](\d{2})"),
+    )
+
+    def parse(self, text: str) -> ParseResult:
+        result = ParseResult(layout=self.name)
+        text = text.replace("\n", " ").replace("\r", " ")
+
+        for section in text.split("Contract Interaction")[1:]:
+            section = section.strip()
+            if not section:
+                continue
+
+            fields = self._parse_amounts(section)
+            timestamp = self._parse_timestamp(section)
+            if timestamp:
+                fields["timestamp"] = timestamp
+            _build_transaction(section, fields, result)
+
+        return result
+
+    def _parse_amounts(self, section: str) -> dict:
+        amounts = [
+            {"sign": m.group(1), "amount": float(m.group(2)), "token": m.group(3)}
+            for m in self.amount_pattern.finditer(section)
+        ]
+        if len(amounts) != 2:
+            return {}
+
+        by_sign = {a["sign"]: a for a in amounts}
+        plus_amount = by_sign.get("+")
+        minus_amount = by_sign.get("-")
+        unsigned_amount = by_sign.get("")
+
+        # An unsigned leg is the opposite side of the signed one
+        if plus_amount and minus_amount:
+            source, target = minus_amount, plus_amount
+        elif plus_amount and unsigned_amount:
+            source, target = unsigned_amount, plus_amount
+        elif minus_amount and unsigned_amount:
+            source, target = minus_amount, unsigned_amount
+        else:
+            return {}
+
+        return {
+            "from_amount": source["amount"],
+            "from_token": source["token"],
+            "to_amount": target["amount"],
+            "to_token": target["token"],
+        }
+
+    def _parse_timestamp(self, section: str) -> Optional[datetime]:
+        for pattern in self.timestamp_patterns:
+            match = pattern.search(section)
+            if not match:
+                continue
+            date_part, hour, minute, second = match.groups()
+            try:
+                return datetime.strptime(
+                    f"{date_part} {hour.zfill(2)}:{minute}:{second}",
+                    "%Y/%m/%d %H:%M:%S",
+                )
+            except ValueError:
+                continue
+        return None
@@ -0,0 +1,232 @@
+import cProfile
+import io
+import pstats
+import re
+import secrets
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from threading import Lock
+from typing import Optional
+
+from fastapi import APIRouter, Request, status
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import get_settings
+
+router = APIRouter(prefix="/profiles", tags=["Profiling"])
+
+PROFILE_HEADER = "X-Profile"
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{16}$")
+
+
+class RequestProfile:
+    """SQL and stage timings collected while one request is profiled."""
+
+    def __init__(self):
+        self.queries = []
+        self.stages = defaultdict(float)
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "current_profile", default=None
+)
+
+# cProfile hooks the whole interpreter thread, so only one request at a time.
+_profiler_lock = Lock()
+
+
+@contextmanager
+def profile_stage(name: str):
+    """
+    Time a named stage (e.g. an OCR step) for the request being profiled.
+
+    Costs a single ContextVar lookup when the request is not profiled.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.stages[name] += time.perf_counter() - started
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    starts = conn.info.get("profile_query_start")
+    if profile is not None and starts:
+        profile.queries.append((statement, time.perf_counter() - starts.pop()))
+
+
+def _is_authorized(supplied: Optional[str]) -> bool:
+    token = get_settings().profiling_token
+    return bool(token and supplied) and secrets.compare_digest(supplied, token)
+
+
+def _render_report(
+    method: str,
+    path: str,
+    status_code: int,
+    elapsed: float,
+    profile: RequestProfile,
+    profiler: cProfile.Profile,
+) -> str:
+    out = io.StringIO()
+    out.write(f"{method} {path} -> {status_code}\n")
+    out.write(f"Total: {elapsed * 1000:.1f} ms\n\n")
+
+    sql_total = sum(duration for _, duration in profile.queries)
+    out.write(f"SQL queries: {len(profile.queries)} in {sql_total * 1000:.1f} ms\n")
+    for statement, duration in sorted(profile.queries, key=lambda q: -q[1]):
+        out.write(f"  {duration * 1000:8.2f} ms  {' '.join(statement.split())}\n")
+
+    if profile.stages:
+        out.write("\nStages:\n")
+        for name, duration in profile.stages.items():
+            out.write(f"  {duration * 1000:8.2f} ms  {name}\n")
+
+    out.write("\nPython profile (top 40 by cumulative time):\n")
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    Profile single requests on demand.
+
+    A request is profiled when it carries the configured PROFILING_TOKEN in
+    the X-Profile header. The report (SQL queries, timed stages and a
+    cProfile summary) is written to PROFILE_DIR once the response has been
+    sent and is referenced by the X-Profile-Id response header; download it
+    from GET /profiles/{profile_id}. Anything else passes through untouched.
+
+    Streaming responses (no Content-Length, e.g. /ui/events) are not
+    profiled; they get X-Profile-Status: streaming instead.
+
+    cProfile hooks the event loop's thread, not the request: the Python
+    profile includes every other coroutine the loop runs meanwhile, and sync
+    endpoints running in the threadpool appear only as time spent awaiting
+    them. The SQL and stage timings are the request's own.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not _is_authorized(
+            Headers(scope=scope).get(PROFILE_HEADER)
+        ):
+            await self.app(scope, receive, send)
+            return
+        if not _profiler_lock.acquire(blocking=False):
+            await self.app(scope, receive, _with_status(send, "busy"))
+            return
+
+        profile = RequestProfile()
+        profiler = cProfile.Profile()
+        profile_id = secrets.token_hex(8)
+        response = {"status": None, "streaming": False, "profiling": True}
+
+        def stop():
+            if response["profiling"]:
+                response["profiling"] = False
+                profiler.disable()
+                _profiler_lock.release()
+
+        async def send_profiled(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                response["status"] = message["status"]
+                if "content-length" in headers:
+                    headers["X-Profile-Id"] = profile_id
+                else:
+                    # Open-ended; profiling it would hold the lock as long
+                    response["streaming"] = True
+                    stop()
+                    headers["X-Profile-Status"] = "streaming"
+            await send(message)
+
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            await self.app(scope, receive, send_profiled)
+        finally:
+            stop()
+            _current_profile.reset(token)
+        elapsed = time.perf_counter() - started
+        if response["streaming"] or response["status"] is None:
+            return
+
+        profile_dir = Path(get_settings().profile_dir)
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        (profile_dir / f"{profile_id}.txt").write_text(
+            _render_report(
+                scope["method"],
+                scope["path"],
+                response["status"],
+                elapsed,
+                profile,
+                profiler,
+            )
+        )
+
+
+def _with_status(send: Send, profile_status: str) -> Send:
+    async def send_with_status(message: Message):
+        if message["type"] == "http.response.start":
+            MutableHeaders(scope=message)["X-Profile-Status"] = profile_status
+        await send(message)
+
+    return send_with_status
+
+
+@router.get(
+    "/{profile_id}",
+    responses={
+        200: {"description": "Profile report", "content": {"text/plain": {}}},
+        404: {
+            "description": "Unknown profile or missing profiling token",
+            "content": {
+                "application/json": {"example": {"error": "Profile not found."}}
+            },
+        },
+    },
+)
+async def download_profile(profile_id: str, request: Request):
+    """
+    Download a stored request profile as a text attachment.
+
+    Requires the profiling token, like the profiled request itself. Unknown
+    ids and unauthorized requests both get 404, so ids cannot be probed.
+    """
+    path = Path(get_settings().profile_dir) / f"{profile_id}.txt"
+    if (
+        not _is_authorized(request.headers.get(PROFILE_HEADER))
+        or not _PROFILE_ID.match(profile_id)
+        or not path.is_file()
+    ):
+        return JSONResponse(
+            content={"error": "Profile not found."},
+            status_code=status.HTTP_404_NOT_FOUND,
+        )
+    return FileResponse(
+        path, media_type="text/plain", filename=f"profile-{profile_id}.txt"
+    )
@@ -1,14 +1,28 @@
+import asyncio
 from datetime import datetime
+from decimal import Decimal
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, Form, Request, status
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import APIRouter, Depends, Form, Request, Response, status
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.api import TokenCreate, TransactionCreate, add_token_api, add_transaction_api
-from app.config import get_git_commit
+from app.cache import (
+    cache_headers,
+    fragment_cache,
+    is_not_modified,
+    sync_data_version,
+)
+from app.config import get_git_commit, get_settings
 from app.database import get_db
+from app.events import OVERFLOW, FeedEvent, feed, transaction_event
+from app.logic.token_links import get_token_graph
+from app.logic.transactions import validate_transaction
 from app.models import Token, Transaction
+from app.write_behind import enqueue, get_queue
 
 router = APIRouter(prefix="/ui", tags=["UI"])
 templates = Jinja2Templates(directory="app/templates")
@@ -18,7 +32,14 @@ def format_datetime_for_input(dt: datetime) -> str:
     return dt.strftime("%Y-%m-%d %H:%M:%S")
 
 
+def format_amount(value: Decimal) -> str:
+    """Render a Numeric amount without the column's padding zeros."""
+    text = format(value.normalize(), "f")
+    return text if "." in text else f"{text}.0"
+
+
 templates.env.filters["datetimeformat"] = format_datetime_for_input
+templates.env.filters["amount"] = format_amount
 
 
 @router.get("/", response_class=HTMLResponse)
@@ -31,8 +52,14 @@ async def home(
     Render the main dashboard page showing all transactions.
 
     This endpoint fetches all transactions from the database and displays them
-    in a user-friendly interface.
+    in a user-friendly interface. Unchanged data is answered with 304 Not
+    Modified before any query runs.
     """
+    sync_data_version(db)
+    headers = cache_headers(f"ui:home:{commit}")
+    if is_not_modified(request, headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
     transactions = db.query(Transaction).all()
     return templates.TemplateResponse(
         request,
@@ -41,7 +68,138 @@ async def home(
             "request": request,
             "git_commit": commit,
             "transactions": transactions,
+            # The live feed picks up after the newest row rendered here
+            "last_id": max((t.id for t in transactions), default=0),
         },
+        headers=headers,
+    )
+
+
+def _sse(event: str, data: str = "", id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if id is not None:
+        lines.append(f"id: {id}")
+    lines.extend(f"data: {line}" for line in data.splitlines() or [""])
+    return "\n".join(lines) + "\n\n"
+
+
+def _render_event(event: FeedEvent) -> str:
+    if event.rendered is None:
+        if event.kind == "transaction":
+            event.rendered = _sse(
+                "transaction",
+                templates.get_template("transaction_row.html").render(
+                    transaction=event.data
+                ),
+                event.id,
+            )
+        elif event.kind == "reload":
+            event.rendered = _sse("reload", id=event.id)
+        else:
+            event.rendered = _sse(event.kind, event.data["name"])
+    return event.rendered
+
+
+def _latest_id(bind) -> int:
+    with Session(bind) as db:
+        return db.query(func.max(Transaction.id)).scalar() or 0
+
+
+def _catch_up(bind, after: int, limit: int) -> tuple[int, list[FeedEvent]]:
+    """
+    Events for the transactions after id `after` and the id to continue
+    from; a `reload` event instead if there are more than `limit`.
+    """
+    # A session per catch-up: open streams must not hold pool connections
+    with Session(bind) as db:
+        rows = (
+            db.query(Transaction)
+            .filter(Transaction.id > after)
+            .order_by(Transaction.id)
+            .limit(limit + 1)
+            .all()
+        )
+        events = [transaction_event(row) for row in rows]
+    if len(events) > limit:
+        after = _latest_id(bind)
+        return after, [FeedEvent("reload", {}, after)]
+    return max((event.id for event in events), default=after), events
+
+
+async def event_stream(bind, after: Optional[int] = None, kind: Optional[str] = None):
+    """
+    Server-sent events for one page: the transactions after id `after`
+    from the database, then the live feed.
+
+    A page too far behind is sent a `reload` event instead of the rows. A
+    stream whose queue overflows ends; the browser reconnects with the last
+    id it received and catches up here.
+    """
+    settings = get_settings()
+    transactions = kind in (None, "transaction")
+    subscription = feed.subscribe(settings.event_queue_size)
+    try:
+        if after is None:
+            after = _latest_id(bind)
+        # Ids the last catch-up sent, which the feed may still deliver
+        sent = set()
+        if transactions:
+            after, events = _catch_up(bind, after, settings.event_queue_size)
+            sent = {event.id for event in events}
+            for event in events:
+                yield _render_event(event)
+        # Caught up; live events follow
+        yield "retry: 1000\n\n"
+
+        while True:
+            try:
+                event = await asyncio.wait_for(
+                    subscription.get(), settings.event_heartbeat
+                )
+            except asyncio.TimeoutError:
+                # Writes by other workers and the CLI arrive through the database
+                if transactions:
+                    after, events = _catch_up(bind, after, settings.event_queue_size)
+                    sent = {event.id for event in events}
+                    for event in events:
+                        yield _render_event(event)
+                yield ": keep-alive\n\n"
+                continue
+            if event is OVERFLOW:
+                return
+            if kind is not None and event.kind != kind:
+                continue
+            if event.kind == "transaction":
+                if event.id in sent:
+                    continue
+                after = max(after, event.id)
+            yield _render_event(event)
+    finally:
+        feed.unsubscribe(subscription)
+
+
+@router.get("/events")
+async def events(
+    request: Request,
+    after: Optional[int] = None,
+    kind: Optional[Literal["transaction", "token"]] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Stream new transactions as table rows (`transaction` events) and new
+    token names (`token` events) to the open UI pages.
+
+    Transactions start after id `after`, or after the Last-Event-ID an
+    EventSource sends when it reconnects; without either, only new ones are
+    sent. `kind` restricts the stream to one kind of event.
+    """
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    if last_event_id.isdigit():
+        after = int(last_event_id)
+    return StreamingResponse(
+        event_stream(db.get_bind(), after, kind),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -107,10 +265,75 @@ async def add_transaction_form(
         to_amount=to_amount,
     )
 
+    # Conversions between equivalent tokens are rare; they are written directly
+    if get_queue() is not None and not get_token_graph(db).equivalent(
+        from_token, to_token
+    ):
+        return _queue_transaction(transaction_data, db)
+
     # Call the existing API logic and return its response.
     return await add_transaction_api(transaction_data, db)
 
 
+def _queue_transaction(transaction_data: TransactionCreate, db: Session):
+    """
+    Validate a submission and hand it to the write-behind queue.
+
+    Duplicates of stored or queued transactions get 409 like direct writes.
+    202 means validated and queued: a duplicate written by another process
+    between this check and the flush is skipped by the flush.
+    """
+    _, values, error = validate_transaction(
+        transaction_data.timestamp,
+        transaction_data.from_token,
+        transaction_data.to_token,
+        transaction_data.from_amount,
+        transaction_data.to_amount,
+        db,
+    )
+    if error:
+        return JSONResponse(
+            content={"error": error["error"]}, status_code=error["status_code"]
+        )
+    stored = (
+        db.query(Transaction.id)
+        .filter(
+            Transaction.timestamp == values["timestamp"],
+            Transaction.token == values["token"],
+        )
+        .first()
+    )
+    if stored is not None:
+        return JSONResponse(
+            content={
+                "error": f"Transaction for '{values['token']}' at '{values['timestamp']}' already exists."
+            },
+            status_code=status.HTTP_409_CONFLICT,
+        )
+
+    if not enqueue(
+        values,
+        transaction_data.from_token,
+        transaction_data.to_token,
+        transaction_data.from_amount,
+        transaction_data.to_amount,
+    ):
+        return JSONResponse(
+            content={
+                "error": f"Transaction for '{values['token']}' at '{values['timestamp']}' is already queued."
+            },
+            status_code=status.HTTP_409_CONFLICT,
+        )
+    return JSONResponse(
+        content={
+            "status": "success",
+            "queued": True,
+            "message": f"Transaction queued: timestamp '{values['timestamp']}', token '{values['token']}', amount '{values['amount']}', stable_coin '{values['stable_coin']}', total_usd '{values['total_usd']}'.",
+        },
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
+
 @router.get("/tokens", response_class=HTMLResponse)
 async def tokens_page(
     request: Request,
@@ -122,15 +345,30 @@ async def tokens_page(
 
     This endpoint fetches all tokens from the database and displays them
     in a user-friendly interface. It also handles HTMX partial updates
-    for dynamic content refreshing.
+    for dynamic content refreshing, serving the partial from the fragment
+    cache. Both the page and the partial are answered with 304 Not Modified
+    while the data is unchanged.
     """
-    tokens = db.query(Token).all()
+    partial = request.headers.get("HX-Request") == "true"
+    sync_data_version(db)
+    headers = cache_headers(f"ui:tokens:{'partial' if partial else commit}")
+    if is_not_modified(request, headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
-    # If using HTMX, return a partial template when requested.
-    if request.headers.get("HX-Request") == "true":
-        return templates.TemplateResponse(
-            request, "tokens_list.html", {"request": request, "tokens": tokens}
+    # If using HTMX, return a partial template when requested. The rendered
+    # list is cached until the next write, so every open tab refreshing on
+    # tokenAdded costs at most one query and one render.
+    if partial:
+        html = fragment_cache.get_or_render(
+            "tokens_list.html",
+            "",
+            lambda: templates.get_template("tokens_list.html").render(
+                tokens=db.query(Token).all()
+            ),
         )
+        return HTMLResponse(html, headers=headers)
+
+    tokens = db.query(Token).all()
 
     # Full page render
     return templates.TemplateResponse(
@@ -141,6 +379,7 @@ async def tokens_page(
             "git_commit": commit,
             "tokens": tokens,
         },
+        headers=headers,
     )
 
 
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from app.config import get_settings
+from app.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    """
+    Progress of the startup warm-up, as reported by /ready.
+
+    `components` maps each warmed-up part (db, ocr) to "ready", "skipped" or
+    the error that stopped it. A failed component does not keep the app from
+    becoming ready: OCR missing its models should not take the read-only
+    pages down with it, the failure is just reported.
+    """
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.duration: Optional[float] = None
+        self.components: dict[str, str] = {}
+
+    def reset(self):
+        self.ready.clear()
+        self.duration = None
+        self.components = {}
+
+
+warmup_state = WarmupState()
+
+
+def _prime_db_pool():
+    """Open as many connections as the pool keeps, then hand them back to it."""
+    engine = get_engine()
+    # Single-connection pools (SQLite in memory) just get one connection
+    size = engine.pool.size() if isinstance(engine.pool, QueuePool) else 1
+    connections = []
+    try:
+        for _ in range(size):
+            connection = engine.connect()
+            connection.execute(text("SELECT 1"))
+            connections.append(connection)
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def _warm_up_ocr():
+    """Load the OCR models and run one inference on a blank image."""
+    from app.ocr import get_reader
+
+    # The first readtext call still allocates and JIT-selects kernels even
+    # when the weights were preloaded, so pay for it here, not in a request.
+    get_reader().readtext(np.full((32, 128, 3), 255, dtype=np.uint8))
+
+
+def warm_up():
+    """Run every warm-up step, then mark the app ready and log how long it took."""
+    started = time.perf_counter()
+    steps = {"db": _prime_db_pool}
+    if get_settings().preload_ocr:
+        steps["ocr"] = _warm_up_ocr
+    else:
+        warmup_state.components["ocr"] = "skipped"
+
+    for name, step in steps.items():
+        step_started = time.perf_counter()
+        try:
+            step()
+            warmup_state.components[name] = "ready"
+            logger.info(
+                "Warm-up of %s took %.2fs", name, time.perf_counter() - step_started
+            )
+        except Exception as e:
+            warmup_state.components[name] = f"failed: {e}"
+            logger.warning("Warm-up of %s failed: %s", name, e)
+
+    warmup_state.duration = time.perf_counter() - started
+    warmup_state.ready.set()
+    logger.info("Warm-up finished in %.2fs", warmup_state.duration)
+
+
+def start_warm_up() -> threading.Thread:
+    """Run warm_up in a daemon thread so startup itself is not delayed."""
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
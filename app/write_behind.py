@@ -0,0 +1,291 @@
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import get_engine
+from app.logic.transactions import ingest_transactions
+from app.parsers import ExtractedTransaction
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """
+    Durable local journal of validated transaction submissions.
+
+    Entries live in a small SQLite file at WRITE_BEHIND_PATH, so an
+    acknowledged submission survives a restart until it has been flushed to
+    the main database. Every worker journals into the same file. The
+    journal's primary key is (timestamp, token) of the resulting
+    transaction, so a double-submitted form is only queued once. Entries the
+    database rejects are kept in the failed table instead of being dropped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS pending (
+                timestamp TEXT NOT NULL,
+                token TEXT NOT NULL,
+                from_token TEXT NOT NULL,
+                to_token TEXT NOT NULL,
+                from_amount REAL NOT NULL,
+                to_amount REAL NOT NULL,
+                PRIMARY KEY (timestamp, token)
+            )
+            """)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS failed (
+                timestamp TEXT NOT NULL,
+                token TEXT NOT NULL,
+                from_token TEXT NOT NULL,
+                to_token TEXT NOT NULL,
+                from_amount REAL NOT NULL,
+                to_amount REAL NOT NULL,
+                error TEXT NOT NULL,
+                failed_at TEXT NOT NULL
+            )
+            """)
+
+    def put(
+        self,
+        token: str,
+        timestamp: datetime,
+        from_token: str,
+        to_token: str,
+        from_amount: float,
+        to_amount: float,
+    ) -> bool:
+        """Queue a submission; returns False if it is already queued."""
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO pending VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    timestamp.isoformat(),
+                    token,
+                    from_token,
+                    to_token,
+                    from_amount,
+                    to_amount,
+                ),
+            )
+            return cursor.rowcount == 1
+
+    def peek(self, limit: int) -> list[tuple]:
+        """Oldest-first batch of (key, ExtractedTransaction) pairs."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT rowid, timestamp, from_token, to_token, from_amount, to_amount "
+                "FROM pending ORDER BY rowid LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            (
+                rowid,
+                ExtractedTransaction(
+                    timestamp=datetime.fromisoformat(timestamp),
+                    from_token=from_token,
+                    to_token=to_token,
+                    from_amount=from_amount,
+                    to_amount=to_amount,
+                ),
+            )
+            for rowid, timestamp, from_token, to_token, from_amount, to_amount in rows
+        ]
+
+    def remove(self, keys: list[int], failures: Optional[dict[int, str]] = None):
+        """
+        Drop flushed entries, moving those in `failures` (key -> error) to
+        the failed table, all in one SQLite transaction.
+        """
+        failed_at = datetime.now().isoformat()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.executemany(
+                    "INSERT INTO failed SELECT timestamp, token, from_token, "
+                    "to_token, from_amount, to_amount, ?, ? "
+                    "FROM pending WHERE rowid = ?",
+                    [(error, failed_at, k) for k, error in (failures or {}).items()],
+                )
+                self._connection.executemany(
+                    "DELETE FROM pending WHERE rowid = ?", [(k,) for k in keys]
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def depth(self) -> int:
+        with self._lock:
+            (depth,) = self._connection.execute(
+                "SELECT COUNT(*) FROM pending"
+            ).fetchone()
+        return depth
+
+    def failed_count(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM failed"
+            ).fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def flush(queue: WriteBehindQueue, batch_size: int) -> int:
+    """
+    Move queued submissions to the main database until the journal is empty.
+
+    Each batch goes through ingest_transactions, so rows that reached the
+    database some other way in the meantime are skipped, not failed. A batch
+    is only removed from the journal after its commit; if the database is
+    unreachable the rows stay queued for the next attempt. Rows the database
+    rejects, e.g. because their tokens changed since they were validated,
+    move to the failed table, since a retry would not fix them.
+
+    Returns:
+        int: Number of transactions inserted
+    """
+    inserted = 0
+    while batch := queue.peek(batch_size):
+        with Session(get_engine()) as db:
+            result = ingest_transactions([t for _, t in batch], db)
+        keys = {str(t): key for key, t in batch}
+        failures = {keys[f["section"]]: f["error"] for f in result["failed"]}
+        for failure in result["failed"]:
+            logger.warning("Queued transaction rejected: %s", failure)
+        queue.remove(list(keys.values()), failures)
+        inserted += result["inserted"]
+    return inserted
+
+
+class WriteBehindWorker:
+    """
+    Background thread flushing the queue whenever entries arrive.
+
+    Every server worker runs one, but only the holder of an exclusive lock on
+    the journal's .lock file flushes, so batches are never sent twice. The
+    others keep trying to take the lock and step in when its holder exits;
+    the leader picks up their submissions on its interval timer.
+    """
+
+    def __init__(self, queue: WriteBehindQueue, batch_size: int, interval: float):
+        self.queue = queue
+        self.batch_size = batch_size
+        self.interval = interval
+        self._lock_file = open(f"{queue.path}.lock", "a")
+        self.leading = False
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="write-behind", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def notify(self):
+        self._wake.set()
+
+    def stop(self):
+        """Stop the thread after a last flush."""
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join()
+        # Closing the file releases the lock for the other workers
+        self._lock_file.close()
+
+    def _lead(self) -> bool:
+        if not self.leading:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            self.leading = True
+        return True
+
+    def _run(self):
+        while True:
+            # Wait for a submission, but also retry on a timer after failures
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                if self._lead():
+                    flush(self.queue, self.batch_size)
+            except Exception as e:
+                logger.warning("Write-behind flush failed, will retry: %s", e)
+            if self._stopping.is_set():
+                return
+
+
+_queue: Optional[WriteBehindQueue] = None
+_worker: Optional[WriteBehindWorker] = None
+
+
+def get_queue() -> Optional[WriteBehindQueue]:
+    """The write-behind queue, or None while write-behind mode is off."""
+    return _queue
+
+
+def start_write_behind():
+    global _queue, _worker
+    settings = get_settings()
+    if not settings.write_behind or _worker is not None:
+        return
+    path = settings.write_behind_path
+    if not os.path.isabs(path):
+        # A relative path lands in the container's working directory, whose
+        # files (and the submissions journaled in them) are lost on redeploy.
+        raise RuntimeError(
+            "WRITE_BEHIND needs WRITE_BEHIND_PATH set to an absolute path on "
+            f"persistent storage shared by all workers, got {path!r}"
+        )
+    _queue = WriteBehindQueue(path)
+    _worker = WriteBehindWorker(
+        _queue, settings.write_behind_batch_size, settings.write_behind_interval
+    )
+    _worker.start()
+
+
+def stop_write_behind():
+    global _queue, _worker
+    if _worker is not None:
+        _worker.stop()
+        _queue.close()
+    _queue = None
+    _worker = None
+
+
+def enqueue(values: dict, from_token: str, to_token: str, from_amount, to_amount):
+    """
+    Queue a validated submission and wake the flusher.
+
+    `values` are the Transaction column values validate_transaction produced;
+    the original swap is stored so the flush re-validates it like any ingest.
+    """
+    queued = _queue.put(
+        values["token"],
+        values["timestamp"],
+        from_token,
+        to_token,
+        from_amount,
+        to_amount,
+    )
+    if queued:
+        _worker.notify()
+    return queued
@@ -1,3 +1,3 @@
 #!/bin/bash
 
-alembic upgrade head && uvicorn app.main:app --host 0.0.0.0 --port 10000
+alembic upgrade head && gunicorn -c python:app.gunicorn_conf app.main:app
@@ -27,6 +27,8 @@ function run_on_test_image() {
     fi
 
     docker run --rm --tty \
+        -e TEST_POSTGRES_URL -e UPDATE_PERF_BASELINE -e PERF_BASELINE -e PERF_TOLERANCE \
+        -e LOAD_TEST_TRANSACTIONS -e LOAD_TEST_TOKENS \
         -v "$(pwd)/tests:/src/tests" \
         -v "$(pwd)/app:/src/app" \
         -v "$(pwd)/alembic:/src/alembic" \
@@ -38,6 +40,10 @@ function run_tests() {
     run_on_test_image $@
 }
 
+function run_benchmarks() {
+    run_on_test_image pytest -m perf tests/perf "$@"
+}
+
 function run_format() {
     run_on_test_image black app tests alembic
 }
@@ -104,6 +110,9 @@ case "$CMD" in
   tests)
     run_tests "$@"
     ;;
+  bench)
+    run_benchmarks "$@"
+    ;;
   start)
     run_tests
     echo "✅ Tests passed. Starting app and database..."
@@ -0,0 +1,24 @@
+@fast
+Feature: Analytics from the DuckDB mirror
+
+  Scenario: Analytics are unavailable while disabled
+    Given the API is running
+    When I request the analytics cohorts
+    Then the analytics response status code should be 503
+
+  Scenario: Analytics lag the database until the next sync
+    Given "FDUSD" is marked as a stablecoin
+    And "SEI" is marked as a non-stablecoin
+    And I bought 10 "SEI" for 5 "FDUSD" at "2025-06-01T10:00:00"
+    And I bought 20 "SEI" for 12 "FDUSD" at "2025-06-03T10:00:00"
+    And I bought 30 "SEI" for 21 "FDUSD" at "2025-06-10T10:00:00"
+    And analytics are enabled
+    Then the 3-day rolling "SEI" flow on "2025-06-03" should be 30 for 17 USD
+    And the 3-day rolling "SEI" flow on "2025-06-10" should be 30 for 21 USD
+    And the "SEI" trade size histogram with 2 bins should count 2, 1
+    And the "2025-06-01" cohort should have 1 token and 3 transactions for 38 USD
+    When I buy 40 "SEI" for 28 "FDUSD" at "2025-06-11T10:00:00"
+    Then the "2025-06-01" cohort should have 1 token and 3 transactions for 38 USD
+    When the analytics mirror syncs
+    Then the "2025-06-01" cohort should have 1 token and 4 transactions for 66 USD
+    And the analytics high-water id should be the latest transaction id
@@ -0,0 +1,32 @@
+@fast
+Feature: Archiving closed months of transactions
+
+  Scenario: Archived months still count in exports, holdings and valuations
+    Given the API is running
+    And an empty transaction archive
+    And "PYUSD" is marked as a stablecoin
+    And "AVAX" is marked as a non-stablecoin
+    And I bought 2 "AVAX" for 60 "PYUSD" at "2024-11-05T10:00:00"
+    And I bought 1 "AVAX" for 40 "PYUSD" at "2024-12-05T10:00:00"
+    When I archive the transactions before "2024-12"
+    Then the command should exit with code 0
+    And 1 "AVAX" transaction should be left in the database
+    And the "AVAX" holdings should be 3 with net USD -100
+    And the "AVAX" export should list "2024-11-05T10:00:00, 2024-12-05T10:00:00"
+    And the "AVAX" export from "2024-11-06T00:00:00" should list "2024-12-05T10:00:00"
+    When "AVAX" is priced at 50 from "2024-12-06T00:00:00"
+    Then the "AVAX" holdings should be worth 150 at "2024-12-07T00:00:00"
+
+  Scenario: Archived months are read-only
+    Given the API is running
+    And an empty transaction archive
+    And "PYUSD" is marked as a stablecoin
+    And "AVAX" is marked as a non-stablecoin
+    And I bought 1 "AVAX" for 30 "PYUSD" at "2024-10-05T10:00:00"
+    When I archive the transactions before "2024-11"
+    And I buy 1 "AVAX" for 30 "PYUSD" at "2024-10-20T10:00:00"
+    Then I should get an error with code 400 saying "Transactions before '2024-11-01 00:00:00' are archived and read-only."
+    Given "SAVAX" is marked as a non-stablecoin
+    And "SAVAX" is linked to "AVAX"
+    When I convert 1 "AVAX" to 1 "SAVAX" at "2024-10-21T10:00:00"
+    Then I should get an error with code 400 saying "Transactions before '2024-11-01 00:00:00' are archived and read-only."
@@ -0,0 +1,28 @@
+@fast
+Feature: Bulk token registration
+
+  Scenario: Registering many tokens in one request
+    Given the API is running
+    And "LUSD" is marked as a stablecoin
+    When I register the tokens "MKR:false, LUSD:true, LUSD:false, UNI:false, UNI:false, TOOLONGSYM:false" in bulk
+    Then the per-token status codes should be "201, 200, 409, 201, 200, 400"
+    And the bulk response should count 2 created, 2 existing, 1 conflicts and 1 invalid
+    And "MKR" should be registered as a non-stablecoin
+
+  Scenario: Syncing tokens from an uploaded CSV file twice
+    Given the API is running
+    When I sync the tokens CSV "token,is_stable\nCRV,false\nSUSD,yes"
+    Then the bulk response should count 2 created, 0 existing, 0 conflicts and 0 invalid
+    When I sync the tokens CSV "token,is_stable\nCRV,false\nSUSD,yes"
+    Then the bulk response should count 0 created, 2 existing, 0 conflicts and 0 invalid
+
+  Scenario: Rejecting an unreadable tokens CSV file
+    Given the API is running
+    When I sync the tokens CSV "token,is_stable\nCVX,maybe"
+    Then I should get an error with code 400 saying "Line 2: cannot read is_stable value 'maybe'"
+
+  Scenario: Syncing tokens from a CSV file with the CLI
+    Given a tokens CSV file "token,is_stable\nBAL,0\nGUSD,1"
+    When I run the sync-tokens command on it
+    Then the command should exit with code 0
+    And "BAL" should be registered as a non-stablecoin
@@ -0,0 +1,22 @@
+@fast
+Feature: Point-in-time holdings
+
+  Scenario: Holdings as of a moment survive an out-of-order insert
+    Given the API is running
+    And "RLUSD" is marked as a stablecoin
+    And "TIA" is marked as a non-stablecoin
+    And I bought 1 "TIA" for 10 "RLUSD" at "2025-03-20T10:00:00"
+    And I bought 2 "TIA" for 30 "RLUSD" at "2025-03-21T10:00:00"
+    And I bought 2 "TIA" for 30 "RLUSD" at "2025-03-22T10:00:00"
+    When I run the build-checkpoints command
+    Then the command should exit with code 0
+    And there should be a checkpoint at "2025-03-21T10:00:00"
+    And the "TIA" holdings as of "2025-03-20T12:00:00" should be 1 with net USD -10
+    And the "TIA" holdings as of "2025-03-21T23:00:00" should be 3 with net USD -40
+    And the "TIA" holdings as of "2025-03-22T10:00:00" should be 5 with net USD -70
+    When I buy 4 "TIA" for 20 "RLUSD" at "2025-03-21T08:00:00"
+    Then there should be a checkpoint at "2025-03-20T10:00:00"
+    And there should be no checkpoint at "2025-03-21T10:00:00"
+    And the "TIA" holdings as of "2025-03-20T12:00:00" should be 1 with net USD -10
+    And the "TIA" holdings as of "2025-03-21T23:00:00" should be 7 with net USD -60
+    And there should be a checkpoint at "2025-03-21T10:00:00"
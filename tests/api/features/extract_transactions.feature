@@ -39,3 +39,135 @@ Feature: Extract transactions from Debank screenshots
       | Contract Interaction\nquickswap\n2.005 AAVE\n(s499.91)\n+500.01 DAI\n($1,312.67)\n2025/02/08 07.07.09 | 2025-02-08T07:07:09 | AAVE | -2.005   | DAI        | 500.01    |
 
 
+  @fast
+  Scenario Outline: Reading Debank timestamps with one- or two-digit hours
+    When the Debank parser reads a swap stamped "<stamp>"
+    Then the parsed timestamp should be "<timestamp>"
+
+    Examples:
+      | stamp                                     | timestamp           |
+      | 2025/02/09 07.07.09                       | 2025-02-09T07:07:09 |
+      | 2025/02/09 7:07:09                        | 2025-02-09T07:07:09 |
+      | 2025/02/09 7.07.09 2025/02/09 17.07.09    | 2025-02-09T17:07:09 |
+
+
+
+  @fast
+  Scenario: Re-importing an overlapping screenshot idempotently
+    Given OCR is mocked to return "Contract Interaction\nlinch\n-100 DAI\n($99.99)\n+0.5 AAVE\n($100.10)\n2025/03/10 01.00.00\nContract Interaction\nlinch\n-200 DAI\n($199.98)\n+1.0 AAVE\n($200.20)\n2025/03/10 02.00.00"
+    And "DAI" is marked as a stablecoin
+    And "AAVE" is marked as a non-stablecoin
+    When I upload a fake Debank screenshot idempotently
+    Then the response should report 2 inserted and 0 skipped transactions
+    When I upload a fake Debank screenshot idempotently
+    Then the response should report 0 inserted and 2 skipped transactions
+    And the response should include no failed sections
+
+  @fast
+  Scenario: Snapping misread token symbols to known tokens
+    Given OCR is mocked to return "Contract Interaction\nlinch\n-100 USOC\n($100.00)\n+0.5 AAVVE\n($100.10)\n2025/03/11 01.00.00"
+    And "USDC" is marked as a stablecoin
+    And "AAVE" is marked as a non-stablecoin
+    When I upload a fake Debank screenshot
+    Then the response should include a transaction with timestamp "2025-03-11T01:00:00", token "AAVE", amount "0.5", stable_coin "USDC", and total_usd "-100.0"
+    And the response should report "USOC" corrected to "USDC" with confidence "0.75"
+    And the response should report "AAVVE" corrected to "AAVE" with confidence "0.8"
+
+  @fast
+  Scenario Outline: Only typical OCR misreads are snapped to a known token
+    Given the known token symbols are "ETH, USDC, DAI, OP, ARB"
+    Then the ticker "<read>" should be <outcome> "<token>"
+
+    Examples:
+      | read | outcome                  | token |
+      | USOC | snapped to               | USDC  |
+      | 0P   | snapped to               | OP    |
+      | D4I  | not snapped, but suggest | DAI   |
+      | USDT | not snapped, but suggest | USDC  |
+      | ETC  | not snapped, but suggest | ETH   |
+      | WETH | not snapped, but suggest | ETH   |
+      | SDAI | not snapped, but suggest | DAI   |
+      | OM   | not snapped, but suggest | OP    |
+      | ARRB | snapped to               | ARB   |
+
+  @fast
+  Scenario: A near-miss ticker is reported instead of stored as another token
+    Given OCR is mocked to return "Contract Interaction\nlinch\n-100 USDC\n($100.00)\n+0.05 WETH\n($100.10)\n2025/03/11 02.00.00"
+    And "USDC" is marked as a stablecoin
+    And "ETH" is marked as a non-stablecoin
+    When I upload a fake Debank screenshot
+    Then the response should report "WETH" as not registered, suggesting "ETH"
+    And no "ETH" transaction at "2025-03-11 02:00:00" should be stored
+
+  @fast
+  Scenario: Dispatching OCR text to a registered layout parser
+    Given a "swaplog" layout parser is registered
+    And OCR is mocked to return "Wallet Swap Log\nSWAP 100 DAI FOR 0.5 AAVE AT 2025-03-12 01:00:00"
+    And "DAI" is marked as a stablecoin
+    And "AAVE" is marked as a non-stablecoin
+    When I upload a fake Debank screenshot
+    Then the response should be parsed with the "swaplog" layout
+    And the response should include a transaction with timestamp "2025-03-12T01:00:00", token "AAVE", amount "0.5", stable_coin "DAI", and total_usd "-100.0"
+
+  @fast
+  Scenario: A layout parser without a parse method cannot be registered
+    When I register a layout parser that does not implement parse
+    Then the registration should fail
+    And no "incomplete" layout should be registered
+
+  @fast
+  Scenario: Rebuilding screenshot rows from OCR bounding boxes
+    Given the OCR reader returns shuffled boxes with a low-confidence smudge
+    And "DAI" is marked as a stablecoin
+    And "AAVE" is marked as a non-stablecoin
+    When I upload a real Debank screenshot
+    Then the response should include a transaction with timestamp "2025-03-13T01:02:03", token "AAVE", amount "0.75", stable_coin "DAI", and total_usd "-150.0"
+    And the response should include no failed sections
+
+  @fast
+  Scenario: Re-parsing stored OCR output after a parser fix
+    Given OCR is mocked to return "Wallet Swap Log\nSWAP 200 DAI FOR 0.9 AAVE AT 2025-03-15 01:00:00"
+    And "DAI" is marked as a stablecoin
+    And "AAVE" is marked as a non-stablecoin
+    When I upload a screenshot with unique content
+    Then the response should report that no transactions were found
+    Given a "swaplog" layout parser is registered
+    When I re-parse the stored OCR results
+    Then a "AAVE" transaction at "2025-03-15 01:00:00" should be stored
+    And the stored OCR result should now be parsed with the "swaplog" layout
+    When I run the reparse-ocr command
+    Then the command should exit with code 0
+
+  @fast
+  Scenario: Re-parsing screenshots whose transactions were rejected
+    Given OCR is mocked to return "Contract Interaction\nlinch\n-100 DAI\n($99.99)\n+0.5 MATIC\n($100.10)\n2025/03/16 01.00.00"
+    And "DAI" is marked as a stablecoin
+    When I upload a screenshot with the content "unknown token screenshot"
+    Then the stored OCR result should count 1 rejected transaction
+    Given "MATIC" is marked as a non-stablecoin
+    When I re-parse the stored OCR results
+    Then a "MATIC" transaction at "2025-03-16 01:00:00" should be stored
+    And the stored OCR result should count 0 rejected transactions
+
+  @fast
+  Scenario: Reading a tall scrolling screenshot in parallel tiles
+    Given tiled OCR is enabled with 300 px tiles, 60 px overlap and 2 workers
+    And the OCR reader returns the tall screenshot tile by tile
+    And "DAI" is marked as a stablecoin
+    And "AAVE" is marked as a non-stablecoin
+    When I upload a tall scrolling screenshot
+    Then the response should include 6 transactions in screenshot order
+    And the response should include no failed sections
+
+  @fast
+  Scenario: Batch OCR of a screenshot directory with resume
+    Given OCR is mocked to return "Contract Interaction\n1inch\n-100 DAI\n($99.99)\n+0.5 AAVE\n($100.10)\n2025/03/17 01.00.00"
+    And "DAI" is marked as a stablecoin
+    And "AAVE" is marked as a non-stablecoin
+    And a directory with 3 screenshots
+    When I run the batch-ocr command with 2 workers and --insert
+    Then the command should exit with code 0
+    And the batch output should have 3 lines with 1 transaction each
+    And a "AAVE" transaction at "2025-03-17 01:00:00" should be stored
+    When I run the batch-ocr command with 2 workers and --insert
+    Then the batch output should have 3 lines with 1 transaction each
@@ -0,0 +1,81 @@
+@fast
+Feature: HTTP caching of read-only pages
+
+  Scenario: Revalidating an unchanged tokens list partial
+    Given the API is running
+    And "ETH" is marked as a non-stablecoin
+    When I request the tokens list partial
+    And I request the tokens list partial again with the returned ETag
+    Then the response should be 304 Not Modified
+    And no database query should have been made
+
+  Scenario: Adding a token invalidates the tokens list partial
+    Given the API is running
+    When I request the tokens list partial
+    And I register "LINK" as a non-stablecoin
+    And I request the tokens list partial again with the returned ETag
+    Then the response should be 200 with a new ETag
+
+  Scenario: Adding a transaction invalidates the transactions page
+    Given the API is running
+    And "BTC" is marked as a non-stablecoin
+    And "DAI" is marked as a stablecoin
+    When I request the transactions page
+    And I add a transaction with timestamp "2025-05-01 09:00:00", from_token "DAI", to_token "BTC", from_amount "100.0", and to_amount "0.001"
+    And I request the transactions page again with the returned ETag
+    Then the response should be 200 with a new ETag
+
+  Scenario: Revalidating a token lookup by modification date
+    Given the API is running
+    And "FRAX" is marked as a stablecoin
+    When I request the token "FRAX"
+    And I request the token "FRAX" again with the returned Last-Modified
+    Then the response should be 304 Not Modified
+
+  Scenario: Repeated tokens list partials are served from the fragment cache
+    Given the API is running
+    And "ARB" is marked as a non-stablecoin
+    When I request the tokens list partial
+    And I request the tokens list partial again without validators
+    Then the response should be the same tokens list
+    And no database query should have been made
+
+  Scenario: Adding a token re-renders the cached tokens list partial
+    Given the API is running
+    When I request the tokens list partial
+    And I register "OP" as a non-stablecoin
+    And I request the tokens list partial again without validators
+    Then the tokens list should include "OP"
+
+  Scenario: A write recorded by another worker invalidates cached pages
+    Given the API is running
+    And workers coordinate through the data_versions table
+    When I request the tokens list partial
+    And another worker records a write
+    And I request the tokens list partial again with the returned ETag
+    Then the response should be 200 with a new ETag
+
+  Scenario: A write recorded by the CLI invalidates a single worker's cached pages
+    Given the API is running
+    And the server runs a single worker polling the data version on every request
+    When I request the tokens list partial
+    And the CLI records a write from its own process
+    And I request the tokens list partial again with the returned ETag
+    Then the response should be 200 with a new ETag
+
+  Scenario: Deploying a new release invalidates cached pages without a write
+    Given the API is running
+    And "ETH" is marked as a non-stablecoin
+    When I request the tokens list partial
+    And a new release is deployed
+    And I request the tokens list partial again with the returned ETag
+    Then the response should be 200 with a new ETag
+
+  Scenario: Two writes within the same second invalidate a revalidation by date
+    Given the API is running
+    And the clock is stopped
+    And "STETH" is marked as a non-stablecoin
+    When I request the token "STETH"
+    And I register "RETH" as a non-stablecoin
+    And I request the token "STETH" again with the returned Last-Modified
+    Then the response should be 200 with a later Last-Modified
@@ -0,0 +1,33 @@
+@fast
+Feature: Live dashboard updates
+
+  Scenario: Open pages receive new transactions and tokens as they are written
+    Given "USDE" is marked as a stablecoin
+    And "JUP" is marked as a non-stablecoin
+    And I bought 10 "JUP" for 5 "USDE" at "2025-07-01T10:00:00"
+    And the dashboard is listening for updates after its newest transaction
+    When I buy 20 "JUP" for 12 "USDE" at "2025-07-02T10:00:00"
+    Then the dashboard should receive a row for 20 "JUP"
+    When 2 "JUP" transactions are imported from a screenshot
+    Then the dashboard should receive 2 rows for "JUP"
+    When I add the non-stablecoin "WIF"
+    Then the dashboard should receive a "token" event for "WIF"
+
+  Scenario: A reconnecting page catches up from the database
+    Given "USDE" is marked as a stablecoin
+    And "JUP" is marked as a non-stablecoin
+    And I bought 10 "JUP" for 5 "USDE" at "2025-07-03T10:00:00"
+    And I bought 20 "JUP" for 12 "USDE" at "2025-07-04T10:00:00"
+    When a page reconnects after the first of those transactions
+    Then the dashboard should receive a row for 20 "JUP"
+
+  Scenario: A page too slow to read is cut off instead of buffering
+    Given "USDE" is marked as a stablecoin
+    And "JUP" is marked as a non-stablecoin
+    And pages may fall 2 events behind
+    And the dashboard is listening for updates after its newest transaction
+    When 3 "JUP" transactions are imported from a screenshot
+    Then the dashboard's stream should end
+    And no page should be subscribed to the feed
+    When a page reconnects after the last transaction it received
+    Then the dashboard should be told to reload the newest transaction
@@ -0,0 +1,46 @@
+@fast
+Feature: Price history and portfolio valuation
+
+  Scenario: Looking up prices as of a moment and valuing holdings
+    Given the API is running
+    And "DAI" is marked as a stablecoin
+    And "ZRX" is marked as a non-stablecoin
+    And I bought 2 "ZRX" for 100 "DAI" at "2025-03-18T10:00:00"
+    When I sync the prices CSV "token,timestamp,price_usd\nZRX,2025-03-18T12:00:00,60\nZRX,2025-03-18T14:00:00,40"
+    Then the price response should count 2 inserted and 0 skipped
+    When I import the implied trade prices
+    Then there should be no "ZRX" price at "2025-03-18T09:00:00"
+    And the "ZRX" price at "2025-03-18T11:00:00" should be 50
+    And the "ZRX" price at "2025-03-18T13:00:00" should be 60
+    And the "ZRX" price at "2025-03-19T00:00:00" should be 40
+    When I value "ZRX" holdings from "2025-03-18T09:00:00" to "2025-03-18T15:00:00" at 4 points
+    Then the values should be "0, 100, 120, 80"
+    And the unrealized P&L should be "0, 0, 20, -20"
+    When I value "ZRX" holdings from "2025-03-18T11:00:00+02:00" to "2025-03-18T17:00:00+02:00" at 4 points
+    Then the values should be "0, 100, 120, 80"
+
+  Scenario: Syncing the same prices CSV twice
+    Given the API is running
+    When I sync the prices CSV "token,timestamp,price_usd\nKNC,2025-03-18T12:00:00,0.5"
+    And I sync the prices CSV "token,timestamp,price_usd\nKNC,2025-03-18T12:00:00,0.7"
+    Then the price response should count 0 inserted and 1 skipped
+
+  Scenario: Rejecting an unreadable prices CSV file
+    Given the API is running
+    When I sync the prices CSV "token,timestamp,price_usd\nZRX,2025-03-18T12:00:00,n/a"
+    Then I should get an error with code 400 saying "Line 2: cannot read price_usd 'n/a'"
+
+  Scenario Outline: Rejecting an empty valuation range
+    Given the API is running
+    When I request a valuation from "<start>" to "<end>" at <points> points
+    Then I should get an error with code 400 saying "<error>"
+
+    Examples:
+      | start               | end                 | points | error                    |
+      | 2025-03-18T15:00:00 | 2025-03-18T09:00:00 | 4      | start must be before end |
+      | 2025-03-18T09:00:00 | 2025-03-18T09:00:00 | 4      | start must be before end |
+
+  Scenario: Importing prices with the CLI
+    Given a prices CSV file "token,timestamp,price_usd\nKNC,2025-03-18T13:00:00,0.6"
+    When I run the sync-prices command on it with --trades
+    Then the command should exit with code 0
@@ -0,0 +1,37 @@
+@fast
+Feature: Per-request profiling
+
+  Scenario: Profiling an authorized page request
+    Given the API is running
+    And request profiling is enabled with token "s3cret"
+    When I request "/ui/" with the profiling header "s3cret"
+    Then the response should reference a stored profile
+    And the stored profile should report the SQL queries
+
+  Scenario: Profiling an authorized extract request
+    Given request profiling is enabled with token "s3cret"
+    And OCR is mocked to return a single transaction
+    When I upload a screenshot with the profiling header "s3cret"
+    Then the response should reference a stored profile
+    And the stored profile should report the "ocr: text recognition" stage
+
+  Scenario: Profiling flags with a wrong token are ignored
+    Given request profiling is enabled with token "s3cret"
+    When I request "/ui/" with the profiling header "guess"
+    Then the response should not reference a stored profile
+
+  Scenario: The profiling token is not accepted as a query parameter
+    Given request profiling is enabled with token "s3cret"
+    When I request "/ui/" with the profiling query parameter "s3cret"
+    Then the response should not reference a stored profile
+
+  Scenario: Streaming responses are not profiled
+    Given request profiling is enabled with token "s3cret"
+    When I request "/api/transactions/export" with the profiling header "s3cret"
+    Then the response should not reference a stored profile
+    And the response should be marked as a streaming response
+
+  Scenario: Stored profiles require the token to download
+    Given request profiling is enabled with token "s3cret"
+    When I request "/ui/" with the profiling header "s3cret"
+    Then downloading the profile without the token should fail with 404
@@ -0,0 +1,29 @@
+@fast
+Feature: Startup warm-up and readiness
+
+  Scenario: The app is not ready before warm-up has finished
+    Given the warm-up has not run yet
+    When I check readiness
+    Then readiness should be reported with status code 503
+
+  Scenario: The app becomes ready once warm-up has finished
+    Given the warm-up has not run yet
+    And the OCR reader is mocked
+    When the warm-up runs
+    And I check readiness
+    Then readiness should be reported with status code 200
+    And the "db" and "ocr" components should be ready
+    And the OCR reader should have run one dummy inference
+
+  Scenario: OCR failing to load does not block readiness
+    Given the warm-up has not run yet
+    And the OCR models are missing
+    When the warm-up runs
+    And I check readiness
+    Then readiness should be reported with status code 200
+    And the "ocr" component should report a failure
+
+  Scenario: Requests arriving during the warm-up share one database engine
+    Given the database engine has not been created yet
+    When the warm-up and 4 requests open database sessions at once
+    Then a single database engine should have been created
@@ -0,0 +1,49 @@
+@fast
+Feature: Equivalent tokens and conversions
+
+  Scenario: Converting between equivalent tokens
+    Given the API is running
+    And "USDC" is marked as a stablecoin
+    And "SOL" is marked as a non-stablecoin
+    And "MSOL" is marked as a non-stablecoin
+    And "JSOL" is marked as a non-stablecoin
+    When I link "MSOL" to "SOL" with factor 1
+    Then the link response should have status code 201
+    When I link "JSOL" to "MSOL" with factor 1.25
+    Then the link response should have status code 201
+    And "JSOL" should resolve to "SOL" with factor 1.25
+    When I add a swap of 400 "USDC" for 4 "SOL" at "2025-03-19T01:00:00"
+    And I add a swap of 2 "SOL" for 1.6 "JSOL" at "2025-03-19T02:00:00"
+    Then the swap should be stored as a conversion
+    And the "SOL" holdings should be 4 with net USD -400 and members "JSOL:1.6, SOL:2"
+    When "SOL" is priced at 100 from "2025-03-19T00:00:00"
+    Then the "SOL" holdings should be worth 0 at "2025-03-19T00:30:00"
+    And the "SOL" holdings should be worth 400 at "2025-03-19T03:00:00"
+
+  Scenario: Imported swaps between equivalent tokens are stored as conversions
+    Given the API is running
+    And "SOL" is marked as a non-stablecoin
+    And "MSOL" is marked as a non-stablecoin
+    When I link "MSOL" to "SOL" with factor 1
+    And I import a swap of 1 "SOL" for 0.9 "MSOL" at "2025-03-19T05:00:00"
+    Then the import should count 1 inserted and 0 skipped
+    And the import should report a conversion
+    When I import a swap of 1 "SOL" for 0.9 "MSOL" at "2025-03-19T05:00:00"
+    Then the import should count 0 inserted and 1 skipped
+
+  Scenario: Rejecting invalid token links
+    Given the API is running
+    And "USDC" is marked as a stablecoin
+    And "SOL" is marked as a non-stablecoin
+    And "MSOL" is marked as a non-stablecoin
+    And "JSOL" is marked as a non-stablecoin
+    When I link "MSOL" to "SOL" with factor 1
+    And I link "JSOL" to "MSOL" with factor 1.25
+    And I link "SOL" to "JSOL" with factor 1
+    Then I should get an error with code 400 saying "Linking 'SOL' to 'JSOL' would create a cycle."
+    When I link "MSOL" to "JSOL" with factor 1
+    Then I should get an error with code 409 saying "'MSOL' is already linked to 'SOL'."
+    When I link "USDC" to "SOL" with factor 1
+    Then I should get an error with code 400 saying "A stablecoin can only be linked to another stablecoin."
+    When I link "MSOL" to "SOL" with factor 1
+    Then the link response should have status code 200
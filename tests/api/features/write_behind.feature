@@ -0,0 +1,57 @@
+@fast
+Feature: Write-behind queue for UI form submissions
+
+  Scenario: Form submissions are acknowledged while the database is unavailable
+    Given write-behind mode is enabled
+    And "KNC" is marked as a non-stablecoin
+    And "DAI" is marked as a stablecoin
+    And the write-behind flusher cannot reach the database
+    When I submit the transaction form with timestamp "2025-03-14 10:00:00", from "100" "DAI" to "50" "KNC"
+    Then the form should be answered with status code 202
+    When I submit the transaction form with timestamp "2025-03-14 10:00:00", from "100" "DAI" to "50" "KNC"
+    Then the form should be answered with status code 409
+    And the write-behind queue depth should be 1
+    When the write-behind flusher can reach the database again
+    Then the write-behind queue depth should drop to 0
+    And a "KNC" transaction at "2025-03-14 10:00:00" should be stored
+
+  Scenario: Submissions duplicating a stored transaction are rejected before they are queued
+    Given write-behind mode is enabled
+    And "KNC" is marked as a non-stablecoin
+    And "DAI" is marked as a stablecoin
+    And the write-behind flusher cannot reach the database
+    And a "KNC" transaction at "2025-03-14 12:00:00" is already stored
+    When I submit the transaction form with timestamp "2025-03-14 12:00:00", from "100" "DAI" to "50" "KNC"
+    Then the form should be answered with status code 409
+    And the write-behind queue depth should be 0
+
+  Scenario: Invalid submissions are rejected before they are queued
+    Given write-behind mode is enabled
+    And "KNC" is marked as a non-stablecoin
+    When I submit the transaction form with timestamp "2025-03-14 11:00:00", from "100" "NOPE" to "50" "KNC"
+    Then the form should be answered with status code 400
+    And the write-behind queue depth should be 0
+
+  Scenario: Only the worker holding the journal lock flushes it
+    Given another worker leads the write-behind flusher
+    And write-behind mode is enabled
+    And "KNC" is marked as a non-stablecoin
+    And "DAI" is marked as a stablecoin
+    When I submit the transaction form with timestamp "2025-03-14 13:00:00", from "100" "DAI" to "50" "KNC"
+    Then the form should be answered with status code 202
+    And the write-behind queue depth should stay at 1
+    When the other worker exits
+    Then the write-behind queue depth should drop to 0
+    And a "KNC" transaction at "2025-03-14 13:00:00" should be stored
+
+  Scenario: Queued submissions the database rejects are kept as failed
+    Given write-behind mode is enabled
+    And the write-behind flusher cannot reach the database
+    When a submission for the unknown token "NOPE" is journaled
+    And the write-behind flusher can reach the database again
+    Then the write-behind queue depth should drop to 0
+    And the write-behind queue should report 1 failed submission
+
+  Scenario: Write-behind mode requires an absolute journal path
+    When write-behind mode is started with the journal path "write_behind.sqlite"
+    Then write-behind mode should refuse to start
@@ -0,0 +1,130 @@
+import time
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+from sqlalchemy import func
+
+from app import analytics
+from app.config import get_settings
+from app.models import Transaction
+
+scenarios("features/analytics.feature")
+
+
+def _swap(client, amount, token, cost, stable_coin, timestamp):
+    return client.post(
+        "/api/transactions",
+        json={
+            "timestamp": timestamp,
+            "from_token": stable_coin,
+            "to_token": token,
+            "from_amount": cost,
+            "to_amount": amount,
+        },
+    )
+
+
+@given(
+    parsers.parse(
+        'I bought {amount:d} "{token}" for {cost:d} "{stable_coin}" at "{timestamp}"'
+    )
+)
+def buy_token(client, amount, token, cost, stable_coin, timestamp):
+    assert _swap(client, amount, token, cost, stable_coin, timestamp).status_code == 201
+
+
+@when(
+    parsers.parse(
+        'I buy {amount:d} "{token}" for {cost:d} "{stable_coin}" at "{timestamp}"'
+    )
+)
+def buy_token_now(client, amount, token, cost, stable_coin, timestamp):
+    assert _swap(client, amount, token, cost, stable_coin, timestamp).status_code == 201
+
+
+@given("analytics are enabled")
+def enable_analytics(db, monkeypatch):
+    monkeypatch.setenv("ANALYTICS", "true")
+    # Only the first sync runs in the background; later ones are explicit
+    monkeypatch.setenv("ANALYTICS_SYNC_INTERVAL", "3600")
+    get_settings.cache_clear()
+    monkeypatch.setattr(analytics, "get_engine", db.get_bind)
+    analytics.start_analytics()
+    deadline = time.monotonic() + 10
+    while analytics.get_store().status()["synced_at"] is None:
+        assert time.monotonic() < deadline, "analytics mirror never synced"
+        time.sleep(0.01)
+    yield
+    analytics.stop_analytics()
+    get_settings.cache_clear()
+
+
+@when("the analytics mirror syncs")
+def sync_analytics(db):
+    analytics.get_store().sync(db)
+
+
+@when("I request the analytics cohorts")
+def request_cohorts(client):
+    pytest.last_response = client.get("/api/analytics/cohorts")
+
+
+@then(parsers.parse("the analytics response status code should be {code:d}"))
+def check_status_code(code):
+    assert pytest.last_response.status_code == code
+
+
+@then(
+    parsers.parse(
+        'the {days:d}-day rolling "{token}" flow on "{day}" should be '
+        "{amount:g} for {spent:g} USD"
+    )
+)
+def check_rolling_flow(client, days, token, day, amount, spent):
+    response = client.get(
+        "/api/analytics/rolling", params={"days": days, "token": token}
+    )
+    assert response.status_code == 200
+    (entry,) = [e for e in response.json() if e["day"] == day]
+    assert entry["window"]["amount"] == amount
+    assert entry["window"]["total_usd"] == -spent
+
+
+@then(
+    parsers.parse(
+        'the "{token}" trade size histogram with {bins:d} bins should count {counts}'
+    )
+)
+def check_histogram(client, token, bins, counts):
+    response = client.get(
+        "/api/analytics/histogram", params={"bins": bins, "token": token}
+    )
+    assert response.status_code == 200
+    assert [b["transactions"] for b in response.json()] == [
+        int(c) for c in counts.split(", ")
+    ]
+
+
+@then(
+    parsers.parse(
+        'the "{cohort}" cohort should have {tokens:d} token and '
+        "{transactions:d} transactions for {spent:g} USD"
+    )
+)
+def check_cohort(client, cohort, tokens, transactions, spent):
+    response = client.get("/api/analytics/cohorts")
+    assert response.status_code == 200
+    (entry,) = [e for e in response.json() if e["cohort"] == cohort]
+    assert entry["tokens"] == tokens
+    assert entry["transactions"] == transactions
+    assert entry["spent_usd"] == spent
+    assert entry["net_usd"] == -spent
+
+
+@then("the analytics high-water id should be the latest transaction id")
+def check_high_water(client, db):
+    response = client.get("/api/analytics/status")
+    assert response.status_code == 200
+    assert (
+        response.json()["high_water_id"] == db.query(func.max(Transaction.id)).scalar()
+    )
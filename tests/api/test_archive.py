@@ -0,0 +1,158 @@
+import csv
+import io
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app import cli
+from app.config import get_settings
+from app.models import Transaction, TransactionArchive
+
+scenarios("features/archive.feature")
+
+
+def _swap(client, amount, token, cost, stable_coin, timestamp):
+    return client.post(
+        "/api/transactions",
+        json={
+            "timestamp": timestamp,
+            "from_token": stable_coin,
+            "to_token": token,
+            "from_amount": cost,
+            "to_amount": amount,
+        },
+    )
+
+
+@given("an empty transaction archive")
+def empty_archive(db, tmp_path, monkeypatch, request):
+    pytest.archive_dir = str(tmp_path)
+    monkeypatch.setattr(get_settings(), "archive_dir", pytest.archive_dir)
+
+    def forget_archive():
+        # Keep the archived months from making other scenarios read-only
+        db.query(TransactionArchive).delete()
+        db.commit()
+
+    request.addfinalizer(forget_archive)
+
+
+@given(
+    parsers.parse(
+        'I bought {amount:d} "{token}" for {cost:d} "{stable_coin}" at "{timestamp}"'
+    )
+)
+def buy_token(client, amount, token, cost, stable_coin, timestamp):
+    assert _swap(client, amount, token, cost, stable_coin, timestamp).status_code == 201
+
+
+@when(
+    parsers.parse(
+        'I buy {amount:d} "{token}" for {cost:d} "{stable_coin}" at "{timestamp}"'
+    )
+)
+def try_buy_token(client, amount, token, cost, stable_coin, timestamp):
+    pytest.last_response = _swap(client, amount, token, cost, stable_coin, timestamp)
+
+
+@given(parsers.parse('"{token}" is linked to "{base_token}"'))
+def link_token(client, token, base_token):
+    response = client.post(
+        "/api/tokens/links",
+        json={"token": token, "base_token": base_token, "factor": 1},
+    )
+    assert response.status_code in (200, 201)
+
+
+@when(
+    parsers.parse(
+        'I convert {amount:d} "{from_token}" to {to_amount:d} "{to_token}" at "{timestamp}"'
+    )
+)
+def convert_token(client, amount, from_token, to_amount, to_token, timestamp):
+    pytest.last_response = client.post(
+        "/api/transactions",
+        json={
+            "timestamp": timestamp,
+            "from_token": from_token,
+            "to_token": to_token,
+            "from_amount": amount,
+            "to_amount": to_amount,
+        },
+    )
+
+
+@when(parsers.parse('I archive the transactions before "{month}"'))
+def archive_transactions(db, monkeypatch, month):
+    monkeypatch.setattr(cli, "get_engine", db.get_bind)
+    pytest.exit_code = cli.main(
+        [
+            "archive-transactions",
+            "--before",
+            month,
+            "--directory",
+            pytest.archive_dir,
+        ]
+    )
+
+
+@then(parsers.parse("the command should exit with code {code:d}"))
+def check_exit_code(code):
+    assert pytest.exit_code == code
+
+
+@then(parsers.parse('{count:d} "{token}" transaction should be left in the database'))
+def check_live_transactions(db, count, token):
+    assert db.query(Transaction).filter(Transaction.token == token).count() == count
+
+
+@then(
+    parsers.parse(
+        'the "{token}" holdings should be {amount:g} with net USD {net_usd:g}'
+    )
+)
+def check_holdings(client, token, amount, net_usd):
+    entries = {entry["token"]: entry for entry in client.get("/api/holdings").json()}
+    assert float(entries[token]["amount"]) == pytest.approx(amount)
+    assert float(entries[token]["net_usd"]) == pytest.approx(net_usd)
+
+
+def _exported_timestamps(client, **params) -> list[str]:
+    response = client.get("/api/transactions/export", params=params)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    return [row["timestamp"] for row in csv.DictReader(io.StringIO(response.text))]
+
+
+@then(parsers.parse('the "{token}" export should list "{timestamps}"'))
+def check_export(client, token, timestamps):
+    assert _exported_timestamps(client, token=token) == [
+        t.strip() for t in timestamps.split(",")
+    ]
+
+
+@then(parsers.parse('the "{token}" export from "{start}" should list "{timestamps}"'))
+def check_export_from(client, token, start, timestamps):
+    assert _exported_timestamps(client, token=token, start=start) == [
+        t.strip() for t in timestamps.split(",")
+    ]
+
+
+@when(parsers.parse('"{token}" is priced at {price:g} from "{timestamp}"'))
+def price_token(client, token, price, timestamp):
+    content = f"token,timestamp,price_usd\n{token},{timestamp},{price}\n"
+    files = {"file": ("prices.csv", content.encode(), "text/csv")}
+    assert client.post("/api/prices/sync", files=files).status_code == 200
+
+
+@then(parsers.parse('the "{token}" holdings should be worth {value:g} at "{at}"'))
+def check_holdings_value(client, token, value, at):
+    # Valued at the end of a range, which must not be empty
+    start = datetime.fromisoformat(at) - timedelta(hours=1)
+    response = client.get(
+        "/api/portfolio/value",
+        params={"start": start.isoformat(), "end": at, "points": 2, "token": token},
+    )
+    assert response.status_code == 200
+    assert response.json()["value_usd"][-1] == pytest.approx(value)
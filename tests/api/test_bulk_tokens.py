@@ -0,0 +1,77 @@
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app import cli
+from tests.config import TOKENS_ENDPOINT
+
+scenarios("features/bulk_tokens.feature")
+
+
+def _csv(text: str) -> str:
+    # Allow \n literals inside feature file strings
+    return text.replace("\\n", "\n")
+
+
+@when(parsers.parse('I register the tokens "{tokens}" in bulk'))
+def register_tokens_in_bulk(tokens, client):
+    payload = []
+    for entry in tokens.split(","):
+        name, is_stable = entry.strip().split(":")
+        payload.append({"token": name, "is_stable": is_stable == "true"})
+    pytest.last_response = client.post(f"{TOKENS_ENDPOINT}/bulk", json=payload)
+    assert pytest.last_response.status_code == 200
+
+
+@when(parsers.parse('I sync the tokens CSV "{content}"'))
+def sync_tokens_csv(content, client):
+    files = {"file": ("tokens.csv", _csv(content).encode(), "text/csv")}
+    pytest.last_response = client.post(f"{TOKENS_ENDPOINT}/sync", files=files)
+
+
+@then(parsers.parse('the per-token status codes should be "{codes}"'))
+def check_per_token_status_codes(codes):
+    results = pytest.last_response.json()["results"]
+    assert [r["status_code"] for r in results] == [
+        int(code) for code in codes.split(",")
+    ]
+
+
+@then(
+    parsers.parse(
+        "the bulk response should count {created:d} created, {existing:d} existing, "
+        "{conflicts:d} conflicts and {invalid:d} invalid"
+    )
+)
+def check_bulk_counts(created, existing, conflicts, invalid):
+    body = pytest.last_response.json()
+    assert pytest.last_response.status_code == 200
+    assert (body["created"], body["existing"], body["conflicts"], body["invalid"]) == (
+        created,
+        existing,
+        conflicts,
+        invalid,
+    )
+
+
+@then(parsers.parse('"{token}" should be registered as a non-stablecoin'))
+def check_registered_non_stablecoin(token, client):
+    response = client.get(f"{TOKENS_ENDPOINT}/{token}")
+    assert response.status_code == 200
+    assert response.json()["is_stable"] is False
+
+
+@given(parsers.parse('a tokens CSV file "{content}"'))
+def tokens_csv_file(content, tmp_path):
+    pytest.csv_path = tmp_path / "tokens.csv"
+    pytest.csv_path.write_text(_csv(content))
+
+
+@when("I run the sync-tokens command on it")
+def run_sync_tokens_command(db, monkeypatch):
+    monkeypatch.setattr(cli, "get_engine", db.get_bind)
+    pytest.exit_code = cli.main(["sync-tokens", str(pytest.csv_path)])
+
+
+@then(parsers.parse("the command should exit with code {code:d}"))
+def check_exit_code(code):
+    assert pytest.exit_code == code
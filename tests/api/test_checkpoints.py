@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app import cli
+from app.models import HoldingCheckpoint
+
+scenarios("features/checkpoints.feature")
+
+
+def _buy(client, amount, token, cost, stable_coin, timestamp):
+    response = client.post(
+        "/api/transactions",
+        json={
+            "timestamp": timestamp,
+            "from_token": stable_coin,
+            "to_token": token,
+            "from_amount": cost,
+            "to_amount": amount,
+        },
+    )
+    assert response.status_code == 201
+
+
+@given(
+    parsers.parse(
+        'I bought {amount:d} "{token}" for {cost:d} "{stable_coin}" at "{timestamp}"'
+    )
+)
+def bought_token(client, amount, token, cost, stable_coin, timestamp):
+    _buy(client, amount, token, cost, stable_coin, timestamp)
+
+
+@when(
+    parsers.parse(
+        'I buy {amount:d} "{token}" for {cost:d} "{stable_coin}" at "{timestamp}"'
+    )
+)
+def buy_token(client, amount, token, cost, stable_coin, timestamp):
+    _buy(client, amount, token, cost, stable_coin, timestamp)
+
+
+@when("I run the build-checkpoints command")
+def run_build_checkpoints(db, monkeypatch):
+    monkeypatch.setattr(cli, "get_engine", db.get_bind)
+    pytest.exit_code = cli.main(["build-checkpoints"])
+
+
+@then(parsers.parse("the command should exit with code {code:d}"))
+def check_exit_code(code):
+    assert pytest.exit_code == code
+
+
+def _checkpoints_at(db, timestamp) -> int:
+    moment = datetime.fromisoformat(timestamp)
+    return db.query(HoldingCheckpoint).filter_by(timestamp=moment).count()
+
+
+@then(parsers.parse('there should be a checkpoint at "{timestamp}"'))
+def check_checkpoint(db, timestamp):
+    assert _checkpoints_at(db, timestamp) > 0
+
+
+@then(parsers.parse('there should be no checkpoint at "{timestamp}"'))
+def check_no_checkpoint(db, timestamp):
+    assert _checkpoints_at(db, timestamp) == 0
+
+
+@then(
+    parsers.parse(
+        'the "{token}" holdings as of "{at}" should be {amount:g} with net USD {net_usd:g}'
+    )
+)
+def check_holdings_at(client, token, at, amount, net_usd):
+    response = client.get("/api/holdings", params={"at": at})
+    assert response.status_code == 200
+    entries = {entry["token"]: entry for entry in response.json()}
+    assert float(entries[token]["amount"]) == pytest.approx(amount)
+    assert float(entries[token]["net_usd"]) == pytest.approx(net_usd)
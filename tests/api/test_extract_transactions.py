@@ -1,10 +1,30 @@
+import hashlib
+import io
+import json
 import os
+import re
+from datetime import datetime
 from typing import Optional
 
+import numpy as np
 import pytest
+from PIL import Image
 from pytest_bdd import given, parsers, scenarios, then, when
 
-from app import ocr
+from app import batch_ocr, cli, ocr
+from app.config import get_settings
+from app.logic.token_matching import TokenIndex
+from app.models import OcrResult, Transaction
+from app.parsers import (
+    DebankParser,
+    ExtractedTransaction,
+    ParseResult,
+    ScreenshotParser,
+    register_parser,
+    registered_parsers,
+    unregister_parser,
+)
+from tests.synthetic import TALL_SECTIONS, TileReader, ocr_box
 
 # Load the scenarios
 scenarios("features/extract_transactions.feature")
@@ -15,11 +35,11 @@ SAMPLE_IMAGE_PATH = "tests/fixtures/debank_screenshot.jpg"
 FAKE_IMAGE_PATH = "tests/fixtures/fake_image.jpg"
 
 
-def _upload_image(client, filename: str):
+def _upload_image(client, filename: str, params: Optional[dict] = None):
     """Upload a test Debank screenshot to the extract endpoint."""
     with open(filename, "rb") as f:
         files = {"image": (os.path.basename(filename), f, "image/jpeg")}
-        response = client.post(EXTRACT_ENDPOINT, files=files)
+        response = client.post(EXTRACT_ENDPOINT, files=files, params=params)
 
     print(response)
     print(response.json())
@@ -32,11 +52,113 @@ def upload_real_debank_screenshot(client):
     _upload_image(client, SAMPLE_IMAGE_PATH)
 
 
+@when(parsers.parse('the Debank parser reads a swap stamped "{stamp}"'))
+def parse_debank_stamp(stamp):
+    text = f"Contract Interaction\n1inch\n-100 DAI\n($99.99)\n+0.5 AAVE\n($100.10)\n{stamp}"
+    pytest.parse_result = DebankParser().parse(text)
+
+
+@then(parsers.parse('the parsed timestamp should be "{timestamp}"'))
+def check_parsed_timestamp(timestamp):
+    (transaction,) = pytest.parse_result.transactions
+    assert transaction.timestamp == datetime.fromisoformat(timestamp)
+
+
 @when("I upload a fake Debank screenshot")
 def upload_fake_debank_screenshot(client):
     _upload_image(client, FAKE_IMAGE_PATH)
 
 
+@when("I upload a fake Debank screenshot idempotently")
+def upload_fake_debank_screenshot_idempotently(client):
+    _upload_image(client, FAKE_IMAGE_PATH, params={"idempotent": "true"})
+
+
+@then(
+    parsers.parse(
+        "the response should report {inserted:d} inserted and {skipped:d} skipped transactions"
+    )
+)
+def check_inserted_and_skipped(inserted, skipped):
+    data = pytest.last_response.json()
+    assert data["inserted"] == inserted
+    assert data["skipped"] == skipped
+    assert len(data["details"]) == inserted
+
+
+@then(
+    parsers.parse(
+        'the response should report "{read}" corrected to "{token}" with confidence "{confidence:f}"'
+    )
+)
+def check_symbol_correction(read, token, confidence):
+    corrections = pytest.last_response.json()["corrections"]
+    assert any(
+        c["read"] == read and c["token"] == token and c["confidence"] == confidence
+        for c in corrections
+    ), f"No correction {read} -> {token} in {corrections}"
+
+
+@given(parsers.parse('the known token symbols are "{symbols}"'))
+def known_token_symbols(symbols):
+    pytest.token_index = TokenIndex(symbols.split(", "))
+
+
+def _snap(read):
+    swap = ExtractedTransaction(
+        timestamp=datetime(2025, 3, 11),
+        from_token="USDC",
+        to_token=read,
+        from_amount=1,
+        to_amount=1,
+    )
+    return ocr.snap_token_symbols([swap], pytest.token_index)
+
+
+@then(parsers.parse('the ticker "{read}" should be snapped to "{token}"'))
+def check_snapped(read, token):
+    snapped, corrections, failures = _snap(read)
+    assert [t.to_token for t in snapped] == [token]
+    assert [(c["read"], c["token"]) for c in corrections] == [(read, token)]
+    assert failures == []
+
+
+@then(parsers.parse('the ticker "{read}" should be not snapped, but suggest "{token}"'))
+def check_suggested(read, token):
+    snapped, corrections, failures = _snap(read)
+    assert snapped == [] and corrections == []
+    assert [f["suggestions"] for f in failures] == [{read: token}]
+
+
+@then(
+    parsers.parse(
+        'the response should report "{read}" as not registered, suggesting "{token}"'
+    )
+)
+def check_not_registered(read, token):
+    data = pytest.last_response.json()
+    assert data["details"] == []
+    assert any(f.get("suggestions") == {read: token} for f in data["failed"]), data
+
+
+@then(parsers.parse('no "{token}" transaction at "{timestamp}" should be stored'))
+def check_not_stored(db, token, timestamp):
+    assert (
+        db.query(Transaction)
+        .filter(
+            Transaction.token == token,
+            Transaction.timestamp == datetime.fromisoformat(timestamp),
+        )
+        .count()
+        == 0
+    )
+
+
+@then("the response should include no failed sections")
+def check_no_failed_sections():
+    assert pytest.last_response.json()["failed"] == []
+
+
 @then(
     parsers.parse(
         'the response should include a transaction with timestamp "{timestamp}", token "{token}", amount "{amount:f}", stable_coin "{stable_coin}", and total_usd "{total_usd:f}"'
@@ -123,14 +245,275 @@ Contract Interaction
 @given(parsers.parse('OCR is mocked to return "{ocr_text}"'))
 def mock_ocr(monkeypatch, ocr_text: Optional[str] = None):
     """
-    Patch app.ocr.get_extracted_text so tests can inject arbitrary text from the
+    Patch app.ocr.recognize_image so tests can inject arbitrary text from the
     feature file.  When the parameter <ocr_text> is not provided (legacy step)
     we fall back to DEFAULT_OCR_TEXT.
     """
     text = ocr_text if ocr_text is not None else DEFAULT_OCR_TEXT
 
-    def fake_get_extracted_text(_: bytes) -> str:
-        # Allow \n literals inside Examples table cells
-        return text.replace("\\n", "\n")
+    def fake_recognize_image(_: bytes):
+        # Allow \n literals inside Examples table cells; no boxes to store
+        return None, text.replace("\\n", "\n")
+
+    monkeypatch.setattr(ocr, "recognize_image", fake_recognize_image)
+
+
+class FakeReader:
+    """Stands in for EasyOCR, returning fixed boxes in scrambled order."""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+    def readtext(self, _image):
+        return list(self.boxes)
+
+
+@given("the OCR reader returns shuffled boxes with a low-confidence smudge")
+def mock_ocr_reader_boxes(monkeypatch):
+    boxes = [
+        ocr_box(10, 62, "-150 DAI"),
+        ocr_box(200, 1, "Interaction"),
+        ocr_box(10, 121, "2025/03/13 01.02.03"),
+        ocr_box(10, 31, "1inch"),
+        ocr_box(10, 0, "Contract"),
+        ocr_box(10, 90, "+0.75 AAVE"),
+        # Noise that would otherwise add a third amount to the section
+        ocr_box(200, 122, "9 AAVE ($2.00)", confidence=0.05),
+        ocr_box(100, 63, "($149.99)"),
+        ocr_box(100, 91, "($150.10)"),
+    ]
+    monkeypatch.setattr(ocr, "get_reader", lambda: FakeReader(boxes))
+
+
+class SwapLogParser(ScreenshotParser):
+    """Minimal one-line-per-swap layout used to exercise the dispatcher."""
+
+    name = "swaplog"
+    fingerprint = r"Wallet Swap Log"
+    swap_pattern = re.compile(
+        r"SWAP ([\d.]+) ([A-Z]+) FOR ([\d.]+) ([A-Z]+) AT (\S+ \S+)"
+    )
+
+    def parse(self, text):
+        result = ParseResult(layout=self.name)
+        for m in self.swap_pattern.finditer(text):
+            result.transactions.append(
+                ExtractedTransaction(
+                    from_amount=float(m.group(1)),
+                    from_token=m.group(2),
+                    to_amount=float(m.group(3)),
+                    to_token=m.group(4),
+                    timestamp=datetime.fromisoformat(m.group(5)),
+                )
+            )
+        return result
+
+
+@given(parsers.parse('a "{name}" layout parser is registered'))
+def register_layout_parser(name):
+    assert name == SwapLogParser.name
+    register_parser(SwapLogParser)
+    yield
+    unregister_parser(name)
+
+
+@when("I register a layout parser that does not implement parse")
+def register_incomplete_parser():
+    class IncompleteParser(ScreenshotParser):
+        name = "incomplete"
+        fingerprint = r"Incomplete Layout"
+
+    try:
+        register_parser(IncompleteParser)
+    except TypeError as e:
+        pytest.registration_error = e
+    else:
+        pytest.registration_error = None
+
 
-    monkeypatch.setattr(ocr, "get_extracted_text", fake_get_extracted_text)
+@then("the registration should fail")
+def check_registration_failed():
+    assert isinstance(pytest.registration_error, TypeError)
+
+
+@then(parsers.parse('no "{name}" layout should be registered'))
+def check_layout_not_registered(name):
+    assert name not in registered_parsers()
+
+
+@then(parsers.parse('the response should be parsed with the "{layout}" layout'))
+def check_layout(layout):
+    assert pytest.last_response.json()["layout"] == layout
+
+
+UNIQUE_SCREENSHOT = b"reparse scenario screenshot"
+
+
+@when("I upload a screenshot with unique content")
+def upload_unique_screenshot(client):
+    files = {"image": ("unique.jpg", UNIQUE_SCREENSHOT, "image/jpeg")}
+    pytest.last_response = client.post(EXTRACT_ENDPOINT, files=files)
+    assert pytest.last_response.status_code == 200
+
+
+@when(parsers.parse('I upload a screenshot with the content "{content}"'))
+def upload_screenshot_with_content(content, client):
+    pytest.screenshot_content = content.encode()
+    files = {"image": ("screenshot.jpg", pytest.screenshot_content, "image/jpeg")}
+    pytest.last_response = client.post(EXTRACT_ENDPOINT, files=files)
+    assert pytest.last_response.status_code == 200
+
+
+@then("the response should report that no transactions were found")
+def check_no_transactions_found():
+    assert pytest.last_response.json()["message"].startswith(
+        "No transactions found in the image."
+    )
+
+
+@when("I re-parse the stored OCR results")
+def reparse_stored_ocr_results(client):
+    pytest.last_response = client.post("/api/ocr/reparse")
+    assert pytest.last_response.status_code == 200
+
+
+@then(parsers.parse('a "{token}" transaction at "{timestamp}" should be stored'))
+def check_transaction_stored(token, timestamp, db):
+    assert (
+        db.query(Transaction)
+        .filter(
+            Transaction.token == token,
+            Transaction.timestamp == datetime.fromisoformat(timestamp),
+        )
+        .count()
+        == 1
+    )
+
+
+@then(
+    parsers.parse(
+        'the stored OCR result should now be parsed with the "{layout}" layout'
+    )
+)
+def check_stored_ocr_result(layout, db):
+    record = db.get(OcrResult, hashlib.sha256(UNIQUE_SCREENSHOT).hexdigest())
+    db.refresh(record)
+    assert record.layout == layout
+    assert (record.transactions, record.failures) == (1, 0)
+
+
+@then(
+    parsers.re(
+        r"the stored OCR result should count (?P<count>\d+) rejected transactions?"
+    ),
+    converters={"count": int},
+)
+def check_rejected_count(count, db):
+    record = db.get(OcrResult, hashlib.sha256(pytest.screenshot_content).hexdigest())
+    db.refresh(record)
+    assert record.rejected == count
+
+
+@when("I run the reparse-ocr command")
+def run_reparse_ocr_command(db, monkeypatch):
+    monkeypatch.setattr(cli, "get_engine", db.get_bind)
+    pytest.exit_code = cli.main(["reparse-ocr"])
+
+
+@then(parsers.parse("the command should exit with code {code:d}"))
+def check_exit_code(code):
+    assert pytest.exit_code == code
+
+
+@given(
+    parsers.parse(
+        "tiled OCR is enabled with {height:d} px tiles, {overlap:d} px overlap "
+        "and {workers:d} workers"
+    )
+)
+def enable_tiled_ocr(monkeypatch, height, overlap, workers):
+    monkeypatch.setenv("OCR_TILE_HEIGHT", str(height))
+    monkeypatch.setenv("OCR_TILE_OVERLAP", str(overlap))
+    monkeypatch.setenv("OCR_TILE_WORKERS", str(workers))
+    get_settings.cache_clear()
+    yield
+    ocr.shutdown_tile_pool()
+    get_settings.cache_clear()
+
+
+@given("the OCR reader returns the tall screenshot tile by tile")
+def mock_ocr_reader_tiles(monkeypatch):
+    # Patched before the tile pool starts, which hands it to its workers
+    monkeypatch.setattr(ocr, "get_reader", TileReader)
+
+
+@when("I upload a tall scrolling screenshot")
+def upload_tall_screenshot(client):
+    height = 150 * TALL_SECTIONS + 20
+    pixels = np.zeros((height, 200, 3), dtype=np.uint8)
+    rows = np.arange(height)
+    pixels[:, :, 0] = (rows // 256)[:, None]
+    pixels[:, :, 1] = (rows % 256)[:, None]
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+
+    files = {"image": ("tall.png", buffer.getvalue(), "image/png")}
+    pytest.last_response = client.post(EXTRACT_ENDPOINT, files=files)
+    assert pytest.last_response.status_code == 200
+
+
+@then(
+    parsers.parse(
+        "the response should include {count:d} transactions in screenshot order"
+    )
+)
+def check_transactions_in_order(count):
+    details = pytest.last_response.json()["details"]
+    assert [d["timestamp"] for d in details] == [
+        f"2025-03-16T0{i}:00:00" for i in range(count)
+    ]
+
+
+@given(parsers.parse("a directory with {count:d} screenshots"))
+def screenshot_directory(tmp_path, count):
+    screenshots = tmp_path / "screenshots"
+    screenshots.mkdir()
+    for i in range(count):
+        (screenshots / f"{i}.png").write_bytes(f"batch screenshot {i}".encode())
+    (screenshots / "notes.txt").write_text("not a screenshot")
+    pytest.batch_dir = screenshots
+    pytest.batch_output = tmp_path / "results.jsonl"
+
+
+@when(
+    parsers.parse("I run the batch-ocr command with {workers:d} workers and --insert")
+)
+def run_batch_ocr_command(db, monkeypatch, workers):
+    monkeypatch.setattr(cli, "get_engine", db.get_bind)
+    # Use the mocked recognize_image, without loading real models in the workers
+    monkeypatch.setattr(batch_ocr, "recognize_image", ocr.recognize_image)
+    monkeypatch.setattr(batch_ocr, "get_reader", lambda: None)
+    pytest.exit_code = cli.main(
+        [
+            "batch-ocr",
+            str(pytest.batch_dir),
+            "--output",
+            str(pytest.batch_output),
+            "--workers",
+            str(workers),
+            "--insert",
+        ]
+    )
+
+
+@then(
+    parsers.parse(
+        "the batch output should have {count:d} lines with {transactions:d} transaction each"
+    )
+)
+def check_batch_output(count, transactions):
+    lines = pytest.batch_output.read_text().splitlines()
+    records = [json.loads(line) for line in lines]
+    assert len(records) == count
+    assert len({r["sha256"] for r in records}) == count
+    assert all(len(r["transactions"]) == transactions for r in records)
@@ -0,0 +1,204 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import pytest
+from fastapi import status
+from pytest_bdd import given, parsers, scenarios, then, when
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import app.cache
+from app.cache import _publish_shared_version
+from app.config import get_settings
+from app.models import SharedVersion
+from tests.config import TOKENS_ENDPOINT, TRANSACTIONS_ENDPOINT, UI_HOME, UI_TOKENS
+
+scenarios("features/http_caching.feature")
+
+HTMX_HEADERS = {"HX-Request": "true"}
+
+
+def _request(client, url, **headers):
+    response = client.get(url, headers=headers)
+    pytest.last_response = response
+    return response
+
+
+def _revalidate(client, url, **headers):
+    pytest.previous_etag = pytest.last_response.headers["ETag"]
+    _request(client, url, **headers, **{"If-None-Match": pytest.previous_etag})
+
+
+@pytest.fixture
+def statements(db):
+    """Collect the SQL statements executed while the scenario runs."""
+    executed = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", record)
+    yield executed
+    event.remove(bind, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def multi_worker_settings(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    monkeypatch.setenv("DATA_VERSION_POLL_INTERVAL", "0")
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+@given("workers coordinate through the data_versions table")
+def enable_shared_data_version(multi_worker_settings):
+    pass
+
+
+@given("the server runs a single worker polling the data version on every request")
+def single_worker_polling_every_request(monkeypatch):
+    monkeypatch.setattr(get_settings(), "web_concurrency", 1)
+    monkeypatch.setattr(get_settings(), "data_version_poll_interval", 0)
+
+
+@given("the clock is stopped")
+def stop_clock(monkeypatch):
+    stopped_at = datetime.now(timezone.utc)
+
+    class StoppedClock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return stopped_at.astimezone(tz)
+
+    monkeypatch.setattr(app.cache, "datetime", StoppedClock)
+
+
+@when("the CLI records a write from its own process")
+def cli_records_write(db):
+    # The CLI's own session; only the data_versions row is shared with the app
+    with Session(db.get_bind()) as cli_db:
+        _publish_shared_version(cli_db)
+
+
+@when("another worker records a write")
+def another_worker_records_write(db):
+    row = db.get(SharedVersion, "data")
+    if row is None:
+        db.add(SharedVersion(name="data", version=1, updated_at=datetime.now()))
+    else:
+        row.version += 1
+        row.updated_at = datetime.now()
+    db.commit()
+
+
+@when("a new release is deployed")
+def deploy_new_release(monkeypatch):
+    monkeypatch.setattr(get_settings(), "git_commit", "0123456789abcdef")
+
+
+@when("I request the tokens list partial")
+def request_tokens_partial(client):
+    response = _request(client, UI_TOKENS, **HTMX_HEADERS)
+    assert response.status_code == status.HTTP_200_OK
+    assert "ETag" in response.headers
+
+
+@when("I request the tokens list partial again with the returned ETag")
+def revalidate_tokens_partial(client, statements):
+    statements.clear()
+    _revalidate(client, UI_TOKENS, **HTMX_HEADERS)
+
+
+@when("I request the tokens list partial again without validators")
+def request_tokens_partial_again(client, statements):
+    pytest.previous_body = pytest.last_response.text
+    statements.clear()
+    response = _request(client, UI_TOKENS, **HTMX_HEADERS)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@when("I request the transactions page")
+def request_transactions_page(client):
+    response = _request(client, UI_HOME)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@when("I request the transactions page again with the returned ETag")
+def revalidate_transactions_page(client):
+    _revalidate(client, UI_HOME)
+
+
+@when(
+    parsers.parse(
+        'I add a transaction with timestamp "{timestamp}", from_token "{from_token}", to_token "{to_token}", from_amount "{from_amount:f}", and to_amount "{to_amount:f}"'
+    )
+)
+def add_transaction(timestamp, from_token, to_token, from_amount, to_amount, client):
+    payload = {
+        "timestamp": timestamp,
+        "from_token": from_token,
+        "to_token": to_token,
+        "from_amount": from_amount,
+        "to_amount": to_amount,
+    }
+    response = client.post(TRANSACTIONS_ENDPOINT, json=payload)
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+@when(parsers.parse('I register "{token}" as a non-stablecoin'))
+def register_non_stablecoin(token, mark_token):
+    mark_token(token, is_stable=False)
+
+
+@when(parsers.parse('I request the token "{token}"'))
+def request_token(token, client):
+    response = _request(client, f"{TOKENS_ENDPOINT}/{token}")
+    assert response.status_code == status.HTTP_200_OK
+
+
+@when(
+    parsers.parse('I request the token "{token}" again with the returned Last-Modified')
+)
+def revalidate_token_by_date(token, client):
+    last_modified = pytest.last_response.headers["Last-Modified"]
+    pytest.previous_last_modified = last_modified
+    _request(
+        client, f"{TOKENS_ENDPOINT}/{token}", **{"If-Modified-Since": last_modified}
+    )
+
+
+@then("the response should be 304 Not Modified")
+def check_not_modified():
+    assert pytest.last_response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert pytest.last_response.content == b""
+
+
+@then("no database query should have been made")
+def check_no_queries(statements):
+    assert statements == []
+
+
+@then("the response should be 200 with a new ETag")
+def check_new_etag():
+    assert pytest.last_response.status_code == status.HTTP_200_OK
+    assert pytest.last_response.headers["ETag"] != pytest.previous_etag
+
+
+@then("the response should be the same tokens list")
+def check_same_tokens_list():
+    assert pytest.last_response.text == pytest.previous_body
+
+
+@then(parsers.parse('the tokens list should include "{token}"'))
+def check_tokens_list_includes(token):
+    assert f"<td>{token}</td>" in pytest.last_response.text
+
+
+@then("the response should be 200 with a later Last-Modified")
+def check_later_last_modified():
+    assert pytest.last_response.status_code == status.HTTP_200_OK
+    assert parsedate_to_datetime(
+        pytest.last_response.headers["Last-Modified"]
+    ) > parsedate_to_datetime(pytest.previous_last_modified)
@@ -0,0 +1,182 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+from sqlalchemy import func
+
+from app.config import get_settings
+from app.events import feed
+from app.logic.transactions import ingest_transactions
+from app.models import Transaction
+from app.parsers import ExtractedTransaction
+from app.ui import event_stream
+
+scenarios("features/live_updates.feature")
+
+
+def _swap(client, amount, token, cost, stable_coin, timestamp):
+    return client.post(
+        "/api/transactions",
+        json={
+            "timestamp": timestamp,
+            "from_token": stable_coin,
+            "to_token": token,
+            "from_amount": cost,
+            "to_amount": amount,
+        },
+    )
+
+
+@pytest.fixture
+def page():
+    """Event loop running the streams of the open pages, one at a time."""
+    loop = asyncio.new_event_loop()
+    page = {"loop": loop, "stream": None}
+    yield page
+    if page["stream"] is not None:
+        loop.run_until_complete(page["stream"].aclose())
+    loop.close()
+
+
+def _open(page, db, after):
+    if page["stream"] is not None:
+        page["loop"].run_until_complete(page["stream"].aclose())
+    page["stream"] = event_stream(db.get_bind(), after)
+    page["last_id"] = after
+    page["pending"] = []
+    # The rows caught up on come before the retry interval, live events after
+    while not (message := _read(page)).startswith("retry:"):
+        page["pending"].append(message)
+
+
+def _read(page) -> str:
+    return page["loop"].run_until_complete(
+        asyncio.wait_for(anext(page["stream"]), timeout=5)
+    )
+
+
+def _next_message(page) -> str:
+    return page["pending"].pop(0) if page["pending"] else _read(page)
+
+
+def _receive(page) -> dict:
+    fields = {}
+    for line in _next_message(page).strip().split("\n"):
+        name, _, value = line.partition(":")
+        fields[name] = fields.get(name, "") + value.removeprefix(" ")
+    if "id" in fields:
+        page["last_id"] = int(fields["id"])
+    return fields
+
+
+@given(
+    parsers.parse(
+        'I bought {amount:d} "{token}" for {cost:d} "{stable_coin}" at "{timestamp}"'
+    )
+)
+def buy_token(client, amount, token, cost, stable_coin, timestamp):
+    assert _swap(client, amount, token, cost, stable_coin, timestamp).status_code == 201
+
+
+@when(
+    parsers.parse(
+        'I buy {amount:d} "{token}" for {cost:d} "{stable_coin}" at "{timestamp}"'
+    )
+)
+def buy_token_now(client, amount, token, cost, stable_coin, timestamp):
+    assert _swap(client, amount, token, cost, stable_coin, timestamp).status_code == 201
+
+
+@given(parsers.parse("pages may fall {count:d} events behind"))
+def limit_queue(monkeypatch, count):
+    monkeypatch.setattr(get_settings(), "event_queue_size", count)
+
+
+@given("the dashboard is listening for updates after its newest transaction")
+def listen(client, db, page):
+    response = client.get("/ui/")
+    latest = db.query(func.max(Transaction.id)).scalar() or 0
+    assert f'sse-connect="/ui/events?after={latest}"' in response.text
+    _open(page, db, latest)
+
+
+@when(parsers.parse('{count:d} "{token}" transactions are imported from a screenshot'))
+def import_transactions(db, count, token):
+    latest = db.query(func.max(Transaction.timestamp)).scalar()
+    result = ingest_transactions(
+        [
+            ExtractedTransaction(
+                timestamp=latest + timedelta(hours=i + 1),
+                from_token="USDE",
+                to_token=token,
+                from_amount=1,
+                to_amount=2,
+            )
+            for i in range(count)
+        ],
+        db,
+    )
+    assert result["inserted"] == count
+
+
+@when(parsers.parse('I add the non-stablecoin "{token}"'))
+def add_token(client, token):
+    response = client.post("/api/tokens", json={"token": token, "is_stable": False})
+    assert response.status_code == 201
+
+
+@when("a page reconnects after the first of those transactions")
+def reconnect_after_first(db, page):
+    first = (
+        db.query(func.max(Transaction.id))
+        .filter(Transaction.timestamp == datetime(2025, 7, 3, 10))
+        .scalar()
+    )
+    _open(page, db, first)
+
+
+@when("a page reconnects after the last transaction it received")
+def reconnect(db, page):
+    _open(page, db, page["last_id"])
+
+
+@then(parsers.parse('the dashboard should receive a row for {amount:d} "{token}"'))
+def check_row(page, amount, token):
+    event = _receive(page)
+    assert event["event"] == "transaction"
+    assert f"<td>{token}</td>" in event["data"]
+    assert f"<td>{amount}.0</td>" in event["data"]
+
+
+@then(parsers.parse('the dashboard should receive {count:d} rows for "{token}"'))
+def check_rows(page, count, token):
+    ids = []
+    for _ in range(count):
+        event = _receive(page)
+        assert event["event"] == "transaction"
+        assert f"<td>{token}</td>" in event["data"]
+        ids.append(int(event["id"]))
+    assert ids == sorted(ids)
+
+
+@then(parsers.parse('the dashboard should receive a "token" event for "{token}"'))
+def check_token_event(page, token):
+    assert _receive(page) == {"event": "token", "data": token}
+
+
+@then("the dashboard should be told to reload the newest transaction")
+def check_reload(db, page):
+    latest = db.query(func.max(Transaction.id)).scalar()
+    assert _receive(page) == {"event": "reload", "id": str(latest), "data": ""}
+
+
+@then("the dashboard's stream should end")
+def check_stream_ended(page):
+    with pytest.raises(StopAsyncIteration):
+        _next_message(page)
+
+
+@then("no page should be subscribed to the feed")
+def check_no_subscribers():
+    assert not feed.has_subscribers()
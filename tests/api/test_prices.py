@@ -0,0 +1,123 @@
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app import cli
+
+scenarios("features/prices.feature")
+
+PRICES_ENDPOINT = "/api/prices"
+
+
+def _csv(text: str) -> str:
+    # Allow \n literals inside feature file strings
+    return text.replace("\\n", "\n")
+
+
+def _floats(values: str) -> list[float]:
+    return [float(v) for v in values.split(",")]
+
+
+@given(
+    parsers.parse(
+        'I bought {amount:d} "{token}" for {cost:d} "{stable_coin}" at "{timestamp}"'
+    )
+)
+def buy_token(client, amount, token, cost, stable_coin, timestamp):
+    response = client.post(
+        "/api/transactions",
+        json={
+            "timestamp": timestamp,
+            "from_token": stable_coin,
+            "to_token": token,
+            "from_amount": cost,
+            "to_amount": amount,
+        },
+    )
+    assert response.status_code == 201
+
+
+@when(parsers.parse('I sync the prices CSV "{content}"'))
+def sync_prices_csv(content, client):
+    files = {"file": ("prices.csv", _csv(content).encode(), "text/csv")}
+    pytest.last_response = client.post(f"{PRICES_ENDPOINT}/sync", files=files)
+
+
+@when("I import the implied trade prices")
+def import_trade_prices(client):
+    pytest.last_response = client.post(f"{PRICES_ENDPOINT}/trades")
+    assert pytest.last_response.status_code == 200
+
+
+@then(
+    parsers.parse(
+        "the price response should count {inserted:d} inserted and {skipped:d} skipped"
+    )
+)
+def check_price_counts(inserted, skipped):
+    assert pytest.last_response.status_code == 200
+    assert pytest.last_response.json() == {"inserted": inserted, "skipped": skipped}
+
+
+@then(parsers.parse('there should be no "{token}" price at "{at}"'))
+def check_no_price(client, token, at):
+    response = client.get(f"{PRICES_ENDPOINT}/{token}", params={"at": at})
+    assert response.status_code == 404
+
+
+@then(parsers.parse('the "{token}" price at "{at}" should be {price:g}'))
+def check_price(client, token, at, price):
+    response = client.get(f"{PRICES_ENDPOINT}/{token}", params={"at": at})
+    assert response.status_code == 200
+    assert response.json()["price_usd"] == pytest.approx(price)
+
+
+@when(
+    parsers.parse(
+        'I value "{token}" holdings from "{start}" to "{end}" at {points:d} points'
+    )
+)
+def value_holdings(client, token, start, end, points):
+    pytest.last_response = client.get(
+        "/api/portfolio/value",
+        params={"start": start, "end": end, "points": points, "token": token},
+    )
+    assert pytest.last_response.status_code == 200
+
+
+@when(
+    parsers.parse(
+        'I request a valuation from "{start}" to "{end}" at {points:d} points'
+    )
+)
+def request_valuation(client, start, end, points):
+    pytest.last_response = client.get(
+        "/api/portfolio/value", params={"start": start, "end": end, "points": points}
+    )
+
+
+@then(parsers.parse('the values should be "{values}"'))
+def check_values(values):
+    assert pytest.last_response.json()["value_usd"] == _floats(values)
+
+
+@then(parsers.parse('the unrealized P&L should be "{values}"'))
+def check_unrealized_pnl(values):
+    assert pytest.last_response.json()["unrealized_pnl"] == _floats(values)
+
+
+@given(parsers.parse('a prices CSV file "{content}"'))
+def prices_csv_file(content, tmp_path):
+    path = tmp_path / "prices.csv"
+    path.write_text(_csv(content))
+    pytest.prices_csv = str(path)
+
+
+@when("I run the sync-prices command on it with --trades")
+def run_sync_prices_command(db, monkeypatch):
+    monkeypatch.setattr(cli, "get_engine", db.get_bind)
+    pytest.exit_code = cli.main(["sync-prices", pytest.prices_csv, "--trades"])
+
+
+@then(parsers.parse("the command should exit with code {code:d}"))
+def check_exit_code(code):
+    assert pytest.exit_code == code
@@ -0,0 +1,91 @@
+import re
+
+import pytest
+from fastapi import status
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app import ocr
+from app.config import get_settings
+
+scenarios("features/profiling.feature")
+
+EXTRACT_ENDPOINT = "/api/transactions/extract"
+
+
+@given(parsers.parse('request profiling is enabled with token "{token}"'))
+def enable_profiling(token, monkeypatch, tmp_path):
+    monkeypatch.setenv("PROFILING_TOKEN", token)
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
+
+@given("OCR is mocked to return a single transaction")
+def mock_ocr_single_transaction(monkeypatch):
+    text = "Contract Interaction 1inch -50 DAI ($49.99) +0.01 WBTC ($50.10) 2025/03/01 10.00.00"
+    monkeypatch.setattr(ocr, "recognize_image", lambda _: (None, text))
+
+
+@when(parsers.parse('I request "{path}" with the profiling header "{token}"'))
+def request_with_profiling_header(path, token, client):
+    response = client.get(path, headers={"X-Profile": token})
+    assert response.status_code == status.HTTP_200_OK
+    pytest.last_response = response
+
+
+@when(parsers.parse('I request "{path}" with the profiling query parameter "{token}"'))
+def request_with_profiling_query_parameter(path, token, client):
+    response = client.get(path, params={"profile": token})
+    assert response.status_code == status.HTTP_200_OK
+    pytest.last_response = response
+
+
+@when(parsers.parse('I upload a screenshot with the profiling header "{token}"'))
+def upload_with_profiling_header(token, client):
+    files = {"image": ("screenshot.jpg", b"fake", "image/jpeg")}
+    response = client.post(EXTRACT_ENDPOINT, files=files, headers={"X-Profile": token})
+    assert response.status_code == status.HTTP_200_OK
+    pytest.last_response = response
+
+
+def _download_profile(client, **headers):
+    profile_id = pytest.last_response.headers["X-Profile-Id"]
+    return client.get(f"/profiles/{profile_id}", headers=headers)
+
+
+@then("the response should reference a stored profile")
+def check_profile_referenced(client):
+    assert "X-Profile-Id" in pytest.last_response.headers
+    response = _download_profile(client, **{"X-Profile": "s3cret"})
+    assert response.status_code == status.HTTP_200_OK
+    assert "attachment" in response.headers["content-disposition"]
+    pytest.profile_report = response.text
+
+
+@then("the response should not reference a stored profile")
+def check_profile_not_referenced():
+    assert "X-Profile-Id" not in pytest.last_response.headers
+
+
+@then("the response should be marked as a streaming response")
+def check_profile_skipped_streaming():
+    assert pytest.last_response.headers["X-Profile-Status"] == "streaming"
+
+
+@then("the stored profile should report the SQL queries")
+def check_profile_reports_sql():
+    # The page's own query; the data version poll may add another
+    assert re.search(r"SQL queries: [12] in", pytest.profile_report)
+    assert "FROM transactions" in pytest.profile_report
+
+
+@then(parsers.parse('the stored profile should report the "{stage}" stage'))
+def check_profile_reports_stage(stage):
+    assert stage in pytest.profile_report
+
+
+@then("downloading the profile without the token should fail with 404")
+def check_download_requires_token(client):
+    response = _download_profile(client)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app import database, ocr
+from app.warmup import _prime_db_pool, warm_up, warmup_state
+
+scenarios("features/readiness.feature")
+
+
+class CountingReader:
+    def __init__(self):
+        self.calls = 0
+
+    def readtext(self, _image):
+        self.calls += 1
+        return []
+
+
+@given("the warm-up has not run yet")
+def warm_up_not_run():
+    warmup_state.reset()
+    yield
+    # Leave the shared app ready for the other features
+    warmup_state.ready.set()
+
+
+@given("the OCR reader is mocked")
+def mock_ocr_reader(monkeypatch):
+    pytest.reader = CountingReader()
+    monkeypatch.setattr(ocr, "get_reader", lambda: pytest.reader)
+
+
+@given("the OCR models are missing")
+def ocr_models_missing(monkeypatch):
+    def missing_reader():
+        raise FileNotFoundError("Missing craft_mlt_25k.pth and downloads disabled")
+
+    monkeypatch.setattr(ocr, "get_reader", missing_reader)
+
+
+@given("the database engine has not been created yet")
+def engine_not_created(monkeypatch):
+    monkeypatch.setattr(database, "_engine", None)
+    monkeypatch.setattr(database, "_SessionLocal", None)
+    pytest.created_engines = []
+    create_engine = database.create_engine
+
+    def slow_create_engine(*args, **kwargs):
+        # Widen the window between the check and the assignment
+        time.sleep(0.05)
+        engine = create_engine(*args, **kwargs)
+        pytest.created_engines.append(engine)
+        return engine
+
+    monkeypatch.setattr(database, "create_engine", slow_create_engine)
+    yield
+    for engine in pytest.created_engines:
+        engine.dispose()
+
+
+@when(
+    parsers.parse(
+        "the warm-up and {requests:d} requests open database sessions at once"
+    )
+)
+def open_sessions_concurrently(requests):
+    def request():
+        # Runs the dependency to the end, closing the session
+        for _ in database.get_db():
+            pass
+
+    threads = [threading.Thread(target=_prime_db_pool)] + [
+        threading.Thread(target=request) for _ in range(requests)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@when("the warm-up runs")
+def run_warm_up():
+    warm_up()
+
+
+@when("I check readiness")
+def check_readiness(client):
+    pytest.last_response = client.get("/ready")
+
+
+@then(parsers.parse("readiness should be reported with status code {code:d}"))
+def check_readiness_status(code):
+    assert pytest.last_response.status_code == code
+
+
+@then(parsers.parse('the "{first}" and "{second}" components should be ready'))
+def check_components_ready(first, second):
+    body = pytest.last_response.json()
+    assert body["status"] == "ready"
+    assert body["warmup_seconds"] >= 0
+    assert body["components"][first] == "ready"
+    assert body["components"][second] == "ready"
+
+
+@then("the OCR reader should have run one dummy inference")
+def check_dummy_inference():
+    assert pytest.reader.calls == 1
+
+
+@then("a single database engine should have been created")
+def check_single_engine():
+    assert len(pytest.created_engines) == 1
+
+
+@then(parsers.parse('the "{component}" component should report a failure'))
+def check_component_failed(component):
+    assert pytest.last_response.json()["components"][component].startswith("failed")
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_bdd import parsers, scenarios, then, when
+
+from app.logic.transactions import ingest_transactions
+from app.parsers import ExtractedTransaction
+
+scenarios("features/token_links.feature")
+
+
+@when(parsers.parse('I link "{token}" to "{base_token}" with factor {factor:g}'))
+def link_tokens(client, token, base_token, factor):
+    pytest.last_response = client.post(
+        "/api/tokens/links",
+        json={"token": token, "base_token": base_token, "factor": factor},
+    )
+
+
+@then(parsers.parse("the link response should have status code {code:d}"))
+def check_link_status(code):
+    assert pytest.last_response.status_code == code
+
+
+@then(parsers.parse('"{token}" should resolve to "{root}" with factor {factor:g}'))
+def check_resolution(client, token, root, factor):
+    links = {link["token"]: link for link in client.get("/api/tokens/links").json()}
+    assert links[token]["root"] == root
+    assert float(links[token]["root_factor"]) == factor
+
+
+@when(
+    parsers.parse(
+        'I add a swap of {from_amount:g} "{from_token}" for {to_amount:g} "{to_token}" at "{timestamp}"'
+    )
+)
+def add_swap(client, from_amount, from_token, to_amount, to_token, timestamp):
+    pytest.last_response = client.post(
+        "/api/transactions",
+        json={
+            "timestamp": timestamp,
+            "from_token": from_token,
+            "to_token": to_token,
+            "from_amount": from_amount,
+            "to_amount": to_amount,
+        },
+    )
+    assert pytest.last_response.status_code == 201, pytest.last_response.text
+
+
+@when(
+    parsers.parse(
+        'I import a swap of {from_amount:g} "{from_token}" for {to_amount:g} "{to_token}" at "{timestamp}"'
+    )
+)
+def import_swap(db, from_amount, from_token, to_amount, to_token, timestamp):
+    # The idempotent path behind screenshot imports and the write-behind queue
+    pytest.import_result = ingest_transactions(
+        [
+            ExtractedTransaction(
+                timestamp=datetime.fromisoformat(timestamp),
+                from_token=from_token,
+                to_token=to_token,
+                from_amount=from_amount,
+                to_amount=to_amount,
+            )
+        ],
+        db,
+    )
+
+
+@then(
+    parsers.parse(
+        "the import should count {inserted:d} inserted and {skipped:d} skipped"
+    )
+)
+def check_import_counts(inserted, skipped):
+    assert pytest.import_result["failed"] == []
+    assert pytest.import_result["inserted"] == inserted
+    assert pytest.import_result["skipped"] == skipped
+
+
+@then("the import should report a conversion")
+def check_import_conversion():
+    (detail,) = pytest.import_result["details"]
+    assert detail["conversion"] is True
+
+
+@then("the swap should be stored as a conversion")
+def check_conversion():
+    assert pytest.last_response.json()["conversion"] is True
+
+
+@then(
+    parsers.parse(
+        'the "{root}" holdings should be {amount:g} with net USD {net_usd:g} and members "{members}"'
+    )
+)
+def check_holdings(client, root, amount, net_usd, members):
+    entries = {entry["token"]: entry for entry in client.get("/api/holdings").json()}
+    entry = entries[root]
+    assert float(entry["amount"]) == pytest.approx(amount)
+    assert float(entry["net_usd"]) == pytest.approx(net_usd)
+    expected = dict(member.strip().split(":") for member in members.split(","))
+    assert {t: float(a) for t, a in entry["members"].items()} == {
+        t: float(a) for t, a in expected.items()
+    }
+
+
+@when(parsers.parse('"{token}" is priced at {price:g} from "{timestamp}"'))
+def price_token(client, token, price, timestamp):
+    content = f"token,timestamp,price_usd\n{token},{timestamp},{price}\n"
+    files = {"file": ("prices.csv", content.encode(), "text/csv")}
+    assert client.post("/api/prices/sync", files=files).status_code == 200
+
+
+@then(parsers.parse('the "{token}" holdings should be worth {value:g} at "{at}"'))
+def check_holdings_value(client, token, value, at):
+    # Valued at the end of a range, which must not be empty
+    start = datetime.fromisoformat(at) - timedelta(hours=1)
+    response = client.get(
+        "/api/portfolio/value",
+        params={"start": start.isoformat(), "end": at, "points": 2, "token": token},
+    )
+    assert response.status_code == 200
+    assert response.json()["value_usd"][-1] == pytest.approx(value)
@@ -0,0 +1,162 @@
+import fcntl
+import time
+from datetime import datetime
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app import write_behind
+from app.config import get_settings
+from app.models import Transaction
+from tests.config import TRANSACTIONS_ENDPOINT
+
+scenarios("features/write_behind.feature")
+
+QUEUE_ENDPOINT = "/api/transactions/queue"
+
+
+@given("write-behind mode is enabled")
+def enable_write_behind(db, monkeypatch, tmp_path):
+    monkeypatch.setenv("WRITE_BEHIND", "true")
+    monkeypatch.setenv("WRITE_BEHIND_PATH", str(tmp_path / "queue.sqlite"))
+    monkeypatch.setenv("WRITE_BEHIND_INTERVAL", "0.05")
+    get_settings.cache_clear()
+    # Flush into the test database
+    monkeypatch.setattr(write_behind, "get_engine", db.get_bind)
+    write_behind.start_write_behind()
+    yield
+    write_behind.stop_write_behind()
+    get_settings.cache_clear()
+
+
+@given("another worker leads the write-behind flusher")
+def another_worker_leads(tmp_path):
+    lock_file = open(tmp_path / "queue.sqlite.lock", "a")
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    pytest.leader_lock = lock_file
+    yield
+    lock_file.close()
+
+
+@given("the write-behind flusher cannot reach the database")
+def database_unreachable(monkeypatch):
+    def unreachable():
+        raise ConnectionError("database unreachable")
+
+    monkeypatch.setattr(write_behind, "get_engine", unreachable)
+
+
+@given(parsers.parse('a "{token}" transaction at "{timestamp}" is already stored'))
+def store_transaction(token, timestamp, client):
+    # The API writes directly, bypassing the queue
+    payload = {
+        "timestamp": timestamp,
+        "from_token": "DAI",
+        "to_token": token,
+        "from_amount": 100,
+        "to_amount": 50,
+    }
+    assert client.post(TRANSACTIONS_ENDPOINT, json=payload).status_code == 201
+
+
+@when("the write-behind flusher can reach the database again")
+def database_reachable(db, monkeypatch):
+    monkeypatch.setattr(write_behind, "get_engine", db.get_bind)
+
+
+@when("the other worker exits")
+def other_worker_exits():
+    pytest.leader_lock.close()
+
+
+@when(parsers.parse('a submission for the unknown token "{token}" is journaled'))
+def journal_unknown_token(token):
+    # Validated when submitted, but the token is gone by the time of the flush
+    write_behind.get_queue().put(
+        token, datetime(2025, 3, 14, 14), "DAI", token, 100.0, 50.0
+    )
+
+
+@when(parsers.parse('write-behind mode is started with the journal path "{path}"'))
+def start_with_path(path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "write_behind", True)
+    monkeypatch.setattr(get_settings(), "write_behind_path", path)
+    try:
+        write_behind.start_write_behind()
+        pytest.start_error = None
+    except RuntimeError as e:
+        pytest.start_error = e
+    finally:
+        write_behind.stop_write_behind()
+
+
+@when(
+    parsers.parse(
+        'I submit the transaction form with timestamp "{timestamp}", '
+        'from "{from_amount}" "{from_token}" to "{to_amount}" "{to_token}"'
+    )
+)
+def submit_transaction_form(
+    timestamp, from_amount, from_token, to_amount, to_token, client
+):
+    pytest.last_response = client.post(
+        "/ui/transactions",
+        data={
+            "timestamp": timestamp,
+            "from_token": from_token,
+            "to_token": to_token,
+            "from_amount": from_amount,
+            "to_amount": to_amount,
+        },
+    )
+
+
+@then(parsers.parse("the form should be answered with status code {code:d}"))
+def check_form_status(code):
+    assert pytest.last_response.status_code == code, pytest.last_response.text
+
+
+@then(parsers.parse("the write-behind queue depth should be {depth:d}"))
+def check_queue_depth(depth, client):
+    body = client.get(QUEUE_ENDPOINT).json()
+    assert body == {"enabled": True, "depth": depth, "failed": 0}
+
+
+@then(parsers.parse("the write-behind queue depth should stay at {depth:d}"))
+def check_queue_depth_stays(depth, client):
+    # Several flush intervals
+    time.sleep(0.3)
+    assert client.get(QUEUE_ENDPOINT).json()["depth"] == depth
+    assert not write_behind._worker.leading
+
+
+@then(parsers.parse("the write-behind queue depth should drop to {depth:d}"))
+def wait_for_queue_depth(depth, client):
+    deadline = time.monotonic() + 5
+    while client.get(QUEUE_ENDPOINT).json()["depth"] != depth:
+        assert time.monotonic() < deadline, "write-behind queue was not flushed"
+        time.sleep(0.05)
+
+
+@then(parsers.parse('a "{token}" transaction at "{timestamp}" should be stored'))
+def check_transaction_stored(token, timestamp, db):
+    stored = (
+        db.query(Transaction)
+        .filter(
+            Transaction.token == token,
+            Transaction.timestamp == datetime.fromisoformat(timestamp),
+        )
+        .one()
+    )
+    assert stored.stable_coin == "DAI"
+
+
+@then(parsers.parse("the write-behind queue should report {count:d} failed submission"))
+def check_failed_count(count, client):
+    assert client.get(QUEUE_ENDPOINT).json()["failed"] == count
+
+
+@then("write-behind mode should refuse to start")
+def check_refused_to_start():
+    assert "WRITE_BEHIND_PATH" in str(pytest.start_error)
+    assert write_behind.get_queue() is None
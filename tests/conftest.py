@@ -12,7 +12,7 @@ from app.models import Base
 
 def pytest_configure(config):
     # make absolutely sure these names are known before collection starts
-    for name in ("fast", "slow"):
+    for name in ("fast", "slow", "perf"):
         config.addinivalue_line(
             "markers",
             f"{name}: marks tests as {name} (added dynamically so pytest "
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from tests.synthetic import create_synthetic_engine
+
+
+# A separate database per backend, so the large synthetic data set never
+# leaks into the shared in-memory database used by the API and UI tests.
+@pytest.fixture(params=["sqlite", "postgresql"])
+def plan_engine(request, tmp_path_factory):
+    engine = create_synthetic_engine(request.param, tmp_path_factory)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+# Autouse, so pytest-bdd scenarios pick up the backend parametrization even
+# though only the steps request the session.
+@pytest.fixture(autouse=True)
+def plan_session(plan_engine):
+    session = sessionmaker(bind=plan_engine)()
+    yield session
+    session.close()
+
+
+def explain(session, query) -> str:
+    """Return the database's query plan for an ORM query as a single string."""
+    dialect = session.get_bind().dialect
+    sql = query.statement.compile(
+        dialect=dialect, compile_kwargs={"literal_binds": True}
+    )
+
+    if dialect.name == "sqlite":
+        rows = session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))
+        return "\n".join(row[-1] for row in rows)
+
+    rows = session.execute(text(f"EXPLAIN {sql}"))
+    return "\n".join(row[0] for row in rows)
@@ -0,0 +1,12 @@
+@fast
+Feature: Query plans for transaction history lookups
+
+  Scenario: Token history lookups use the token/timestamp index
+    Given 20000 synthetic transactions across 50 tokens
+    When I explain the history query for token "TKNH"
+    Then the query plan should use index "ix_transactions_token_timestamp"
+
+  Scenario: Stablecoin history lookups use the stable_coin/timestamp index
+    Given 20000 synthetic transactions across 50 tokens
+    When I explain the history query for stablecoin "USDC"
+    Then the query plan should use index "ix_transactions_stable_coin_timestamp"
@@ -0,0 +1,34 @@
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+from sqlalchemy import text
+
+from app.logic.transactions import stable_coin_history_query, token_history_query
+from tests.db.conftest import explain
+from tests.synthetic import seed_transactions
+
+scenarios("features/query_plans.feature")
+
+
+@given(parsers.parse("{rows:d} synthetic transactions across {tokens:d} tokens"))
+def seed_synthetic_transactions(rows, tokens, plan_engine):
+    with plan_engine.begin() as connection:
+        seed_transactions(connection, rows, tokens=tokens)
+        # Refresh planner statistics so the plan reflects the seeded volume.
+        connection.execute(text("ANALYZE"))
+
+
+@when(parsers.parse('I explain the history query for token "{token}"'))
+def explain_token_history(token, plan_session):
+    pytest.last_plan = explain(plan_session, token_history_query(plan_session, token))
+
+
+@when(parsers.parse('I explain the history query for stablecoin "{stable_coin}"'))
+def explain_stable_coin_history(stable_coin, plan_session):
+    pytest.last_plan = explain(
+        plan_session, stable_coin_history_query(plan_session, stable_coin)
+    )
+
+
+@then(parsers.parse('the query plan should use index "{index_name}"'))
+def check_plan_uses_index(index_name):
+    assert index_name in pytest.last_plan, f"Unexpected plan:\n{pytest.last_plan}"
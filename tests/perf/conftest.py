@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from tests.synthetic import create_synthetic_engine
+
+
+# One database per backend and module: seeding benchmark volumes is the slow
+# part, so scenarios in the same feature share the data set.
+@pytest.fixture(scope="module", params=["sqlite", "postgresql"])
+def perf_engine(request, tmp_path_factory):
+    engine = create_synthetic_engine(request.param, tmp_path_factory)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    engine.seeded_rows = None
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+# Autouse, so pytest-bdd scenarios pick up the backend parametrization even
+# though only the steps request the session.
+@pytest.fixture(autouse=True)
+def perf_session(perf_engine):
+    session = sessionmaker(bind=perf_engine)()
+    yield session
+    session.close()
@@ -0,0 +1,8 @@
+@perf
+Feature: Aggregate query performance
+
+  Scenario: Per-token aggregates over a million transactions are exact
+    Given 1000000 synthetic transactions across 50 tokens
+    When I aggregate amounts and USD totals per token
+    Then every per-token sum and average should match the exact decimal result
+    And the aggregation should finish within 8000 ms
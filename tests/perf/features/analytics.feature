@@ -0,0 +1,11 @@
+@perf
+Feature: Analytics mirror performance
+
+  Scenario: The DuckDB mirror syncs incrementally and answers scans quickly
+    Given 200000 synthetic transactions across 50 tokens over 12 months
+    When I mirror the transactions into an analytics store
+    Then the mirror should hold every transaction
+    And the cohort stats should match the database
+    And 30-day rolling flows, a 50-bin histogram and cohort stats should take at most 200 ms each
+    When 1000 transactions are added after the latest one
+    Then a sync should add exactly those in at most 1 s
@@ -0,0 +1,14 @@
+@perf
+Feature: API load test against the stored baseline
+
+  Scenario Outline: Latency and throughput stay within the baseline
+    Given the load test database is seeded
+    When I send <requests> "<endpoint>" requests from <clients> concurrent clients
+    Then the latency percentiles and throughput should stay within the baseline for "<endpoint>"
+
+    Examples:
+      | endpoint                       | requests | clients |
+      | GET /ui/                       | 200      | 8       |
+      | POST /api/transactions         | 400      | 8       |
+      | POST /api/tokens               | 400      | 8       |
+      | POST /api/transactions/extract | 200      | 4       |
@@ -0,0 +1,10 @@
+@perf
+Feature: Transaction archive performance
+
+  Scenario: Moving closed months to Parquet keeps aggregates and exports whole
+    Given 200000 synthetic transactions across 50 tokens over 12 months
+    When I archive every month but the last 2
+    Then only the last 2 months should be left in the transactions table
+    And the aggregates should match the ones before archiving
+    And the export should list all 200000 transactions in timestamp order
+    And archiving should finish within 10 seconds
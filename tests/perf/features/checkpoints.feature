@@ -0,0 +1,11 @@
+@perf
+Feature: Point-in-time holdings performance
+
+  Scenario: As-of holdings replay only the transactions since a checkpoint
+    Given 200000 synthetic transactions across 50 tokens over 12 months
+    When I build the holding checkpoints every 1000 transactions
+    Then as-of positions at 50 moments should match a full aggregate up to each
+    And an as-of query should take at most 20 ms on average
+    When a transaction is inserted in the middle of the history
+    Then only the checkpoints at or after it should be dropped
+    And rebuilding should take fewer checkpoints than the first build
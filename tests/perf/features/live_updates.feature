@@ -0,0 +1,9 @@
+@perf
+Feature: Live update fan-out performance
+
+  Scenario: Publishing is not held up by slow pages
+    Given 500 pages listening for live updates, 100 of which never read
+    When 2000 transactions are published one at a time
+    Then publishing should take at most 1 ms per transaction on average
+    And every reading page should receive every transaction in order
+    And no page should hold more than 100 queued events
@@ -0,0 +1,15 @@
+@perf
+Feature: OCR inference backend comparison
+
+  Scenario Outline: Benchmarking an OCR backend on the fixture screenshots
+    Given the "<backend>" OCR backend with the "<detector>" detector and <threads> torch threads
+    When I run it over the fixture screenshots
+    Then its latency, memory and accuracy should be reported
+    And its field accuracy should be at least <min_accuracy>
+
+    Examples:
+      | backend   | detector | threads | min_accuracy |
+      | quantized | craft    | 0       | 1.0          |
+      | fp32      | craft    | 0       | 1.0          |
+      | quantized | craft    | 1       | 1.0          |
+      | quantized | dbnet18  | 0       | 0.0          |
@@ -0,0 +1,15 @@
+@perf
+Feature: Screenshot parser performance
+
+  Scenario: Every registered layout has a parser benchmark
+    Then every registered layout should have a synthetic text generator
+
+  Scenario Outline: Parsing a long screenshot of one layout
+    Given synthetic OCR text of <sections> "<layout>" sections
+    When I dispatch and parse the text
+    Then all <sections> transactions should be parsed with the "<layout>" layout
+    And parsing should take at most <budget_us> microseconds per section
+
+    Examples:
+      | layout | sections | budget_us |
+      | debank | 5000     | 200       |
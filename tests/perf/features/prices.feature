@@ -0,0 +1,9 @@
+@perf
+Feature: Price store performance
+
+  Scenario: Valuing a portfolio over a time range with as-of prices
+    Given 200000 synthetic transactions across 50 tokens
+    When I import their implied trade prices
+    And I value the portfolio at 1000 points over the whole history
+    Then the valuation should match a row-by-row as-of lookup at 20 points
+    And the valuation should finish within 3000 ms
@@ -0,0 +1,18 @@
+@perf
+Feature: OCR pipeline benchmark on synthetic screenshots
+
+  Scenario: Synthetic screenshots are reproducible and scale with their sections
+    Given a synthetic screenshot corpus of 8 screenshots with up to 12 sections
+    Then the same seed should render the same corpus
+    And taller screenshots should hold more sections
+
+  Scenario Outline: Extracting transactions from a synthetic corpus
+    Given a synthetic screenshot corpus of <count> screenshots with up to <max_sections> sections
+    When I run the extract pipeline over the corpus
+    Then its latency, memory and accuracy should be reported per variant
+    And its field accuracy should be at least <min_accuracy>
+
+    Examples:
+      | count | max_sections | min_accuracy |
+      | 20    | 4            | 0.9          |
+      | 20    | 12           | 0.9          |
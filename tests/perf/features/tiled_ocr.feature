@@ -0,0 +1,16 @@
+@perf
+Feature: Parallel tiled OCR scaling
+
+  Scenario Outline: OCR of a tall scrolling screenshot on <workers> cores
+    Given a tall screenshot of 8 stacked fixture screenshots
+    And tiled OCR with 1000 px tiles and <workers> workers
+    When I run OCR over the tall screenshot
+    Then its latency should be reported
+    And every stacked transaction should be parsed exactly once
+
+    Examples:
+      | workers |
+      | 1       |
+      | 2       |
+      | 4       |
+      | 8       |
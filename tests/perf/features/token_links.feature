@@ -0,0 +1,8 @@
+@perf
+Feature: Token equivalence resolution performance
+
+  Scenario: Resolving tokens through deep link chains is a lookup
+    Given a token graph of 20000 links in chains up to 50 deep
+    When I resolve 100000 transaction tokens
+    Then every resolution should agree with walking the links
+    And a resolution should take at most 2 microseconds on average
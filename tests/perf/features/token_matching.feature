@@ -0,0 +1,8 @@
+@perf
+Feature: Token symbol fuzzy matching performance
+
+  Scenario: Misread tickers snap to known tokens in microseconds
+    Given a token index over 5000 random symbols
+    When I look up 500 tickers with one misread character
+    Then every lookup should agree with a brute-force edit distance scan
+    And a lookup should take at most 200 microseconds on average
@@ -0,0 +1,8 @@
+@perf
+Feature: Multi-worker throughput
+
+  Scenario: Throughput on the transactions page scales with workers
+    Given 2000 synthetic transactions across 20 tokens
+    When I load "/ui/" with 200 requests from 8 clients against 1 worker
+    And I load "/ui/" with 200 requests from 8 clients against one worker per core
+    Then the multi-worker throughput should be at least 1.5 times the single-worker throughput
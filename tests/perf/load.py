@@ -0,0 +1,168 @@
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import requests
+
+
+@dataclass
+class LoadResult:
+    """Latencies (seconds) of a load run and its wall-clock duration."""
+
+    latencies: list = field(default_factory=list)
+    elapsed: float = 0.0
+    errors: int = 0
+
+    def percentile(self, pct: int) -> float:
+        """Latency percentile in milliseconds."""
+        cut_points = statistics.quantiles(self.latencies, n=100, method="inclusive")
+        return cut_points[pct - 1] * 1000
+
+    @property
+    def rps(self) -> float:
+        return len(self.latencies) / self.elapsed
+
+    def summary(self) -> dict:
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rps": round(self.rps, 1),
+            "p50_ms": round(self.percentile(50), 2),
+            "p95_ms": round(self.percentile(95), 2),
+            "p99_ms": round(self.percentile(99), 2),
+        }
+
+
+def run_load(send, total: int, concurrency: int) -> LoadResult:
+    """
+    Call `send(session)` `total` times from `concurrency` threads.
+
+    `send` performs one request with the given requests.Session and returns
+    the response; non-2xx/3xx responses are counted as errors.
+    """
+    result = LoadResult()
+
+    def worker(count):
+        latencies, errors = [], 0
+        with requests.Session() as session:
+            for _ in range(count):
+                started = time.perf_counter()
+                response = send(session)
+                latencies.append(time.perf_counter() - started)
+                errors += response.status_code >= 400
+        return latencies, errors
+
+    shares = [
+        total // concurrency + (i < total % concurrency) for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latencies, errors in pool.map(worker, shares):
+            result.latencies.extend(latencies)
+            result.errors += errors
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(base_url: str, is_running, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).ok:
+                return
+        except requests.ConnectionError:
+            pass
+        if time.monotonic() > deadline or not is_running():
+            raise RuntimeError(f"server at {base_url} did not start")
+        time.sleep(0.2)
+
+
+@contextmanager
+def gunicorn_server(database_url: str, workers: int, **env):
+    """Run the app under gunicorn with the production config; yield its URL."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "python:app.gunicorn_conf"]
+        + ["--bind", f"127.0.0.1:{port}", "app.main:app"],
+        env={
+            **os.environ,
+            "DATABASE_URL": database_url,
+            "WEB_CONCURRENCY": str(workers),
+            "PRELOAD_OCR": "false",
+            **env,
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_up(base_url, lambda: process.poll() is None)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def _serve(database_url: str, port: int, ocr_text):
+    # Runs in a forked child: point the app at the benchmark database and,
+    # if requested, replace OCR with canned text so extract measures parsing
+    # and persistence rather than model inference.
+    import itertools
+
+    import uvicorn
+
+    from app import database, ocr
+    from app.config import get_settings
+    from app.main import app
+
+    os.environ["DATABASE_URL"] = database_url
+    get_settings.cache_clear()
+    database._engine = None
+    app.dependency_overrides.clear()
+
+    if ocr_text is not None:
+        calls = itertools.count()
+
+        def fake_recognize_image(_: bytes):
+            return None, ocr_text(next(calls))
+
+        ocr.recognize_image = fake_recognize_image
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+@contextmanager
+def live_server(database_url: str, ocr_text=None):
+    """
+    Run the app under a single uvicorn process; yield its URL.
+
+    Args:
+        database_url (str): Database the server should use
+        ocr_text (callable, optional): Maps the call number to the text the
+            mocked OCR returns; real OCR is used when omitted
+    """
+    port = _free_port()
+    process = multiprocessing.get_context("fork").Process(
+        target=_serve, args=(database_url, port, ocr_text), daemon=True
+    )
+    process.start()
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_up(base_url, process.is_alive)
+        yield base_url
+    finally:
+        process.terminate()
+        process.join(timeout=30)
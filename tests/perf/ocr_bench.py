@@ -0,0 +1,275 @@
+import multiprocessing
+import resource
+import statistics
+import time
+from datetime import datetime
+
+# Transactions visible in the fixture screenshots, as (timestamp, from_token,
+# to_token, from_amount, to_amount).
+FIXTURE_TRANSACTIONS = {
+    "tests/fixtures/debank_screenshot.jpg": [
+        (datetime(2025, 2, 3, 4, 2, 29), "DAI", "AAVE", 100.0, 0.4612),
+    ],
+}
+
+
+def _field_accuracy(expected: list, parsed: list) -> float:
+    """Share of expected transaction fields reproduced by the best parsed match."""
+    fields = 0
+    for wanted in expected:
+        fields += max(
+            (
+                sum(
+                    a == b
+                    for a, b in zip(
+                        wanted,
+                        (t.timestamp, t.from_token, t.to_token)
+                        + (t.from_amount, t.to_amount),
+                    )
+                )
+                for t in parsed
+            ),
+            default=0,
+        )
+    return fields / (5 * len(expected))
+
+
+def _measure(backend: dict, runs: int, queue):
+    # Imported in the child so each backend starts from a clean interpreter
+    from app.config import Settings
+    from app.ocr import build_reader, group_boxes_into_rows
+    from app.parsers import parse_screenshot
+
+    try:
+        started = time.perf_counter()
+        reader = build_reader(Settings(database_url="sqlite://", **backend))
+        load_s = time.perf_counter() - started
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+        return
+
+    latencies, accuracies = [], []
+    for path, expected in FIXTURE_TRANSACTIONS.items():
+        for _ in range(runs):
+            started = time.perf_counter()
+            boxes = reader.readtext(path)
+            latencies.append(time.perf_counter() - started)
+        rows = group_boxes_into_rows(boxes, 0.3)
+        text = "\n".join(" ".join(cells) for cells in rows)
+        accuracies.append(
+            _field_accuracy(expected, parse_screenshot(text).transactions)
+        )
+
+    queue.put(
+        {
+            "load_s": round(load_s, 2),
+            "median_ms": round(statistics.median(latencies) * 1000, 1),
+            # ru_maxrss is in KiB on Linux
+            "peak_rss_mb": round(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+            ),
+            "accuracy": round(statistics.mean(accuracies), 3),
+        }
+    )
+
+
+def benchmark_backend(backend: dict, runs: int = 3) -> dict:
+    """
+    Load an OCR backend in a fresh process and run it over the fixtures.
+
+    `backend` holds Settings overrides (ocr_backend, ocr_detect_network, ...).
+    Returns load time, median recognition latency, peak RSS and field
+    accuracy against FIXTURE_TRANSACTIONS, or {"error": ...} if the models
+    could not be loaded.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(backend, runs, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _stacked_screenshot(copies: int) -> bytes:
+    """A tall scrolling screenshot: the fixture stacked `copies` times."""
+    import io
+
+    from PIL import Image
+
+    screenshot = Image.open("tests/fixtures/debank_screenshot.jpg").convert("RGB")
+    tall = Image.new("RGB", (screenshot.width, screenshot.height * copies))
+    for i in range(copies):
+        tall.paste(screenshot, (0, screenshot.height * i))
+    buffer = io.BytesIO()
+    tall.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _measure_tiled(tiling: dict, copies: int, runs: int, queue):
+    import os
+
+    for name, value in tiling.items():
+        os.environ[name] = str(value)
+
+    from app.ocr import (
+        boxes_to_text,
+        get_ocr_boxes,
+        get_reader,
+        shutdown_tile_pool,
+    )
+    from app.parsers import parse_screenshot
+
+    try:
+        get_reader()
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+        return
+
+    contents = _stacked_screenshot(copies)
+    # The first run starts the worker pool
+    get_ocr_boxes(contents)
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        boxes = get_ocr_boxes(contents)
+        latencies.append(time.perf_counter() - started)
+    shutdown_tile_pool()
+
+    queue.put(
+        {
+            "median_ms": round(statistics.median(latencies) * 1000, 1),
+            "transactions": len(parse_screenshot(boxes_to_text(boxes)).transactions),
+        }
+    )
+
+
+def benchmark_tiled_ocr(tiling: dict, copies: int, runs: int = 3) -> dict:
+    """
+    OCR a tall screenshot in a fresh process with the given OCR_TILE_* env.
+
+    Returns the median latency and the number of transactions parsed from
+    the merged boxes (one per stacked copy), or {"error": ...} without models.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_measure_tiled, args=(tiling, copies, runs, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _expected_row(t) -> tuple:
+    """(timestamp, token, amount, stable_coin, total_usd) a swap is stored as."""
+    from tests.synthetic import STABLE_COINS
+
+    if t.from_token in STABLE_COINS:
+        return (t.timestamp, t.to_token, t.to_amount, t.from_token, -t.from_amount)
+    return (t.timestamp, t.from_token, -t.from_amount, t.to_token, t.to_amount)
+
+
+def _row_accuracy(expected: list, details: list) -> float:
+    """Share of expected row fields reproduced by the best matching stored row."""
+    stored = [
+        (
+            d["timestamp"],
+            d["token"],
+            float(d["amount"]),
+            d["stable_coin"],
+            float(d["total_usd"]),
+        )
+        for d in details
+    ]
+    fields = sum(
+        max((sum(a == b for a, b in zip(row, s)) for s in stored), default=0)
+        for row in map(_expected_row, expected)
+    )
+    return fields / (5 * len(expected))
+
+
+def _measure_pipeline(count: int, max_sections: int, seed: int, queue):
+    import asyncio
+    import io
+    import os
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+    from fastapi import UploadFile
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from sqlalchemy.pool import StaticPool
+
+    from app.models import Base
+    from app.ocr import extract_transactions_from_image_upload, get_reader
+    from tests.synthetic import seed_tokens, synthetic_screenshot_corpus
+
+    try:
+        get_reader()
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+        return
+
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        seed_tokens(connection)
+
+    corpus = synthetic_screenshot_corpus(count, max_sections, seed)
+    latencies, accuracies, by_variant = [], [], {}
+    with Session(engine) as db:
+        for i, screenshot in enumerate(corpus):
+            upload = UploadFile(io.BytesIO(screenshot.contents), filename=f"{i}.img")
+            started = time.perf_counter()
+            response = asyncio.run(
+                extract_transactions_from_image_upload(upload, db, idempotent=True)
+            )
+            latencies.append(time.perf_counter() - started)
+            # A JSONResponse means no transactions were found
+            details = response.get("details", []) if isinstance(response, dict) else []
+            accuracy = _row_accuracy(screenshot.transactions, details)
+            accuracies.append(accuracy)
+            variant = f"noise {screenshot.noise:g}, " + (
+                f"jpeg {screenshot.quality}" if screenshot.quality else "png"
+            )
+            by_variant.setdefault(variant, []).append(accuracy)
+
+    sections = sum(s.sections for s in corpus)
+    queue.put(
+        {
+            "screenshots": count,
+            "sections": sections,
+            "median_ms": round(statistics.median(latencies) * 1000, 1),
+            "p95_ms": round(statistics.quantiles(latencies, n=20)[-1] * 1000, 1),
+            "ms_per_section": round(sum(latencies) / sections * 1000, 1),
+            "peak_rss_mb": round(
+                resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+            ),
+            "accuracy": round(statistics.mean(accuracies), 3),
+            "accuracy_by_variant": {
+                variant: round(statistics.mean(values), 3)
+                for variant, values in sorted(by_variant.items())
+            },
+        }
+    )
+
+
+def benchmark_pipeline(count: int, max_sections: int = 12, seed: int = 0) -> dict:
+    """
+    Run extract_transactions_from_image_upload over a synthetic corpus.
+
+    The corpus comes from tests.synthetic.synthetic_screenshot_corpus and is
+    processed in a fresh process against an in-memory SQLite database.
+    Returns latency, peak RSS and field accuracy of the stored rows against
+    the rendered ground truth (overall and per noise/compression variant),
+    or {"error": ...} if the OCR models could not be loaded.
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_measure_pipeline, args=(count, max_sections, seed, queue)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
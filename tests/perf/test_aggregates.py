@@ -0,0 +1,62 @@
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app.logic.aggregates import aggregate_by_token
+from tests.synthetic import seed_transactions, synthetic_rows
+
+scenarios("features/aggregates.feature")
+
+
+@given(parsers.parse("{rows:d} synthetic transactions across {tokens:d} tokens"))
+def seed_synthetic_transactions(rows, tokens, perf_engine):
+    pytest.synthetic_volume = (rows, tokens)
+    if perf_engine.seeded_rows != (rows, tokens):
+        with perf_engine.begin() as connection:
+            seed_transactions(connection, rows, tokens=tokens)
+        perf_engine.seeded_rows = (rows, tokens)
+
+
+@when("I aggregate amounts and USD totals per token")
+def aggregate_per_token(perf_session):
+    started = time.perf_counter()
+    pytest.last_aggregates = aggregate_by_token(perf_session)
+    pytest.last_elapsed_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"aggregate_by_token: {len(pytest.last_aggregates)} tokens "
+        f"in {pytest.last_elapsed_ms:.0f} ms"
+    )
+
+
+@then("every per-token sum and average should match the exact decimal result")
+def check_aggregates_exact():
+    rows, tokens = pytest.synthetic_volume
+    expected = defaultdict(lambda: [0, Decimal(0), Decimal(0)])
+    for row in synthetic_rows(rows, tokens):
+        totals = expected[row["token"]]
+        totals[0] += 1
+        totals[1] += row["amount"]
+        totals[2] += row["total_usd"]
+
+    assert len(pytest.last_aggregates) == len(expected)
+    for aggregate in pytest.last_aggregates:
+        count, amount, total_usd = expected[aggregate.token]
+        assert aggregate.transactions == count
+        assert aggregate.amount == amount, aggregate.token
+        assert aggregate.total_usd == total_usd, aggregate.token
+        assert aggregate.avg_amount == (amount / count).quantize(
+            aggregate.avg_amount
+        ), aggregate.token
+        assert aggregate.avg_total_usd == (total_usd / count).quantize(
+            aggregate.avg_total_usd
+        ), aggregate.token
+
+
+@then(parsers.parse("the aggregation should finish within {budget_ms:d} ms"))
+def check_aggregation_latency(budget_ms):
+    assert (
+        pytest.last_elapsed_ms <= budget_ms
+    ), f"Aggregation took {pytest.last_elapsed_ms:.0f} ms, budget {budget_ms} ms"
@@ -0,0 +1,119 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+from sqlalchemy import func, insert
+
+from app.analytics import (
+    AnalyticsStore,
+    cohort_stats,
+    rolling_flows,
+    trade_size_histogram,
+)
+from app.database import to_decimal
+from app.logic.aggregates import exact_sum
+from app.models import Transaction
+from tests.synthetic import seed_transactions
+
+scenarios("features/analytics.feature")
+
+
+@given(
+    parsers.parse(
+        "{rows:d} synthetic transactions across {tokens:d} tokens over {months:d} months"
+    )
+)
+def seed_synthetic_transactions(rows, tokens, months, perf_engine):
+    interval = int(timedelta(days=30 * months).total_seconds()) // rows
+    if perf_engine.seeded_rows != (rows, tokens, interval):
+        with perf_engine.begin() as connection:
+            seed_transactions(connection, rows, tokens=tokens, interval=interval)
+        perf_engine.seeded_rows = (rows, tokens, interval)
+
+
+@when("I mirror the transactions into an analytics store")
+def mirror(perf_session):
+    pytest.store = AnalyticsStore()
+    started = time.perf_counter()
+    pytest.mirrored = pytest.store.sync(perf_session)
+    print(
+        f"initial sync: {pytest.mirrored} rows in "
+        f"{time.perf_counter() - started:.2f} s"
+    )
+
+
+@then("the mirror should hold every transaction")
+def check_mirror(perf_session):
+    assert pytest.mirrored == perf_session.query(Transaction).count()
+    assert pytest.store.status()["rows"] == pytest.mirrored
+
+
+@then("the cohort stats should match the database")
+def check_cohorts(perf_session):
+    cohorts = cohort_stats(pytest.store)
+    assert sum(c["transactions"] for c in cohorts) == pytest.mirrored
+    tokens, total_usd = perf_session.query(
+        func.count(func.distinct(Transaction.token)),
+        exact_sum(perf_session, Transaction.total_usd),
+    ).one()
+    assert sum(c["tokens"] for c in cohorts) == tokens
+    assert sum(c["net_usd"] for c in cohorts) == to_decimal(total_usd)
+
+
+def _timed(query) -> float:
+    started = time.perf_counter()
+    query()
+    return (time.perf_counter() - started) * 1000
+
+
+@then(
+    parsers.parse(
+        "30-day rolling flows, a 50-bin histogram and cohort stats should take "
+        "at most {budget:d} ms each"
+    )
+)
+def check_query_latency(budget):
+    timings = {
+        "rolling": _timed(lambda: rolling_flows(pytest.store, 30)),
+        "histogram": _timed(lambda: trade_size_histogram(pytest.store, 50)),
+        "cohorts": _timed(lambda: cohort_stats(pytest.store)),
+    }
+    print(", ".join(f"{name}: {ms:.1f} ms" for name, ms in timings.items()))
+    assert max(timings.values()) <= budget
+
+
+@when(parsers.parse("{count:d} transactions are added after the latest one"))
+def add_transactions(perf_session, count):
+    last = perf_session.query(func.max(Transaction.timestamp)).scalar()
+    perf_session.execute(
+        insert(Transaction),
+        [
+            {
+                "timestamp": last + timedelta(seconds=i + 1),
+                "token": "TKNA",
+                "amount": Decimal(1),
+                "total_usd": Decimal(-1),
+                "stable_coin": "DAI",
+            }
+            for i in range(count)
+        ],
+    )
+    perf_session.commit()
+    pytest.added = count
+
+
+@then(parsers.parse("a sync should add exactly those in at most {budget:g} s"))
+def check_incremental_sync(perf_session, budget):
+    started = time.perf_counter()
+    added = pytest.store.sync(perf_session)
+    elapsed = time.perf_counter() - started
+    print(f"incremental sync: {added} rows in {elapsed * 1000:.0f} ms")
+    assert added == pytest.added
+    assert (
+        pytest.store.status()["high_water_id"]
+        == perf_session.query(func.max(Transaction.id)).scalar()
+    )
+    assert elapsed <= budget
+    pytest.store.close()
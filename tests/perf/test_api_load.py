@@ -0,0 +1,150 @@
+import itertools
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from tests.perf.load import live_server, run_load
+from tests.synthetic import (
+    STABLE_COINS,
+    SYNTHETIC_START,
+    seed_tokens,
+    seed_transactions,
+    synthetic_token,
+)
+
+scenarios("features/api_load.feature")
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+# Data volume of the load test database, overridable for bigger runs.
+LOAD_TEST_TRANSACTIONS = int(os.getenv("LOAD_TEST_TRANSACTIONS", "2000"))
+LOAD_TEST_TOKENS = int(os.getenv("LOAD_TEST_TOKENS", "50"))
+
+# The baseline holds absolute latencies of the machine that recorded it, so
+# it is only compared against with PERF_BASELINE=1, on that same machine.
+# Elsewhere the load runs still report their numbers and fail on errors.
+PERF_BASELINE = os.getenv("PERF_BASELINE") == "1"
+
+# Allowed slowdown against the baseline before a run fails: p95/p99 may grow
+# and throughput may drop by this fraction, to absorb run-to-run noise.
+PERF_TOLERANCE = float(os.getenv("PERF_TOLERANCE", "0.5"))
+
+# Set UPDATE_PERF_BASELINE=1 to record the current run as the new baseline.
+UPDATE_PERF_BASELINE = os.getenv("UPDATE_PERF_BASELINE") == "1"
+
+# Written transactions start after the seeded history so they never collide.
+_LIVE_START = SYNTHETIC_START + timedelta(days=3650)
+
+
+def _mocked_ocr_text(call: int) -> str:
+    timestamp = _LIVE_START - timedelta(days=1, seconds=call)
+    return (
+        "Contract Interaction 1inch -100 DAI ($99.99) "
+        f"+0.4612 {synthetic_token(call % LOAD_TEST_TOKENS)} ($128.36) "
+        f"{timestamp:%Y/%m/%d %H.%M.%S}"
+    )
+
+
+@pytest.fixture(scope="module")
+def load_server(perf_engine):
+    with perf_engine.begin() as connection:
+        seed_tokens(connection, LOAD_TEST_TOKENS)
+        seed_transactions(connection, LOAD_TEST_TRANSACTIONS, tokens=LOAD_TEST_TOKENS)
+    database_url = perf_engine.url.render_as_string(hide_password=False)
+    with live_server(database_url, ocr_text=_mocked_ocr_text) as base_url:
+        yield base_url
+
+
+def _request_factory(endpoint: str, base_url: str):
+    method, path = endpoint.split(" ", 1)
+    url = f"{base_url}{path}"
+    counter = itertools.count()
+
+    if endpoint == "GET /ui/":
+        return lambda session: session.get(url)
+
+    if endpoint == "POST /api/transactions":
+
+        def add_transaction(session):
+            n = next(counter)
+            return session.post(
+                url,
+                json={
+                    "timestamp": (_LIVE_START + timedelta(seconds=n)).isoformat(),
+                    "from_token": STABLE_COINS[n % len(STABLE_COINS)],
+                    "to_token": synthetic_token(n % LOAD_TEST_TOKENS),
+                    "from_amount": 100.0,
+                    "to_amount": 0.05,
+                },
+            )
+
+        return add_transaction
+
+    if endpoint == "POST /api/tokens":
+        return lambda session: session.post(
+            url, json={"token": f"L{next(counter)}", "is_stable": False}
+        )
+
+    if endpoint == "POST /api/transactions/extract":
+        image = b"\xff\xd8\xff\xe0 load test"
+        return lambda session: session.post(
+            url, files={"image": ("screenshot.jpg", image, "image/jpeg")}
+        )
+
+    raise ValueError(f"Unknown endpoint {endpoint!r}")
+
+
+@given("the load test database is seeded")
+def seeded_database(load_server):
+    pass
+
+
+@when(
+    parsers.parse(
+        'I send {total:d} "{endpoint}" requests from {clients:d} concurrent clients'
+    )
+)
+def send_load(total, endpoint, clients, load_server):
+    result = run_load(_request_factory(endpoint, load_server), total, clients)
+    assert result.errors == 0, f"{result.errors} failed requests"
+    pytest.load_summary = result.summary()
+    print(f"{endpoint}: {pytest.load_summary}")
+
+
+@then(
+    parsers.parse(
+        'the latency percentiles and throughput should stay within the baseline for "{endpoint}"'
+    )
+)
+def check_against_baseline(endpoint, perf_engine):
+    summary = pytest.load_summary
+    backend = perf_engine.dialect.name
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+
+    if UPDATE_PERF_BASELINE:
+        baseline.setdefault(backend, {})[endpoint] = summary
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        return
+    if not PERF_BASELINE:
+        pytest.skip("The baseline is machine-specific; compare with PERF_BASELINE=1")
+
+    expected = baseline.get(backend, {}).get(endpoint)
+    if expected is None:
+        pytest.skip(
+            f"No {backend} baseline for {endpoint}; run with UPDATE_PERF_BASELINE=1"
+        )
+
+    regressions = [
+        f"{key} {summary[key]} > {expected[key]} (+{PERF_TOLERANCE:.0%})"
+        for key in ("p95_ms", "p99_ms")
+        if summary[key] > expected[key] * (1 + PERF_TOLERANCE)
+    ]
+    if summary["rps"] < expected["rps"] * (1 - PERF_TOLERANCE):
+        regressions.append(
+            f"rps {summary['rps']} < {expected['rps']} (-{PERF_TOLERANCE:.0%})"
+        )
+    assert not regressions, f"{endpoint} regressed: {', '.join(regressions)}"
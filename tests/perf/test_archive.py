@@ -0,0 +1,97 @@
+import time
+from datetime import timedelta
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app.logic.aggregates import aggregate_by_token
+from app.logic.archive import (
+    archive_transactions,
+    iter_transactions,
+    month_start,
+)
+from app.models import Transaction
+from tests.synthetic import SYNTHETIC_START, seed_transactions
+
+scenarios("features/archive.feature")
+
+
+@given(
+    parsers.parse(
+        "{rows:d} synthetic transactions across {tokens:d} tokens over {months:d} months"
+    )
+)
+def seed_synthetic_transactions(rows, tokens, months, perf_engine):
+    interval = int(timedelta(days=30 * months).total_seconds()) // rows
+    if perf_engine.seeded_rows != (rows, tokens, interval):
+        with perf_engine.begin() as connection:
+            seed_transactions(connection, rows, tokens=tokens, interval=interval)
+        perf_engine.seeded_rows = (rows, tokens, interval)
+
+
+@when(parsers.parse("I archive every month but the last {keep:d}"))
+def archive_months(perf_session, tmp_path, keep):
+    pytest.aggregates_before = aggregate_by_token(perf_session)
+    (last,) = (
+        perf_session.query(Transaction.timestamp)
+        .order_by(Transaction.timestamp.desc())
+        .first()
+    )
+    before = month_start(last)
+    for _ in range(keep - 1):
+        before = month_start(before - timedelta(days=1))
+    pytest.archive_before = before
+
+    started = time.perf_counter()
+    result = archive_transactions(perf_session, before, str(tmp_path))
+    pytest.archive_seconds = time.perf_counter() - started
+    size = sum(f.stat().st_size for f in tmp_path.iterdir())
+    print(
+        f"archive_transactions: {result} in {pytest.archive_seconds:.2f} s, "
+        f"{size / 1e6:.1f} MB of Parquet"
+    )
+    pytest.archive_dir = str(tmp_path)
+
+
+@then(
+    parsers.parse(
+        "only the last {keep:d} months should be left in the transactions table"
+    )
+)
+def check_live_months(perf_session, keep):
+    months = {
+        month_start(timestamp)
+        for (timestamp,) in perf_session.query(Transaction.timestamp)
+    }
+    assert pytest.archive_before > SYNTHETIC_START
+    assert min(months) == pytest.archive_before
+    assert len(months) == keep
+
+
+@then("the aggregates should match the ones before archiving")
+def check_aggregates(perf_session):
+    started = time.perf_counter()
+    aggregates = aggregate_by_token(perf_session)
+    print(f"aggregate_by_token: {(time.perf_counter() - started) * 1000:.0f} ms")
+    assert aggregates == pytest.aggregates_before
+
+
+@then(
+    parsers.parse("the export should list all {rows:d} transactions in timestamp order")
+)
+def check_export(perf_session, rows):
+    started = time.perf_counter()
+    timestamps = [
+        row[1] for row in iter_transactions(perf_session, directory=pytest.archive_dir)
+    ]
+    print(
+        f"iter_transactions: {len(timestamps)} rows in "
+        f"{time.perf_counter() - started:.2f} s"
+    )
+    assert len(timestamps) == rows
+    assert timestamps == sorted(timestamps)
+
+
+@then(parsers.parse("archiving should finish within {seconds:d} seconds"))
+def check_archive_time(seconds):
+    assert pytest.archive_seconds <= seconds
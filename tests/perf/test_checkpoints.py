@@ -0,0 +1,133 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+from sqlalchemy import func
+
+from app.database import to_decimal
+from app.logic.checkpoints import (
+    _nearest_checkpoint,
+    _replay,
+    build_checkpoints,
+    invalidate_checkpoints,
+)
+from app.models import HoldingCheckpoint, Transaction
+from tests.synthetic import seed_transactions
+
+scenarios("features/checkpoints.feature")
+
+
+@given(
+    parsers.parse(
+        "{rows:d} synthetic transactions across {tokens:d} tokens over {months:d} months"
+    )
+)
+def seed_synthetic_transactions(rows, tokens, months, perf_engine):
+    interval = int(timedelta(days=30 * months).total_seconds()) // rows
+    if perf_engine.seeded_rows != (rows, tokens, interval):
+        with perf_engine.begin() as connection:
+            seed_transactions(connection, rows, tokens=tokens, interval=interval)
+        perf_engine.seeded_rows = (rows, tokens, interval)
+
+
+@when(parsers.parse("I build the holding checkpoints every {every:d} transactions"))
+def build(perf_session, every):
+    started = time.perf_counter()
+    pytest.checkpoints_taken = build_checkpoints(perf_session, every)
+    print(
+        f"build_checkpoints: {pytest.checkpoints_taken} checkpoints in "
+        f"{time.perf_counter() - started:.2f} s"
+    )
+
+
+def _positions_at(db, at):
+    # positions_at without the catch-up build, which the steps do explicitly
+    timestamp, positions = _nearest_checkpoint(db, at)
+    return _replay(db, positions, timestamp, at)
+
+
+@then(
+    parsers.parse(
+        "as-of positions at {samples:d} moments should match a full aggregate up to each"
+    )
+)
+def check_positions(perf_session, samples):
+    first, last = perf_session.query(
+        func.min(Transaction.timestamp), func.max(Transaction.timestamp)
+    ).one()
+    span = (last - first).total_seconds()
+    moments = [first + timedelta(seconds=s) for s in np.linspace(0, span, samples)]
+
+    elapsed = 0.0
+    for at in moments:
+        started = time.perf_counter()
+        positions = _positions_at(perf_session, at)
+        elapsed += time.perf_counter() - started
+
+        expected = {}
+        for token, amount, total_usd in perf_session.query(
+            Transaction.token, Transaction.amount, Transaction.total_usd
+        ).filter(Transaction.timestamp <= at):
+            count, held, usd = expected.get(token, (0, Decimal(0), Decimal(0)))
+            expected[token] = (count + 1, held + amount, usd + total_usd)
+        assert {
+            token: (count, to_decimal(amount), to_decimal(usd))
+            for token, (count, amount, usd) in positions.items()
+        } == expected
+    pytest.as_of_ms = elapsed / samples * 1000
+    print(f"as-of positions: {pytest.as_of_ms:.1f} ms per query")
+
+
+@then(parsers.parse("an as-of query should take at most {budget:d} ms on average"))
+def check_as_of_latency(budget):
+    assert pytest.as_of_ms <= budget
+
+
+@when("a transaction is inserted in the middle of the history")
+def insert_in_the_middle(perf_session):
+    first, last = perf_session.query(
+        func.min(Transaction.timestamp), func.max(Transaction.timestamp)
+    ).one()
+    middle = first + (last - first) / 2 + timedelta(microseconds=1)
+    pytest.checkpoints_before = (
+        perf_session.query(HoldingCheckpoint.timestamp)
+        .filter(HoldingCheckpoint.timestamp < middle)
+        .distinct()
+        .count()
+    )
+    perf_session.add(
+        Transaction(
+            timestamp=middle,
+            token="TKNA",
+            amount=Decimal(1),
+            total_usd=Decimal(-1),
+            stable_coin="DAI",
+        )
+    )
+    invalidate_checkpoints(perf_session, middle)
+    perf_session.commit()
+    pytest.inserted_at = middle
+
+
+@then("only the checkpoints at or after it should be dropped")
+def check_invalidation(perf_session):
+    checkpoints = perf_session.query(HoldingCheckpoint.timestamp).distinct()
+    assert checkpoints.count() == pytest.checkpoints_before
+    assert (
+        checkpoints.filter(HoldingCheckpoint.timestamp >= pytest.inserted_at).count()
+        == 0
+    )
+
+
+@then("rebuilding should take fewer checkpoints than the first build")
+def check_rebuild(perf_session):
+    started = time.perf_counter()
+    taken = build_checkpoints(perf_session, 1000)
+    print(
+        f"rebuild after an out-of-order insert: {taken} checkpoints in "
+        f"{time.perf_counter() - started:.2f} s"
+    )
+    assert 0 < taken < pytest.checkpoints_taken
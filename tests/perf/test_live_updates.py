@@ -0,0 +1,108 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app.events import OVERFLOW, ChangeFeed, publish_transactions
+
+scenarios("features/live_updates.feature")
+
+QUEUE_SIZE = 100
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@given(
+    parsers.parse(
+        "{pages:d} pages listening for live updates, {slow:d} of which never read"
+    )
+)
+def listen(loop, monkeypatch, pages, slow):
+    feed = ChangeFeed()
+    monkeypatch.setattr("app.events.feed", feed)
+
+    async def subscribe():
+        return [feed.subscribe(QUEUE_SIZE) for _ in range(pages)]
+
+    subscriptions = loop.run_until_complete(subscribe())
+    pytest.slow_pages = subscriptions[:slow]
+    pytest.reading_pages = subscriptions[slow:]
+
+
+async def _drain(subscription, received: list, count: int):
+    while len(received) < count:
+        received.append((await subscription.get()).id)
+
+
+@when(parsers.parse("{count:d} transactions are published one at a time"))
+def publish(loop, count):
+    start = datetime(2025, 1, 1)
+    rows = [
+        SimpleNamespace(
+            id=i,
+            timestamp=start + timedelta(seconds=i),
+            token="TKNA",
+            amount=Decimal(1),
+            total_usd=Decimal(-1),
+            stable_coin="DAI",
+        )
+        for i in range(1, count + 1)
+    ]
+    pytest.published = count
+    pytest.received = [[] for _ in pytest.reading_pages]
+
+    async def run():
+        readers = asyncio.gather(
+            *(
+                _drain(subscription, received, count)
+                for subscription, received in zip(pytest.reading_pages, pytest.received)
+            )
+        )
+        elapsed = 0.0
+        for row in rows:
+            started = time.perf_counter()
+            publish_transactions([row])
+            elapsed += time.perf_counter() - started
+            # Let the readers keep up, as a server's event loop would
+            await asyncio.sleep(0)
+        await asyncio.wait_for(readers, timeout=60)
+        return elapsed
+
+    pytest.publish_ms = loop.run_until_complete(run()) / count * 1000
+    print(
+        f"publish to {len(pytest.slow_pages) + len(pytest.reading_pages)} pages: "
+        f"{pytest.publish_ms:.3f} ms per transaction"
+    )
+
+
+@then(
+    parsers.parse(
+        "publishing should take at most {budget:g} ms per transaction on average"
+    )
+)
+def check_publish_latency(budget):
+    assert pytest.publish_ms <= budget
+
+
+@then("every reading page should receive every transaction in order")
+def check_readers():
+    expected = list(range(1, pytest.published + 1))
+    assert all(received == expected for received in pytest.received)
+
+
+@then(parsers.parse("no page should hold more than {count:d} queued events"))
+def check_bounded(count):
+    for subscription in pytest.slow_pages:
+        assert subscription.overflowed
+        assert subscription.queue.qsize() == 1
+        assert subscription.queue.get_nowait() is OVERFLOW
+    assert all(s.queue.qsize() <= count for s in pytest.reading_pages)
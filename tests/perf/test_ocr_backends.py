@@ -0,0 +1,39 @@
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from tests.perf.ocr_bench import benchmark_backend
+
+scenarios("features/ocr_backends.feature")
+
+
+@given(
+    parsers.parse(
+        'the "{backend}" OCR backend with the "{detector}" detector and {threads:d} torch threads'
+    )
+)
+def select_ocr_backend(backend, detector, threads):
+    pytest.ocr_backend = {
+        "ocr_backend": backend,
+        "ocr_detect_network": detector,
+        "ocr_torch_threads": threads,
+    }
+
+
+@when("I run it over the fixture screenshots")
+def run_ocr_backend():
+    result = benchmark_backend(pytest.ocr_backend)
+    if "error" in result:
+        pytest.skip(f"OCR models unavailable: {result['error']}")
+    pytest.ocr_result = result
+
+
+@then("its latency, memory and accuracy should be reported")
+def report_ocr_backend():
+    print(f"{pytest.ocr_backend}: {pytest.ocr_result}")
+    for key in ("load_s", "median_ms", "peak_rss_mb", "accuracy"):
+        assert key in pytest.ocr_result
+
+
+@then(parsers.parse("its field accuracy should be at least {min_accuracy:f}"))
+def check_ocr_accuracy(min_accuracy):
+    assert pytest.ocr_result["accuracy"] >= min_accuracy
@@ -0,0 +1,71 @@
+import time
+from datetime import timedelta
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app.parsers import parse_screenshot, registered_parsers
+from tests.synthetic import SYNTHETIC_START, synthetic_token
+
+scenarios("features/parsers.feature")
+
+
+def debank_text(sections: int) -> str:
+    lines = []
+    for i in range(sections):
+        timestamp = SYNTHETIC_START + timedelta(minutes=i)
+        lines += [
+            "Contract Interaction",
+            "1inch",
+            f"-{100 + i % 50} DAI",
+            f"(${100 + i % 50}.00)",
+            f"+{i % 7 + 1}.25 {synthetic_token(i % 50)}",
+            "($1,112.67)",
+            timestamp.strftime("%Y/%m/%d %H.%M.%S"),
+        ]
+    return "\n".join(lines)
+
+
+# One generator per registered layout, so each layout gets its own benchmark
+TEXT_GENERATORS = {"debank": debank_text}
+
+
+@then("every registered layout should have a synthetic text generator")
+def check_every_layout_benchmarked():
+    assert set(registered_parsers()) <= set(TEXT_GENERATORS)
+
+
+@given(parsers.parse('synthetic OCR text of {sections:d} "{layout}" sections'))
+def synthetic_layout_text(sections, layout):
+    pytest.ocr_sections = sections
+    pytest.ocr_text = TEXT_GENERATORS[layout](sections)
+
+
+@when("I dispatch and parse the text")
+def dispatch_and_parse():
+    started = time.perf_counter()
+    pytest.parse_result = parse_screenshot(pytest.ocr_text)
+    pytest.parse_elapsed = time.perf_counter() - started
+
+
+@then(
+    parsers.parse(
+        'all {sections:d} transactions should be parsed with the "{layout}" layout'
+    )
+)
+def check_all_parsed(sections, layout):
+    result = pytest.parse_result
+    assert result.layout == layout
+    assert result.failures == []
+    assert len(result.transactions) == sections
+
+
+@then(
+    parsers.parse("parsing should take at most {budget_us:d} microseconds per section")
+)
+def check_parse_latency(budget_us):
+    per_section_us = pytest.parse_elapsed / pytest.ocr_sections * 1_000_000
+    print(f"parse: {per_section_us:.1f} us per section")
+    assert (
+        per_section_us <= budget_us
+    ), f"Parsing took {per_section_us:.1f} us per section, budget {budget_us} us"
@@ -0,0 +1,98 @@
+import time
+from bisect import bisect_right
+from collections import defaultdict
+
+import numpy as np
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app.logic.prices import (
+    PriceStore,
+    import_trade_prices,
+    portfolio_values,
+    time_range,
+)
+from app.models import Price, Transaction
+from tests.synthetic import seed_transactions
+
+scenarios("features/prices.feature")
+
+
+@given(parsers.parse("{rows:d} synthetic transactions across {tokens:d} tokens"))
+def seed_synthetic_transactions(rows, tokens, perf_engine):
+    if perf_engine.seeded_rows != (rows, tokens):
+        with perf_engine.begin() as connection:
+            seed_transactions(connection, rows, tokens=tokens)
+        perf_engine.seeded_rows = (rows, tokens)
+
+
+@when("I import their implied trade prices")
+def import_prices(perf_session):
+    started = time.perf_counter()
+    result = import_trade_prices(perf_session)
+    print(f"import_trade_prices: {result} in {time.perf_counter() - started:.2f} s")
+
+
+@when(
+    parsers.parse("I value the portfolio at {points:d} points over the whole history")
+)
+def value_portfolio(perf_session, points):
+    (first,) = (
+        perf_session.query(Transaction.timestamp)
+        .order_by(Transaction.timestamp)
+        .first()
+    )
+    (last,) = (
+        perf_session.query(Transaction.timestamp)
+        .order_by(Transaction.timestamp.desc())
+        .first()
+    )
+    started = time.perf_counter()
+    store = PriceStore.from_db(perf_session)
+    loaded = time.perf_counter()
+    pytest.valuation_points = time_range(first, last, points)
+    pytest.valuation = portfolio_values(perf_session, store, pytest.valuation_points)
+    finished = time.perf_counter()
+    pytest.last_elapsed_ms = (finished - started) * 1000
+    print(
+        f"price store load {(loaded - started) * 1000:.0f} ms, "
+        f"valuation of {points} points {(finished - loaded) * 1000:.0f} ms"
+    )
+
+
+@then(
+    parsers.parse(
+        "the valuation should match a row-by-row as-of lookup at {samples:d} points"
+    )
+)
+def check_valuation(perf_session, samples):
+    prices = defaultdict(list)
+    for token, timestamp, price in perf_session.query(
+        Price.token, Price.timestamp, Price.price_usd
+    ).order_by(Price.timestamp):
+        prices[token].append((timestamp, float(price)))
+    rows = perf_session.query(
+        Transaction.token, Transaction.timestamp, Transaction.amount
+    ).all()
+
+    points = pytest.valuation_points
+    for i in np.linspace(0, len(points) - 1, samples).astype(int):
+        at = points[i].astype("datetime64[us]").item()
+        held = defaultdict(float)
+        for token, timestamp, amount in rows:
+            if timestamp <= at:
+                held[token] += float(amount)
+        expected = 0.0
+        for token, amount in held.items():
+            series = prices[token]
+            position = bisect_right([t for t, _ in series], at)
+            if position:
+                expected += amount * series[position - 1][1]
+        assert pytest.valuation["value_usd"][i] == pytest.approx(expected, rel=1e-6)
+
+
+@then(parsers.parse("the valuation should finish within {budget_ms:d} ms"))
+def check_valuation_latency(budget_ms):
+    assert (
+        pytest.last_elapsed_ms <= budget_ms
+    ), f"Valuation took {pytest.last_elapsed_ms:.0f} ms, budget {budget_ms} ms"
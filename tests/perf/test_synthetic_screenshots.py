@@ -0,0 +1,57 @@
+import io
+
+import pytest
+from PIL import Image
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from tests.perf.ocr_bench import benchmark_pipeline
+from tests.synthetic import synthetic_screenshot_corpus
+
+scenarios("features/synthetic_screenshots.feature")
+
+
+@given(
+    parsers.parse(
+        "a synthetic screenshot corpus of {count:d} screenshots with up to "
+        "{max_sections:d} sections"
+    )
+)
+def synthetic_corpus(count, max_sections):
+    pytest.corpus_size = (count, max_sections)
+
+
+@then("the same seed should render the same corpus")
+def check_corpus_reproducible():
+    first = synthetic_screenshot_corpus(*pytest.corpus_size, seed=7)
+    second = synthetic_screenshot_corpus(*pytest.corpus_size, seed=7)
+    assert [s.contents for s in first] == [s.contents for s in second]
+
+
+@then("taller screenshots should hold more sections")
+def check_heights_scale():
+    corpus = synthetic_screenshot_corpus(*pytest.corpus_size, seed=7)
+    for screenshot in corpus:
+        height = Image.open(io.BytesIO(screenshot.contents)).height
+        # Sections are at least 5 lines of the smallest font tall
+        assert height >= screenshot.sections * 5 * 14
+
+
+@when("I run the extract pipeline over the corpus")
+def run_pipeline():
+    result = benchmark_pipeline(*pytest.corpus_size)
+    if "error" in result:
+        pytest.skip(f"OCR models unavailable: {result['error']}")
+    pytest.pipeline_result = result
+
+
+@then("its latency, memory and accuracy should be reported per variant")
+def report_pipeline():
+    print(f"{pytest.corpus_size}: {pytest.pipeline_result}")
+    for key in ("median_ms", "p95_ms", "ms_per_section", "peak_rss_mb", "accuracy"):
+        assert key in pytest.pipeline_result
+    assert pytest.pipeline_result["accuracy_by_variant"]
+
+
+@then(parsers.parse("its field accuracy should be at least {min_accuracy:f}"))
+def check_pipeline_accuracy(min_accuracy):
+    assert pytest.pipeline_result["accuracy"] >= min_accuracy
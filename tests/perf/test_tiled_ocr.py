@@ -0,0 +1,43 @@
+import os
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from tests.perf.ocr_bench import benchmark_tiled_ocr
+
+scenarios("features/tiled_ocr.feature")
+
+
+@given(parsers.parse("a tall screenshot of {copies:d} stacked fixture screenshots"))
+def tall_screenshot(copies):
+    pytest.tiled_copies = copies
+
+
+@given(parsers.parse("tiled OCR with {height:d} px tiles and {workers:d} workers"))
+def tiled_ocr(height, workers):
+    if workers > os.cpu_count():
+        pytest.skip(f"{workers} workers on {os.cpu_count()} cores")
+    pytest.tiling = {
+        "OCR_TILE_HEIGHT": height,
+        "OCR_TILE_OVERLAP": 80,
+        "OCR_TILE_WORKERS": workers,
+    }
+
+
+@when("I run OCR over the tall screenshot")
+def run_tiled_ocr():
+    result = benchmark_tiled_ocr(pytest.tiling, pytest.tiled_copies)
+    if "error" in result:
+        pytest.skip(f"OCR models unavailable: {result['error']}")
+    pytest.tiled_result = result
+
+
+@then("its latency should be reported")
+def report_tiled_ocr():
+    print(f"{pytest.tiling}: {pytest.tiled_result}")
+    assert "median_ms" in pytest.tiled_result
+
+
+@then("every stacked transaction should be parsed exactly once")
+def check_tiled_transactions():
+    assert pytest.tiled_result["transactions"] == pytest.tiled_copies
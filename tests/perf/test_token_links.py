@@ -0,0 +1,60 @@
+import random
+import time
+from decimal import Decimal
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app.logic.token_links import TokenGraph
+
+scenarios("features/token_links.feature")
+
+
+@given(parsers.parse("a token graph of {count:d} links in chains up to {depth:d} deep"))
+def build_token_graph(count, depth):
+    rng = random.Random(46)
+    links = {}
+    chain = []
+    for i in range(count):
+        # Start a new chain from a fresh root now and then
+        if not chain or len(chain) == depth or rng.random() < 0.05:
+            chain = [f"R{i}"]
+        token = f"T{i}"
+        links[token] = (rng.choice(chain), Decimal(rng.randint(90, 110)) / 100)
+        chain.append(token)
+    started = time.perf_counter()
+    pytest.token_graph = TokenGraph(links)
+    print(
+        f"TokenGraph over {count} links built in {time.perf_counter() - started:.2f} s"
+    )
+    pytest.links = links
+
+
+@when(parsers.parse("I resolve {count:d} transaction tokens"))
+def resolve_tokens(count):
+    rng = random.Random(47)
+    linked = list(pytest.links)
+    tokens = [rng.choice(linked) for _ in range(count)]
+    resolve = pytest.token_graph.resolve
+    started = time.perf_counter()
+    pytest.resolutions = [resolve(token) for token in tokens]
+    pytest.per_lookup_us = (time.perf_counter() - started) / count * 1e6
+    pytest.resolved_tokens = tokens
+    print(f"TokenGraph.resolve: {pytest.per_lookup_us:.2f} us per lookup")
+
+
+@then("every resolution should agree with walking the links")
+def check_resolutions():
+    for token, resolution in zip(pytest.resolved_tokens, pytest.resolutions):
+        factor = Decimal(1)
+        while token in pytest.links:
+            token, step = pytest.links[token]
+            factor *= step
+        assert resolution == (token, factor)
+
+
+@then(
+    parsers.parse("a resolution should take at most {budget:d} microseconds on average")
+)
+def check_resolution_latency(budget):
+    assert pytest.per_lookup_us <= budget
@@ -0,0 +1,55 @@
+import random
+import string
+import time
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from app.logic.token_matching import MAX_DISTANCE, TokenIndex, edit_distance
+
+scenarios("features/token_matching.feature")
+
+
+@given(parsers.parse("a token index over {count:d} random symbols"))
+def build_token_index(count):
+    rng = random.Random(34)
+    symbols = set()
+    while len(symbols) < count:
+        length = rng.randint(3, 6)
+        symbols.add("".join(rng.choice(string.ascii_uppercase) for _ in range(length)))
+    pytest.symbols = sorted(symbols)
+    pytest.token_index = TokenIndex(pytest.symbols)
+
+
+@when(parsers.parse("I look up {count:d} tickers with one misread character"))
+def look_up_misread_tickers(count):
+    rng = random.Random(35)
+    reads = []
+    for symbol in rng.sample(pytest.symbols, count):
+        i = rng.randrange(len(symbol))
+        reads.append(symbol[:i] + rng.choice(string.ascii_uppercase) + symbol[i + 1 :])
+
+    started = time.perf_counter()
+    matches = [pytest.token_index.match(read) for read in reads]
+    pytest.lookup_us = (time.perf_counter() - started) / count * 1_000_000
+    pytest.lookups = list(zip(reads, matches))
+    print(f"token index: {pytest.lookup_us:.1f} us per lookup")
+
+
+@then("every lookup should agree with a brute-force edit distance scan")
+def check_lookups_against_brute_force():
+    for read, match in pytest.lookups:
+        scored = sorted(
+            (edit_distance(read, symbol), symbol) for symbol in pytest.symbols
+        )
+        scored = [(d, s) for d, s in scored if d <= MAX_DISTANCE]
+        ambiguous = len(scored) > 1 and scored[1][0] == scored[0][0]
+        expected = scored[0][1] if scored and not ambiguous else None
+        assert (match.token if match else None) == expected, read
+
+
+@then(parsers.parse("a lookup should take at most {budget:d} microseconds on average"))
+def check_lookup_latency(budget):
+    assert (
+        pytest.lookup_us <= budget
+    ), f"Lookups took {pytest.lookup_us:.1f} us, budget {budget} us"
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+from pytest_bdd import given, parsers, scenarios, then, when
+
+from tests.perf.load import gunicorn_server, run_load
+from tests.synthetic import seed_transactions
+
+scenarios("features/worker_scaling.feature")
+
+
+@given(parsers.parse("{rows:d} synthetic transactions across {tokens:d} tokens"))
+def seed_synthetic_transactions(rows, tokens, perf_engine):
+    if perf_engine.seeded_rows != (rows, tokens):
+        with perf_engine.begin() as connection:
+            seed_transactions(connection, rows, tokens=tokens)
+        perf_engine.seeded_rows = (rows, tokens)
+
+
+def _load(path, total, concurrency, workers, perf_engine):
+    database_url = perf_engine.url.render_as_string(hide_password=False)
+    with gunicorn_server(database_url, workers) as base_url:
+        result = run_load(
+            lambda session: session.get(f"{base_url}{path}"), total, concurrency
+        )
+    assert result.errors == 0
+    print(f"{path} with {workers} worker(s): {result.summary()}")
+    return result
+
+
+@when(
+    parsers.parse(
+        'I load "{path}" with {total:d} requests from {concurrency:d} clients against 1 worker'
+    )
+)
+def load_single_worker(path, total, concurrency, perf_engine):
+    pytest.single_worker_load = _load(path, total, concurrency, 1, perf_engine)
+
+
+@when(
+    parsers.parse(
+        'I load "{path}" with {total:d} requests from {concurrency:d} clients against one worker per core'
+    )
+)
+def load_worker_per_core(path, total, concurrency, perf_engine):
+    workers = os.cpu_count() or 1
+    pytest.multi_worker_count = workers
+    pytest.multi_worker_load = _load(path, total, concurrency, workers, perf_engine)
+
+
+@then(
+    parsers.parse(
+        "the multi-worker throughput should be at least {factor:g} times the single-worker throughput"
+    )
+)
+def check_throughput_scales(factor):
+    if pytest.multi_worker_count < 2:
+        pytest.skip("scaling needs at least two cores")
+    single = pytest.single_worker_load.rps
+    multi = pytest.multi_worker_load.rps
+    assert multi >= factor * single, f"{multi:.1f} rps vs {single:.1f} rps"